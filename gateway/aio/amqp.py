@@ -0,0 +1,90 @@
+"""Batched, confirmed RMQ publishing on the asyncio event loop."""
+
+# pylint: disable=E0401, C0413
+
+import asyncio
+import os
+import sys
+from pika.adapters.asyncio_connection import AsyncioConnection
+sys.path.append(os.getcwd())  # nopep8
+from gateway.rabbitmq.publish import BatchPublisher, RECONNECT_DELAY
+from gateway.logging.gateway_logging import GatewayLogger
+
+LOG = GatewayLogger(__file__, False)
+
+
+class AsyncioPublisher(BatchPublisher):
+    """A BatchPublisher whose connection runs on an asyncio event loop.
+
+    Buffering, batching, confirms and requeueing are those of the
+    BatchPublisher; only the I/O loop differs. Rather than a dedicated
+    I/O thread, the connection is a pika AsyncioConnection on the given
+    loop, so every feed in the process publishes without a thread switch.
+    Messages may still be published from other threads.
+    """
+
+    def __init__(self, parameters, loop: asyncio.AbstractEventLoop, **kwargs) -> None:
+        """Initialisation."""
+        super().__init__(parameters, **kwargs)
+        self.loop = loop
+        self._task = None
+        self._ended = None
+
+    def start(self) -> None:
+        """Start the connection task, if not already running."""
+        if self._task:
+            return
+        self._stopping = False
+        self._task = self.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        """Connect, wait for the connection to end, reconnect."""
+        while not self._stopping:
+            self._ended = self.loop.create_future()
+            self._connection = AsyncioConnection(
+                parameters=self.parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed,
+                custom_ioloop=self.loop
+            )
+            await self._ended
+            if not self._stopping:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def _connection_ended(self, connection) -> None:
+        """The connection has closed or failed to open - return to run."""
+        if self._ended and not self._ended.done():
+            self._ended.set_result(None)
+
+    def _threadsafe(self, callback) -> None:
+        """Run callback on the event loop, which has no add_callback_threadsafe."""
+        if not self._connection:
+            return
+        try:
+            self.loop.call_soon_threadsafe(callback)
+        except RuntimeError as err:
+            LOG.logger.debug('Unable to schedule on the event loop: %s', err)
+
+    def stop(self, timeout: float = 10) -> None:
+        """Close from another thread; within the loop, await aclose."""
+        self._stopping = True
+        self._threadsafe(self._close)
+
+    async def aclose(self, timeout: float = 10) -> None:
+        """Flush what can be flushed within timeout, then close."""
+        if not self._task:
+            return
+        deadline = self.loop.time() + timeout
+        while self.loop.time() < deadline and any(
+                state.buffer or state.unconfirmed for state in self.exchanges.values()):
+            await asyncio.sleep(self.window)
+
+        self._stopping = True
+        if self._connection:
+            self._close()
+        try:
+            await asyncio.wait_for(self._task, max(deadline - self.loop.time(), 1))
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
@@ -0,0 +1,154 @@
+"""Run several gateway feeds in a single process, on one asyncio event loop."""
+
+# pylint: disable=E0401, C0413, C0415, W0718
+
+import asyncio
+import os
+import signal
+import sys
+from typing import Callable, List
+import stomp
+from prometheus_client import start_http_server
+sys.path.append(os.getcwd())  # nopep8
+from gateway.aio.amqp import AsyncioPublisher
+from gateway.aio.stomp_client import StompClient
+from gateway.rabbitmq.publish import get_connection_parameters, install_batch_publisher
+from gateway.logging.gateway_logging import GatewayLogger
+
+GATEWAY_FEEDS = os.getenv('GATEWAY_FEEDS', 'nrod,darwin')
+
+LOG = GatewayLogger(__file__, False)
+
+
+async def poll(func: Callable, interval: float) -> None:
+    """Call the blocking func every interval seconds, on the default executor.
+
+    The pollers are not yet asynchronous: each poll still blocks an executor
+    thread, only the wait between polls is on the loop.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        started = loop.time()
+        try:
+            await loop.run_in_executor(None, func)
+        except Exception as err:
+            LOG.logger.error('%s failed: %s', func.__qualname__, err)
+        await asyncio.sleep(max(interval - (loop.time() - started), 0))
+
+
+def nrod_feed() -> StompClient:
+    """Return the NROD STOMP client, subscribed to each topic."""
+    from gateway.nrod.nrod_connection import Listener, NRODConnection, PIPELINE, TD_SHARDS
+    config = NRODConnection()
+    # the listener's conn is never connected, the StompClient receives its frames
+    listener = Listener(conn=stomp.Connection12([(config.host, config.port)]))
+    if TD_SHARDS:
+        listener.start_td_shards()
+    if PIPELINE:
+        listener.start_pipeline()
+
+    client = StompClient(
+        config.host, config.port, config.user, config.password, listener,
+        headers={'client-id': config.client_id}
+    )
+    for topic in config.topics:
+        client.subscribe(
+            f'/topic/{topic}',
+            id=f'{topic}-{config.client_id}',
+            headers={'activemq.subscriptionName': f'{topic}-{config.client_id}'}
+        )
+    return client
+
+
+def darwin_feed() -> StompClient:
+    """Return the Darwin Push Port STOMP client, subscribed to the topic."""
+    from gateway.nre.darwin import Listener, DarwinConnection, DARWIN_WORKERS, open_connections
+    open_connections()
+    config = DarwinConnection()
+    listener = Listener(conn=stomp.Connection12([(config.darwin_host, config.darwin_port)]))
+    if DARWIN_WORKERS:
+        listener.start_pool()
+
+    client = StompClient(
+        config.darwin_host, config.darwin_port, config.darwin_user, config.darwin_pass,
+        listener, headers={'client-id': config.client_id}, auto_decode=False
+    )
+    client.subscribe(
+        f'/topic/{config.darwin_topic}',
+        id='1',
+        headers={'activemq.subscriptionName': f'{config.darwin_topic}-{config.client_id}'}
+    )
+    return client
+
+
+def darwin_rti_feed() -> StompClient:
+    """Return the Darwin Real Time Incident STOMP client, subscribed to the topic."""
+    from gateway.nre.darwin_rti import Listener, DarwinConnection
+    config = DarwinConnection()
+    listener = Listener(conn=stomp.Connection12([(config.darwin_host, config.darwin_port)]))
+
+    client = StompClient(
+        config.darwin_host, config.darwin_port, config.darwin_user, config.darwin_pass,
+        listener, headers={'client-id': config.client_id}
+    )
+    client.subscribe(
+        f'/topic/{config.darwin_topic}',
+        id='1',
+        headers={'activemq.subscriptionName': f'{config.darwin_topic}-{config.client_id}'}
+    )
+    return client
+
+
+def lift_esc_feed():
+    """Return the lift and escalator poll."""
+    from gateway.lift_esc.lift_esc import LiftEscStatus, CHECK_FREQ
+    return poll(LiftEscStatus().fetch, CHECK_FREQ)
+
+
+STOMP_FEEDS = {
+    'nrod': nrod_feed,
+    'darwin': darwin_feed,
+    'darwin_rti': darwin_rti_feed
+}
+
+POLL_FEEDS = {
+    'lift-esc': lift_esc_feed
+}
+
+
+async def main(feeds: List[str]) -> None:
+    """Run the feeds until SIGTERM or SIGINT."""
+    loop = asyncio.get_event_loop()
+    publisher = AsyncioPublisher(get_connection_parameters(), loop)
+    # before the feeds are imported, as some create their connections on import
+    install_batch_publisher(publisher)
+    publisher.start()
+
+    clients = [STOMP_FEEDS[feed]() for feed in feeds if feed in STOMP_FEEDS]
+    tasks = [loop.create_task(client.run()) for client in clients]
+    tasks += [loop.create_task(POLL_FEEDS[feed]()) for feed in feeds if feed in POLL_FEEDS]
+    for feed in set(feeds) - set(STOMP_FEEDS) - set(POLL_FEEDS):
+        LOG.logger.error('Unknown feed: %s', feed)
+
+    stopping = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+    LOG.logger.error('Running %s...', ', '.join(feeds))
+    await stopping.wait()
+
+    LOG.logger.error('Signal received, closing connections...')
+    for client in clients:
+        await client.disconnect()
+        pool = getattr(client.listener, 'pool', None)
+        if pool:
+            pool.stop()
+    for task in tasks:
+        task.cancel()
+    await publisher.aclose()
+
+
+if __name__ == "__main__":
+    start_http_server(8000)
+    asyncio.get_event_loop().run_until_complete(
+        main([feed.strip() for feed in GATEWAY_FEEDS.split(',') if feed.strip()])
+    )
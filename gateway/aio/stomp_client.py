@@ -0,0 +1,223 @@
+"""A minimal STOMP 1.2 client for asyncio."""
+
+# pylint: disable=E0401, C0413, W0718, R0902, R0913
+
+import asyncio
+import os
+import re
+import sys
+from typing import List, Tuple
+from stomp.utils import Frame
+sys.path.append(os.getcwd())  # nopep8
+from gateway.logging.gateway_logging import GatewayLogger
+
+LOG = GatewayLogger(__file__, False)
+
+HEARTBEATS = (15000, 15000)
+MAX_BACKOFF = 60
+EOL = b'\n'
+NULL = b'\x00'
+
+# STOMP 1.2 header escapes, not applied to CONNECT and CONNECTED frames
+ENCODE = str.maketrans({'\\': '\\\\', '\n': '\\n', '\r': '\\r', ':': '\\c'})
+DECODE = {'\\\\': '\\', '\\n': '\n', '\\r': '\r', '\\c': ':'}
+ESCAPED = re.compile(r'\\.')
+
+
+def unescape(value: str) -> str:
+    """Return the header value, unescaped."""
+    if '\\' not in value:
+        return value
+    return ESCAPED.sub(lambda match: DECODE.get(match.group(0), match.group(0)), value)
+
+
+def encode_frame(cmd: str, headers: dict = None, body: bytes = b'') -> bytes:
+    """Return the frame, ready to send."""
+    escape = cmd not in ('CONNECT', 'STOMP')
+    lines = [cmd]
+    for key, value in (headers or {}).items():
+        key, value = str(key), str(value)
+        if escape:
+            key, value = key.translate(ENCODE), value.translate(ENCODE)
+        lines.append(f'{key}:{value}')
+    if body:
+        lines.append(f'content-length:{len(body)}')
+    return ('\n'.join(lines) + '\n\n').encode() + body + NULL
+
+
+async def read_frame(reader: asyncio.StreamReader, auto_decode: bool = True):
+    """Return the next frame, or None for a heartbeat."""
+    line = await reader.readuntil(EOL)
+    if line in (b'\n', b'\r\n'):
+        return None
+
+    cmd = line.rstrip(b'\r\n').decode()
+    escaped = cmd != 'CONNECTED'
+    headers = {}
+    while True:
+        line = (await reader.readuntil(EOL)).rstrip(b'\r\n').decode()
+        if not line:
+            break
+        key, _, value = line.partition(':')
+        if escaped:
+            key, value = unescape(key), unescape(value)
+        # STOMP 1.2: the first occurrence of a repeated header is used
+        headers.setdefault(key, value)
+
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+        await reader.readuntil(NULL)
+    else:
+        body = (await reader.readuntil(NULL))[:-1]
+
+    return Frame(cmd, headers, body.decode() if auto_decode else body)
+
+
+class StompClient:
+    """A STOMP 1.2 connection, calling a stomp.py listener on the event loop.
+
+    The listener is called exactly as stomp.py calls it - on_connecting,
+    on_connected, on_message, on_error, on_heartbeat, on_heartbeat_timeout
+    and on_disconnected - but from the event loop, not a receiver thread.
+    Subscriptions are replayed on each reconnection, with a backoff between
+    failed attempts.
+    """
+
+    def __init__(self, host: str, port: int, login: str, passcode: str, listener,
+                 headers: dict = None, heartbeats: Tuple[int, int] = HEARTBEATS,
+                 auto_decode: bool = True) -> None:
+        """Initialisation."""
+        self.host = host
+        self.port = port
+        self.login = login
+        self.passcode = passcode
+        self.listener = listener
+        self.headers = headers or {}
+        self.heartbeats = heartbeats
+        self.auto_decode = auto_decode
+        self.subscriptions: List[dict] = []
+        self.connected = False
+        self._writer = None
+        self._stopping = False
+
+    def subscribe(self, destination: str, id: str, ack: str = 'auto',  # pylint: disable=W0622
+                  headers: dict = None) -> None:
+        """Subscribe to the destination, now and on every reconnection."""
+        subscription = {'destination': destination, 'id': id, 'ack': ack, **(headers or {})}
+        self.subscriptions.append(subscription)
+        if self.connected:
+            self._send('SUBSCRIBE', subscription)
+
+    def _send(self, cmd: str, headers: dict = None, body: bytes = b'') -> None:
+        """Write a frame to the connection."""
+        self._writer.write(encode_frame(cmd, headers, body))
+
+    def _notify(self, event: str, *args) -> None:
+        """Call the listener, logging rather than raising its errors."""
+        func = getattr(self.listener, event, None)
+        if not func:
+            return
+        try:
+            func(*args)
+        except Exception as err:
+            LOG.logger.error('STOMP listener %s failed: %s', event, err)
+
+    async def run(self) -> None:
+        """Connect and receive until stopped, reconnecting with a backoff."""
+        backoff = 1
+        while not self._stopping:
+            try:
+                if await self._session():
+                    backoff = 1
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as err:
+                LOG.logger.error('STOMP connection to %s failed: %s', self.host, err)
+            finally:
+                self.connected = False
+                if self._writer:
+                    self._writer.close()
+                    self._writer = None
+            if self._stopping:
+                return
+            self._notify('on_disconnected')
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    async def _session(self) -> bool:
+        """A single connection; return True if it was established."""
+        reader, self._writer = await asyncio.open_connection(
+            self.host, self.port, limit=2 ** 24)
+        self._notify('on_connecting', (self.host, self.port))
+        self._send('CONNECT', {
+            'accept-version': '1.2',
+            'host': self.host,
+            'login': self.login,
+            'passcode': self.passcode,
+            'heart-beat': '{},{}'.format(*self.heartbeats),
+            **self.headers
+        })
+
+        frame = await read_frame(reader)
+        while frame is None:
+            frame = await read_frame(reader)
+        if frame.cmd != 'CONNECTED':
+            self._notify('on_error', frame)
+            return False
+
+        send, receive = self.negotiate(frame.headers.get('heart-beat', '0,0'))
+        self.connected = True
+        self._notify('on_connected', frame)
+        for subscription in self.subscriptions:
+            self._send('SUBSCRIBE', subscription)
+
+        beat = asyncio.ensure_future(self._heartbeat(send)) if send else None
+        try:
+            await self._receive(reader, receive)
+        finally:
+            if beat:
+                beat.cancel()
+        return True
+
+    def negotiate(self, server: str) -> Tuple[float, float]:
+        """Return the send and receive heartbeat intervals, in seconds."""
+        server_send, server_receive = (int(val) for val in server.split(','))
+        client_send, client_receive = self.heartbeats
+        send = max(client_send, server_receive) if client_send and server_receive else 0
+        receive = max(client_receive, server_send) if client_receive and server_send else 0
+        return send / 1000, receive / 1000
+
+    async def _heartbeat(self, interval: float) -> None:
+        """Send a heartbeat each interval."""
+        while self._writer:
+            await asyncio.sleep(interval)
+            self._writer.write(EOL)
+
+    async def _receive(self, reader: asyncio.StreamReader, interval: float) -> None:
+        """Dispatch frames until the connection closes or heartbeats stop."""
+        # allow the server twice its heartbeat interval, as stomp.py does
+        timeout = interval * 2 if interval else None
+        while not self._stopping:
+            try:
+                frame = await asyncio.wait_for(read_frame(reader, self.auto_decode), timeout)
+            except asyncio.TimeoutError:
+                self._notify('on_heartbeat_timeout')
+                return
+
+            if frame is None:
+                self._notify('on_heartbeat')
+            elif frame.cmd == 'MESSAGE':
+                self._notify('on_message', frame)
+                if frame.headers.get('ack'):
+                    self._send('ACK', {'id': frame.headers['ack']})
+            elif frame.cmd == 'ERROR':
+                self._notify('on_error', frame)
+            elif frame.cmd == 'RECEIPT' and frame.headers.get('receipt-id') == 'disconnect':
+                return
+
+    async def disconnect(self) -> None:
+        """Send DISCONNECT and stop reconnecting."""
+        self._stopping = True
+        if self._writer:
+            self._notify('on_disconnecting')
+            self._send('DISCONNECT', {'receipt': 'disconnect'})
+            await self._writer.drain()
+            self._writer.close()
@@ -0,0 +1,188 @@
+"""Capture of received STOMP frames to compressed segment files, for replay."""
+
+# pylint: disable=E0401, C0413
+
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from typing import Iterator, List, Tuple
+sys.path.append(os.getcwd())  # nopep8
+import stomp
+from prometheus_client import Counter
+from gateway.logging.gateway_logging import GatewayLogger
+
+# write each frame received to segments in this directory, empty to not capture
+CAPTURE_DIR = os.getenv('GATEWAY_CAPTURE_DIR', '')
+# start a new segment after this many seconds, or uncompressed MB
+CAPTURE_SEGMENT_SECONDS = int(os.getenv('GATEWAY_CAPTURE_SEGMENT_SECONDS', '3600'))
+CAPTURE_SEGMENT_MB = int(os.getenv('GATEWAY_CAPTURE_SEGMENT_MB', '256'))
+# frames buffered for the writer thread, further frames are dropped
+CAPTURE_QUEUE_SIZE = int(os.getenv('GATEWAY_CAPTURE_QUEUE_SIZE', '10000'))
+CAPTURE_COMPRESS_LEVEL = 6
+SEGMENT_SUFFIX = '.frames.gz'
+
+# received (epoch seconds), body is text, headers length, body length
+RECORD = struct.Struct('<d?II')
+
+LOG = GatewayLogger(__file__, False)
+
+CAPTURE_C = Counter(
+    'capture_frame_count',
+    'Frames captured: WRITTEN or DROPPED (writer queue full)',
+    ['msg']
+)
+
+
+def write_record(file, received: float, frame: stomp.utils.Frame) -> int:
+    """Write the frame as a record, return the bytes written."""
+    headers = json.dumps(frame.headers, separators=(',', ':')).encode()
+    text = isinstance(frame.body, str)
+    body = frame.body.encode() if text else bytes(frame.body or b'')
+    file.write(RECORD.pack(received, text, len(headers), len(body)))
+    file.write(headers)
+    file.write(body)
+    return RECORD.size + len(headers) + len(body)
+
+
+def read_records(file) -> Iterator[Tuple[float, stomp.utils.Frame]]:
+    """Yield the receive time and frame of each record, to the end of the file."""
+    while True:
+        prefix = file.read(RECORD.size)
+        if len(prefix) < RECORD.size:
+            return
+        received, text, headers_len, body_len = RECORD.unpack(prefix)
+        headers = json.loads(file.read(headers_len))
+        body = file.read(body_len)
+        if len(body) < body_len:
+            return
+        yield received, stomp.utils.Frame('MESSAGE', headers, body.decode() if text else body)
+
+
+def segments(paths: List[str]) -> List[str]:
+    """Return the segment files of the paths, directories expanded, in name order.
+
+    A directory's segments include any left .partial by an unclean stop.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(glob.glob(os.path.join(path, f'*{SEGMENT_SUFFIX}')))
+            found.extend(glob.glob(os.path.join(path, f'*{SEGMENT_SUFFIX}.partial')))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def read_segments(paths: List[str]) -> Iterator[Tuple[float, stomp.utils.Frame]]:
+    """Yield the receive time and frame of every record in the segments, in order.
+
+    A segment cut short, by the service stopping uncleanly, is read to the
+    last complete record.
+    """
+    for path in segments(paths):
+        with gzip.open(path, 'rb') as file:
+            try:
+                yield from read_records(file)
+            except (EOFError, OSError, ValueError, struct.error) as err:
+                LOG.logger.error('Segment %s ends early: %s', path, err)
+
+
+class FrameCapture:
+    """Write frames, with their headers and receive time, to rotated segments.
+
+    Frames are queued by the receiving thread and compressed and written on
+    a writer thread; if the writer falls CAPTURE_QUEUE_SIZE frames behind,
+    further frames are dropped rather than delay receipt. Each segment is
+    written as <name>-<start>-<pid>-<n>.frames.gz.partial and renamed once
+    complete.
+    """
+
+    def __init__(self, name: str, directory: str = CAPTURE_DIR,
+                 segment_seconds: float = CAPTURE_SEGMENT_SECONDS,
+                 segment_bytes: int = CAPTURE_SEGMENT_MB * 1024 * 1024) -> None:
+        """Initialisation."""
+        self.name = name
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.queue = queue.Queue(CAPTURE_QUEUE_SIZE)
+        self.thread = None
+        self.file = None
+        self.path = None
+        self.opened = 0
+        self.written = 0
+        self.segment = 0
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name=f'{self.name}-capture', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Write any queued frames and close the segment."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def put(self, frame: stomp.utils.Frame) -> None:
+        """Queue the frame for writing, as received now."""
+        try:
+            self.queue.put_nowait((time.time(), frame))
+        except queue.Full:
+            CAPTURE_C.labels(msg='DROPPED').inc()
+
+    def run(self) -> None:
+        """Write queued frames until stopped."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.close()
+                return
+            try:
+                self.write(*item)
+            except OSError as err:
+                LOG.logger.error('Unable to capture frame to %s: %s', self.path, err)
+                self.close()
+
+    def write(self, received: float, frame: stomp.utils.Frame) -> None:
+        """Write the frame, opening a new segment as due."""
+        if self.file and (received - self.opened >= self.segment_seconds
+                          or self.written >= self.segment_bytes):
+            self.close()
+        if not self.file:
+            self.open(received)
+        self.written += write_record(self.file, received, frame)
+        CAPTURE_C.labels(msg='WRITTEN').inc()
+
+    def open(self, received: float) -> None:
+        """Open a new segment, started at the receive time."""
+        started = time.strftime('%Y%m%dT%H%M%S', time.gmtime(received))
+        self.path = os.path.join(
+            self.directory,
+            f'{self.name}-{started}-{os.getpid()}-{self.segment:04d}{SEGMENT_SUFFIX}')
+        self.segment += 1
+        self.file = gzip.open(f'{self.path}.partial', 'wb', CAPTURE_COMPRESS_LEVEL)
+        self.opened = received
+        self.written = 0
+
+    def close(self) -> None:
+        """Close the segment, if open, renaming it as complete."""
+        if not self.file:
+            return
+        try:
+            self.file.close()
+            os.replace(f'{self.path}.partial', self.path)
+        except OSError as err:
+            LOG.logger.error('Unable to close capture segment %s: %s', self.path, err)
+        self.file = None
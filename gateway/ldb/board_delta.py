@@ -0,0 +1,105 @@
+"""Per service changes between successive LDB boards."""
+
+# pylint: disable=E0401, C0413
+
+import os
+import sys
+import time
+from typing import Dict, Optional, Tuple
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter
+
+SNAPSHOT_INTERVAL = int(os.getenv('LDB_SNAPSHOT_INTERVAL', '300'))
+SERVICE_LISTS = ('trainServices', 'busServices', 'ferryServices')
+# fields which change on every fetch, without the board changing
+IGNORED = ('generatedAt',)
+
+BOARD_UPDATE_C = Counter(
+    'ldb_board_update_count',
+    'LDB boards published whole (SNAPSHOT), as changes (DELTA) or not at all (UNCHANGED)',
+    ['msg']
+)
+
+
+def service_key(service: dict) -> str:
+    """Return the key identifying a service on the board."""
+    return service.get('serviceID') or '{}-{}-{}'.format(
+        service.get('std') or service.get('sta'),
+        service.get('operatorCode'),
+        service.get('rsid')
+    )
+
+
+def board_services(board: dict) -> Dict[str, dict]:
+    """Return every train, bus and ferry service on the board, by key."""
+    found = {}
+    for name in SERVICE_LISTS:
+        for service in (board.get(name) or {}).get('service') or []:
+            found[service_key(service)] = service
+    return found
+
+
+def changed_fields(old: dict, new: dict) -> dict:
+    """Return the fields of new which differ from old; removed fields are None."""
+    return {
+        key: new.get(key) for key in new.keys() | old.keys()
+        if key not in IGNORED and new.get(key) != old.get(key)
+    }
+
+
+def board_delta(old: dict, new: dict) -> dict:
+    """Return the services added, removed and changed between two boards."""
+    old_services = board_services(old)
+    new_services = board_services(new)
+    strip = SERVICE_LISTS + IGNORED
+
+    changed = []
+    for key, service in new_services.items():
+        previous = old_services.get(key)
+        if previous is not None and previous != service:
+            changed.append({'serviceID': key, **changed_fields(previous, service)})
+
+    return {
+        'crs': new.get('crs'),
+        'generatedAt': new.get('generatedAt'),
+        'new': [service for key, service in new_services.items() if key not in old_services],
+        'removed': [key for key in old_services if key not in new_services],
+        'changed': changed,
+        'board': changed_fields(
+            {key: val for key, val in old.items() if key not in strip},
+            {key: val for key, val in new.items() if key not in strip}
+        )
+    }
+
+
+class BoardTracker:
+    """The last board seen for a single CRS.
+
+    A board is published whole when first seen and every snapshot_interval
+    seconds after; in between only the changes are published, and nothing
+    at all if the board is unchanged.
+    """
+
+    def __init__(self, snapshot_interval: float = SNAPSHOT_INTERVAL) -> None:
+        """Initialisation."""
+        self.snapshot_interval = snapshot_interval
+        self.board = None
+        self.snapshot_at = 0
+
+    def update(self, board: dict, now: float = None) -> Optional[Tuple[str, dict]]:
+        """Return ('snapshot', board), ('delta', changes) or None if unchanged."""
+        now = time.monotonic() if now is None else now
+        previous, self.board = self.board, board
+
+        if previous is None or now - self.snapshot_at >= self.snapshot_interval:
+            self.snapshot_at = now
+            BOARD_UPDATE_C.labels(msg='SNAPSHOT').inc()
+            return 'snapshot', board
+
+        delta = board_delta(previous, board)
+        if not (delta['new'] or delta['removed'] or delta['changed'] or delta['board']):
+            BOARD_UPDATE_C.labels(msg='UNCHANGED').inc()
+            return None
+
+        BOARD_UPDATE_C.labels(msg='DELTA').inc()
+        return 'delta', delta
@@ -0,0 +1,33 @@
+"""Serialise LDB board results to compact JSON."""
+
+# pylint: disable=E0401
+
+import datetime
+import json
+from zeep.xsd.valueobjects import CompoundValue
+
+SCALARS = (str, bool, int, float, type(None))
+TEMPORAL = (datetime.datetime, datetime.date, datetime.time)
+ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def board_dict(value):
+    """Return the zeep result as plain dicts, lists and JSON scalars.
+
+    As zeep.helpers.serialize_object(value, dict), but reading each
+    CompoundValue's values directly, with dates and times as ISO 8601.
+    """
+    if isinstance(value, SCALARS):
+        return value
+    if isinstance(value, CompoundValue):
+        return {key: board_dict(val) for key, val in value.__values__.items()}
+    if isinstance(value, list):
+        return [board_dict(val) for val in value]
+    if isinstance(value, TEMPORAL):
+        return value.isoformat()
+    return value
+
+
+def board_json(board: dict) -> str:
+    """Return the board as a single compact JSON document."""
+    return ENCODER.encode({'results': board})
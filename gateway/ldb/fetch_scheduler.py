@@ -0,0 +1,100 @@
+"""Run periodic jobs concurrently, staggered across their interval."""
+
+# pylint: disable=E0401, C0413, W0718
+
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+from typing import Callable, List, Tuple
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter
+from gateway.logging.gateway_logging import GatewayLogger
+
+LOG = GatewayLogger(__file__, False)
+
+SKIPPED_C = Counter(
+    'ldb_fetch_skipped_count',
+    'Fetches skipped because the previous fetch had not finished',
+    ['job']
+)
+
+
+class RateLimiter:
+    """Allow at most rate calls per second, across every thread."""
+
+    def __init__(self, rate: float = 0) -> None:
+        """Initialisation, a rate of 0 is unlimited."""
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until the next call is allowed."""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        time.sleep(start - now)
+
+
+class Scheduler:
+    """Call each job every interval seconds, on a thread pool.
+
+    Start times are spread evenly across the interval rather than all at
+    once, and a job is skipped, not queued, while its previous call is
+    still running - so a slow upstream cannot build a backlog.
+    """
+
+    def __init__(self, jobs: List[Tuple[str, Callable]], interval: float,
+                 workers: int = 4, rate: float = 0) -> None:
+        """Initialisation."""
+        self.jobs = jobs
+        self.interval = interval
+        self.limiter = RateLimiter(rate)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix='fetch')
+        self.running = {}
+        self.stopping = threading.Event()
+
+    def call(self, name: str, job: Callable) -> None:
+        """Call the job once the rate limit allows, logging its errors."""
+        self.limiter.wait()
+        try:
+            job()
+        except Exception as err:
+            LOG.logger.error('%s failed: %s', name, err)
+
+    def tick(self, now: float, due: List[float]) -> None:
+        """Submit each job which is due, and set when it is next due."""
+        for idx, (name, job) in enumerate(self.jobs):
+            if due[idx] > now:
+                continue
+            while due[idx] <= now:
+                due[idx] += self.interval
+
+            future = self.running.get(name)
+            if future and not future.done():
+                SKIPPED_C.labels(job=name).inc()
+                continue
+            self.running[name] = self.executor.submit(self.call, name, job)
+
+    def run(self) -> None:
+        """Run the jobs until stopped."""
+        if not self.jobs:
+            return
+        start = time.monotonic()
+        step = self.interval / len(self.jobs)
+        due = [start + idx * step for idx in range(len(self.jobs))]
+        while not self.stopping.is_set():
+            now = time.monotonic()
+            self.tick(now, due)
+            self.stopping.wait(max(min(due) - time.monotonic(), 0))
+
+    def stop(self) -> None:
+        """Stop scheduling, and wait for running jobs."""
+        self.stopping.set()
+        self.executor.shutdown()
@@ -4,15 +4,21 @@
 #pylint: disable=E0401
 
 import os
+import sys
+import threading
 import time
 from datetime import datetime
-import schedule
+import requests
 from zeep import Client, Settings
 from zeep import xsd
-from zeep.plugins import HistoryPlugin
-import jsonpickle
+from zeep.cache import SqliteCache
+from zeep.transports import Transport
 from persistent_outbound_mq import OutboundMqConnection
-from prometheus_client import start_http_server, Counter
+from prometheus_client import start_http_server, Counter, Histogram
+sys.path.append(os.getcwd())  # nopep8
+from gateway.ldb.fetch_scheduler import Scheduler  # pylint: disable=C0413
+from gateway.ldb.board_delta import BoardTracker  # pylint: disable=C0413
+from gateway.ldb.board_json import ENCODER, board_dict, board_json  # pylint: disable=C0413
 
 
 CRS = os.getenv('CRS', 'CRE,PAD')
@@ -20,6 +26,14 @@ LDB_TOKEN = os.getenv('SLDB_TOKEN')
 WSDL = os.getenv('SLDB_WSDL')
 CHECK_FREQ = 20
 RMQ_EXCHANGE = 'nre-ldb'
+# >1, or LDB_RATE, fetches boards concurrently on a staggered Scheduler
+LDB_WORKERS = int(os.getenv('LDB_WORKERS', '1'))
+LDB_RATE = float(os.getenv('LDB_RATE', '0'))
+LDB_DELTA = os.getenv('LDB_DELTA', 'false').lower() == 'true'
+WSDL_CACHE = os.getenv('LDB_WSDL_CACHE')
+WSDL_CACHE_TIMEOUT = 86400
+OPERATION_TIMEOUT = 30
+TOKEN_NS = '{http://thalesgroup.com/RTTI/2013-11-28/Token/types}'
 
 if None in (LDB_TOKEN, WSDL):
     MSG = "Missing environment variables"
@@ -37,6 +51,49 @@ MSG_COUNT_BY_CRS = Counter(
     ['msg']
 )
 
+FETCH_LATENCY = Histogram(
+    'ldb_fetch_latency',
+    'Seconds to fetch and publish a board, by CRS',
+    ['crs'],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 10, 20, 30)
+)
+
+CLIENT = None
+TOKEN_HEADER = None
+CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> Client:
+    """Return the shared SOAP client, parsing the WSDL on first use"""
+
+    global CLIENT, TOKEN_HEADER  # pylint: disable=W0603
+    with CLIENT_LOCK:
+        if not CLIENT:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max(LDB_WORKERS, 1)
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+            transport = Transport(
+                session=session,
+                cache=SqliteCache(path=WSDL_CACHE, timeout=WSDL_CACHE_TIMEOUT) if WSDL_CACHE else None,
+                operation_timeout=OPERATION_TIMEOUT
+            )
+            CLIENT = Client(wsdl=WSDL, transport=transport, settings=Settings(strict=False))
+
+            header = xsd.Element(
+                f'{TOKEN_NS}AccessToken',
+                xsd.ComplexType([
+                    xsd.Element(f'{TOKEN_NS}TokenValue', xsd.String()),
+                ])
+            )
+            TOKEN_HEADER = header(TokenValue=LDB_TOKEN)
+        return CLIENT
+
+
 class SoapConnection(OutboundMqConnection):
     """Fetch the LDB Data"""
 
@@ -46,6 +103,7 @@ class SoapConnection(OutboundMqConnection):
         """Initialisation"""
 
         self.crs = crs
+        self.tracker = BoardTracker()
         super().__init__(RMQ_EXCHANGE)
 
         self.instances.append(self)
@@ -57,17 +115,7 @@ class SoapConnection(OutboundMqConnection):
             datetime.now().replace(second=0, microsecond=0).time()
         )
 
-        history = HistoryPlugin()
-        client = Client(wsdl=WSDL, plugins=[history], settings=Settings(strict=False))
-        header = xsd.Element(
-            '{http://thalesgroup.com/RTTI/2013-11-28/Token/types}AccessToken',
-            xsd.ComplexType([
-                xsd.Element(
-                    '{http://thalesgroup.com/RTTI/2013-11-28/Token/types}TokenValue',
-                    xsd.String()),
-            ])
-        )
-        header_value = header(TokenValue=LDB_TOKEN)
+        client = get_client()
 
         ALL_MSG_COUNT.labels(msg='LDB').inc()
         MSG_COUNT_BY_CRS.labels(msg=self.crs).inc()
@@ -77,38 +125,53 @@ class SoapConnection(OutboundMqConnection):
             timeWindow=120,
             numRows=100,
             crs=self.crs,
-            _soapheaders=[header_value]
+            _soapheaders=[TOKEN_HEADER]
         )
 
     def post_to_broker(self, data: dict):  # pylint: disable=R0914
         """Post to the RMQ Broker"""
 
-        self.send_msg(
-            {'results': jsonpickle.encode(data, unpicklable=False)},
-            headers={
-                'crs': self.crs
-            }
-        )
+        board = board_dict(data)
+        headers = {'crs': self.crs}
+        if LDB_DELTA:
+            update = self.tracker.update(board)
+            if not update:
+                return
 
-    @staticmethod
-    def get_update():
-        """For each instance, fetch the data and post on the broker"""
+            kind, delta = update
+            headers['type'] = kind
+            if kind == 'delta':
+                self.send_msg(ENCODER.encode(delta), headers=headers, raw=True)
+                return
 
-        for instance in SoapConnection.instances:
-            data = instance.fetch()
+        self.send_msg(board_json(board), headers=headers, raw=True)
 
-            instance.post_to_broker(data)
+    def update(self):
+        """Fetch the data and post on the broker, timing both"""
+
+        started = time.monotonic()
+        self.post_to_broker(self.fetch())
+        FETCH_LATENCY.labels(crs=self.crs).observe(time.monotonic() - started)
 
 
 if __name__ == "__main__":
 
     start_http_server(8000)
+    get_client()
 
     for entry in CRS.split(','):
         SoapConnection(entry)
 
-    schedule.every(CHECK_FREQ).seconds.do(SoapConnection.get_update)
-
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    if LDB_WORKERS > 1 or LDB_RATE:
+        Scheduler(
+            [(inst.crs, inst.update) for inst in SoapConnection.instances],
+            interval=CHECK_FREQ,
+            workers=LDB_WORKERS,
+            rate=LDB_RATE
+        ).run()
+    else:
+        # fetch each board in turn, then wait CHECK_FREQ seconds
+        while True:
+            for inst in SoapConnection.instances:
+                inst.update()
+            time.sleep(CHECK_FREQ)
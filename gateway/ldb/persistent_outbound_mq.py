@@ -9,6 +9,10 @@ import sys
 import logging
 import time
 import pika
+sys.path.append(os.getcwd())  # nopep8
+from gateway.rabbitmq.spool import (  # pylint: disable=C0413
+    SPOOL_DIR, SpooledPublisher, open_spool, orphan_spools
+)
 
 HEARTBEAT = 30
 TIMEOUT = 300
@@ -33,6 +37,11 @@ class OutboundMqConnection:
         self._channel = None
         self._connection = None
 
+        self._spooled = None
+        if SPOOL_DIR:
+            self._spooled = SpooledPublisher(
+                open_spool(exchange), self.publish_spooled, orphan_spools(exchange))
+
     @staticmethod
     def setup_logger(logger_obj) -> object:
         """Returns a logger based on the one passed at init, or a default"""
@@ -170,6 +179,9 @@ class OutboundMqConnection:
     def send_msg(self, msg: dict, headers=None, raw=False, attempt=1) -> bool:
         """ This function publishes the msg to the broker """
 
+        if self._spooled:
+            return self._spooled.send(msg if raw else json.dumps(msg), headers)
+
         if not self._channel or not self._channel.is_open:
             self.manage_connection()
 
@@ -190,6 +202,19 @@ class OutboundMqConnection:
 
                 return False
 
-            self.send_msg(msg, headers=headers, raw=True, attempt=(attempt + 1))
-        else:
-            return True
\ No newline at end of file
+            return self.send_msg(msg, headers=headers, raw=True, attempt=(attempt + 1))
+
+        return True
+
+    def publish_spooled(self, msg: str, headers=None, _routing_key='') -> bool:
+        """Makes a single publish attempt for the spool, without waiting"""
+
+        if not self._channel or not self._channel.is_open:
+            if not self.create_connection():
+                return False
+
+        if self.publish_message(msg, headers):
+            return True
+
+        self.close_connection()
+        return False
\ No newline at end of file
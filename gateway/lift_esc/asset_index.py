@@ -0,0 +1,113 @@
+"""Index of lift and escalator assets, detecting status changes."""
+
+# pylint: disable=E0401, C0413
+
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter, Gauge
+
+SNAPSHOT_INTERVAL = int(os.getenv('LIFT_ESC_SNAPSHOT_INTERVAL', '300'))
+STATUS_FIELDS = ('status', 'isolated', 'engineerOnSite', 'independent')
+ASSET_FIELDS = ('id', 'sensorId', 'crs', 'type', 'displayName')
+
+ASSET_EVENT_C = Counter(
+    'lift_esc_event_count',
+    'Lift & escalator asset events: NEW, CHANGED or REMOVED',
+    ['msg']
+)
+
+ASSET_G = Gauge(
+    'lift_esc_assets',
+    'Lift & escalator assets indexed'
+)
+
+
+def asset_key(asset: dict) -> str:
+    """Return the key identifying the asset."""
+    return str(asset.get('id') or asset.get('sensorId'))
+
+
+def asset_status(asset: dict) -> dict:
+    """Return the tracked status fields of the asset."""
+    status = asset.get('status')
+    if isinstance(status, list):
+        status = status[0] if status else None
+    status = status or {}
+    return {field: status.get(field) for field in STATUS_FIELDS}
+
+
+def routing_key(asset: dict) -> str:
+    """Return the routing key for the asset's events - <crs>.<id>."""
+    return '.'.join(
+        str(asset.get(field) or '').replace('.', '_') for field in ('crs', 'id')
+    )
+
+
+def asset_event(event: str, asset: dict, status: dict, previous: dict = None) -> dict:
+    """Return an event for the asset."""
+    body = {'event': event, **{field: asset.get(field) for field in ASSET_FIELDS}}
+    body['status'] = status
+    if previous is not None:
+        body['previous'] = previous
+        body['changed'] = [field for field in STATUS_FIELDS if status[field] != previous[field]]
+    return body
+
+
+class AssetIndex:
+    """The last status of every asset, by id.
+
+    Each update returns an event for every asset which is new, has changed
+    status, or is no longer reported, and a compacted snapshot of every
+    asset's latest state is due every snapshot_interval seconds.
+    """
+
+    def __init__(self, snapshot_interval: float = SNAPSHOT_INTERVAL) -> None:
+        """Initialisation."""
+        self.snapshot_interval = snapshot_interval
+        self.assets: Dict[str, dict] = {}
+        self.status: Dict[str, dict] = {}
+        self.snapshot_at: Optional[float] = None
+
+    def update(self, assets: List[dict]) -> List[dict]:
+        """Index the assets, return the events since the last update."""
+        first = not self.assets
+        events = []
+        seen = {}
+        for asset in assets:
+            key = asset_key(asset)
+            seen[key] = asset
+            status = asset_status(asset)
+            previous = self.status.get(key)
+            if previous is None:
+                if not first:
+                    events.append(asset_event('new', asset, status))
+            elif previous != status:
+                events.append(asset_event('changed', asset, status, previous))
+            self.status[key] = status
+
+        for key in [key for key in self.assets if key not in seen]:
+            events.append(asset_event('removed', self.assets[key], self.status.pop(key)))
+
+        self.assets = seen
+        ASSET_G.set(len(seen))
+        for event in events:
+            ASSET_EVENT_C.labels(msg=event['event'].upper()).inc()
+        return events
+
+    def snapshot_due(self, now: float = None) -> bool:
+        """Return True, and restart the interval, if a snapshot is due."""
+        now = time.monotonic() if now is None else now
+        if self.snapshot_at is not None and now - self.snapshot_at < self.snapshot_interval:
+            return False
+        self.snapshot_at = now
+        return True
+
+    def snapshot(self) -> List[dict]:
+        """Return every asset, compacted to its identity and tracked status."""
+        return [
+            {**{field: asset.get(field) for field in ASSET_FIELDS}, 'status': self.status[key]}
+            for key, asset in self.assets.items()
+        ]
@@ -4,28 +4,54 @@
 
 import json
 import time
+from typing import Tuple
 import schedule
 import requests
 import os
 import sys
 sys.path.append(os.getcwd())  # nopep8
 from gateway.logging.gateway_logging import GatewayLogger
-from gateway.rabbitmq.publish import OutboundConnection
-from prometheus_client import start_http_server, Counter
+from gateway.rabbitmq.publish import OutboundConnection, get_outbound_connection
+from gateway.lift_esc.asset_index import AssetIndex, routing_key
+from prometheus_client import start_http_server, Counter, Histogram
 
 CHECK_FREQ = 30
 
 LOG = GatewayLogger(__file__, False)
 RMQ_EXCHANGE = 'lift-esc-status'
+LIFT_ESC_DELTA = os.getenv('LIFT_ESC_DELTA', 'false').lower() == 'true'
 URI = "https://nr-lift-and-escalator.azure-api.net/graphql/v2"
 KEY = os.getenv('LNE_P_KEY', '')
 AUTH_URL = "https://nr-lift-and-escalator.azure-api.net/auth/token/"
+# the token lifetime when the auth response does not give expires_in
+TOKEN_LIFETIME = int(os.getenv('LIFT_ESC_TOKEN_LIFETIME', '3600'))
+# refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 120
+TIMEOUT = 30
 
 ALL_MESSAGE_C = Counter(
     'lift_esc_total',
     'Inbound Lift & Escalator Message Count',
     ['msg'])
 
+TOKEN_C = Counter(
+    'lift_esc_token_count',
+    'Lift & Escalator bearer tokens: REFRESHED, FAILED or REJECTED (401)',
+    ['msg'])
+
+FETCH_LATENCY = Histogram(
+    'lift_esc_fetch_latency',
+    'Seconds to fetch the Lift & Escalator assets',
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 10, 20, 30)
+)
+
+FETCH_BYTES = Histogram(
+    'lift_esc_fetch_bytes',
+    'Size of the Lift & Escalator assets response, as received and decoded',
+    ['msg'],
+    buckets=(1e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+)
+
 QRY = """
 query {
 	assets {
@@ -48,23 +74,38 @@ query {
 }
 """
 
-def get_auth() -> str:
-    """Returns the authentication token"""
+def get_session() -> requests.Session:
+    """Return a session keeping the connection to the API alive between polls"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+
+def request_token(session: requests.Session = None) -> Tuple[str, float]:
+    """Return the authentication token and its lifetime in seconds"""
     payload = {}
     headers = {
         'x-lne-api-key': KEY,
         'Cache-Control': 'no-cache'
     }
     try:
-        response = requests.request(
-            "POST", 
+        response = (session or requests).request(
+            "POST",
             AUTH_URL,
             headers=headers,
             data=payload,
-            timeout=30)
-        return json.loads(response.text).get('access_token', "")
+            timeout=TIMEOUT)
+        body = json.loads(response.text)
+        return body.get('access_token', ""), float(body.get('expires_in') or TOKEN_LIFETIME)
     except Exception:
-        return ""
+        return "", 0
+
+
+def get_auth() -> str:
+    """Returns the authentication token"""
+    return request_token()[0]
 
 
 class LiftEscStatus(OutboundConnection):
@@ -74,12 +115,20 @@ class LiftEscStatus(OutboundConnection):
         """Initialisation"""
 
         super().__init__(RMQ_EXCHANGE)
-        self.bearer_token = get_auth()
+        self.session = get_session()
+        self.bearer_token = ""
+        self.token_expires = 0
+        self.etag = None
         self.lne_headers = {
             'Content-Type': 'application/json',
-            'x-lne-api-key': KEY,
-            'Authorization': f'Bearer {self.bearer_token}'
+            'x-lne-api-key': KEY
         }
+        self.refresh_token()
+        self.index = None
+        self.events = None
+        if LIFT_ESC_DELTA:
+            self.index = AssetIndex()
+            self.events = get_outbound_connection(f'{RMQ_EXCHANGE}-events', 'topic')
 
     def process(self, data: list) -> None:
         """Process the inbound message"""
@@ -96,40 +145,102 @@ class LiftEscStatus(OutboundConnection):
             json.dumps(data)
         )
 
+    def put_changes_on_broker(self, data: list):
+        """Put an event per changed asset, and any due snapshot, on the broker"""
+
+        for event in self.index.update(data):
+            self.events.send_message(
+                json.dumps(event, separators=(',', ':')),
+                routing_key=routing_key(event)
+            )
+
+        if self.index.snapshot_due():
+            self.send_message(
+                json.dumps(self.index.snapshot(), separators=(',', ':')),
+                headers={'type': 'snapshot'}
+            )
+
+    def refresh_token(self) -> bool:
+        """Fetch a new bearer token, return False if none was given"""
+
+        token, lifetime = request_token(self.session)
+        if not token:
+            TOKEN_C.labels(msg='FAILED').inc()
+            LOG.logger.error('Unable to fetch a bearer token')
+            self.token_expires = 0
+            return False
+
+        TOKEN_C.labels(msg='REFRESHED').inc()
+        self.bearer_token = token
+        self.token_expires = time.monotonic() + lifetime
+        self.lne_headers['Authorization'] = f'Bearer {token}'
+        return True
+
+    def post_query(self) -> requests.Response:
+        """Post the assets query, refreshing the token when due or rejected"""
+
+        if time.monotonic() >= self.token_expires - TOKEN_REFRESH_MARGIN:
+            self.refresh_token()
+
+        headers = dict(self.lne_headers)
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+
+        started = time.monotonic()
+        response = self.session.post(URI, headers=headers, json={'query': QRY}, timeout=TIMEOUT)
+        if response.status_code == 401:
+            TOKEN_C.labels(msg='REJECTED').inc()
+            if self.refresh_token():
+                headers['Authorization'] = self.lne_headers['Authorization']
+                response = self.session.post(
+                    URI, headers=headers, json={'query': QRY}, timeout=TIMEOUT)
+        FETCH_LATENCY.observe(time.monotonic() - started)
+
+        received = response.headers.get('Content-Length')
+        if received:
+            FETCH_BYTES.labels(msg='received').observe(int(received))
+        FETCH_BYTES.labels(msg='decoded').observe(len(response.content))
+        return response
+
     def fetch(self):
         """Fetch from the API, place on broker"""
 
-        response = requests.post(
-            URI,
-            headers=self.lne_headers,
-            json={'query': QRY},
-            timeout=30
-        )
+        response = self.post_query()
+
+        if response.status_code == 304:
+            ALL_MESSAGE_C.labels(msg='unchanged').inc()
+            if LIFT_ESC_DELTA and self.index.assets:
+                self.put_changes_on_broker(list(self.index.assets.values()))
+            return
 
         if not response.status_code == 200:
-            LOG.logger.error(f"Warning - Status Code: {response.status_code}")
+            LOG.logger.error("Warning - Status Code: %s", response.status_code)
             return
 
         data = json.loads(response.text).get('data', {})
         data = data.get('assets', {})
         if not data:
-            LOG.logger.error(f'Missing data: {response.text}')
+            LOG.logger.error('Missing data: %s', response.text)
             return
 
         if not isinstance(data, list):
-            LOG.logger.error(f'Missing data: {response.text}')
+            LOG.logger.error('Missing data: %s', response.text)
             return
 
+        self.etag = response.headers.get('ETag')
         ALL_MESSAGE_C.labels(msg='all').inc()
 
         self.process(data)
+        if LIFT_ESC_DELTA:
+            self.put_changes_on_broker(data)
+            return
         self.put_on_broker(data)
 
 
 if __name__ == "__main__":
 
     start_http_server(8000)
-    LOG.logger.error(f'{__file__} Running...')
+    LOG.logger.error('%s Running...', __file__)
     LIFTESC = LiftEscStatus()
 
     schedule.every(CHECK_FREQ).seconds.do(LIFTESC.fetch)
@@ -1,15 +1,180 @@
 """Global logger object."""
 
+import atexit
+import json
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+import time
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 import logging
+from prometheus_client import Counter
 
 LOG_DIR = os.getenv('LOG_DIR')
 LOG_LEVEL = os.getenv('LOG_LEVEL')
+# write log records to file on a background thread
+LOG_ASYNC = os.getenv('LOG_ASYNC', 'false').lower() == 'true'
+# records buffered for the background thread, further records are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# identical records written per LOG_RATE_WINDOW seconds, 0 for no limit
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '0'))
+LOG_RATE_WINDOW = float(os.getenv('LOG_RATE_WINDOW', '60'))
+# 'text' or 'json', a JSON object per line for promtail
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# context given as extra, written as fields of JSON records
+CONTEXT_FIELDS = ('topic', 'msg_type', 'trust_id', 'td_area')
+
+LOG_DROPPED_C = Counter(
+    'log_record_dropped_count',
+    'Log records dropped: QUEUE_FULL or RATE_LIMITED',
+    ['msg']
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as a single line JSON object."""
+
+    converter = time.gmtime
+
+    def __init__(self, service: str) -> None:
+        """Initialisation."""
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Return the record as JSON, with any context fields it was given."""
+        body = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + '.%03dZ' % record.msecs,
+            'level': record.levelname,
+            'service': self.service,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                body[field] = value
+        if record.exc_info:
+            body['exc'] = self.formatException(record.exc_info)
+        return json.dumps(body, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most limit identical records per window seconds.
+
+    Records are identical if they share a rate_key (given as extra), or
+    otherwise the same logger, level and message template. The first record
+    passed after some were suppressed notes how many.
+    """
+
+    def __init__(self, limit: int, window: float) -> None:
+        """Initialisation."""
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.seen = {}
+
+    @staticmethod
+    def key(record: logging.LogRecord):
+        """Return the key identifying identical records."""
+        rate_key = getattr(record, 'rate_key', None)
+        if rate_key is not None:
+            return rate_key
+        msg = record.msg if isinstance(record.msg, str) else type(record.msg).__name__
+        return record.name, record.levelno, msg
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return False if the record is to be suppressed."""
+        key = self.key(record)
+        now = time.monotonic()
+        with self.lock:
+            started, count, suppressed = self.seen.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.limit:
+                self.seen[key] = started, count, suppressed + 1
+                LOG_DROPPED_C.labels(msg='RATE_LIMITED').inc()
+                return False
+            self.seen[key] = started, count + 1, 0
+
+        if suppressed:
+            record.msg = f'{record.getMessage()} [{suppressed} similar records suppressed]'
+            record.args = None
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue records for the process log writer, dropping them when it is full."""
+
+    def __init__(self, target: logging.Handler) -> None:
+        """Initialisation."""
+        super().__init__(None)
+        self.target = target
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue the record, with the handler to write it."""
+        try:
+            get_log_writer().queue.put_nowait((self.target, record))
+        except queue.Full:
+            LOG_DROPPED_C.labels(msg='QUEUE_FULL').inc()
+
+
+class LogWriter(QueueListener):
+    """Write queued records, each to its own handler."""
+
+    def handle(self, record) -> None:
+        """Write a (handler, record) pair taken from the queue."""
+        target, record = record
+        if record.levelno >= target.level:
+            target.handle(record)
+
+    def enqueue_sentinel(self) -> None:
+        """Wait for room, rather than raise, if the queue is full on stopping."""
+        self.queue.put(self._sentinel)
+
+
+LOG_WRITER = None
+LOG_WRITER_LOCK = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """Return the process log writer, starting it on first use."""
+    global LOG_WRITER  # pylint: disable=W0603
+    with LOG_WRITER_LOCK:
+        if LOG_WRITER is None:
+            LOG_WRITER = LogWriter(queue.Queue(LOG_QUEUE_SIZE))
+            LOG_WRITER.start()
+        return LOG_WRITER
+
+
+def stop_log_writer() -> None:
+    """Write any queued records and stop the log writer."""
+    global LOG_WRITER  # pylint: disable=W0603
+    with LOG_WRITER_LOCK:
+        if LOG_WRITER is not None:
+            LOG_WRITER.stop()
+            LOG_WRITER = None
+
+
+def reset_log_writer() -> None:
+    """Forget the parent's log writer in a forked child."""
+    global LOG_WRITER, LOG_WRITER_LOCK  # pylint: disable=W0603
+    LOG_WRITER = None
+    LOG_WRITER_LOCK = threading.Lock()
+
+
+atexit.register(stop_log_writer)
+os.register_at_fork(after_in_child=reset_log_writer)
 
 
 class GatewayLogger():
-    """A representation of a logging object."""
+    """A representation of a logging object.
+
+    The log file handler is added on first use of the logger, so a module
+    imported only for its functions - as a spawned worker process imports
+    its parent's main module - opens no log file.
+    """
 
     def __init__(self, file: str, root=True):
         """Initialisation."""
@@ -20,30 +185,47 @@ class GatewayLogger():
         else:
             self._logger = logging.getLogger(self.log_name.replace('.log', ''))
 
-        self._logger.setLevel(LOG_LEVEL)
-
         self.logger_filename = os.path.join(
             LOG_DIR,
             self.log_name
         )
+        self._lock = threading.Lock()
+        self._handler = None
 
-        file_handler = TimedRotatingFileHandler(
-            self.logger_filename,
-            when='midnight',
-            interval=1
-        )
+    def add_handler(self) -> None:
+        """Set the level and add the rotating file handler, once."""
+        with self._lock:
+            if self._handler is not None:
+                return
+            self._logger.setLevel(LOG_LEVEL)
 
-        file_handler.suffix = "%Y%m%d"
+            file_handler = TimedRotatingFileHandler(
+                self.logger_filename,
+                when='midnight',
+                interval=1
+            )
 
-        log_format = logging.Formatter(
-            '%(name)s - %(asctime)s - %(message)s', '%d-%b-%y %H:%M:%S'
-        )
+            file_handler.suffix = "%Y%m%d"
+
+            if LOG_FORMAT == 'json':
+                log_format = JsonFormatter(self.log_name.replace('.log', ''))
+            else:
+                log_format = logging.Formatter(
+                    '%(name)s - %(asctime)s - %(message)s', '%d-%b-%y %H:%M:%S'
+                )
+
+            file_handler.setFormatter(log_format)
 
-        file_handler.setFormatter(log_format)
+            handler = BoundedQueueHandler(file_handler) if LOG_ASYNC else file_handler
+            if LOG_RATE_LIMIT:
+                handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_WINDOW))
 
-        self._logger.addHandler(file_handler)
+            self._logger.addHandler(handler)
+            self._handler = handler
 
     @property
     def logger(self):
         """Return the loging object."""
+        if self._handler is None:
+            self.add_handler()
         return self._logger
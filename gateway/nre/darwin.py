@@ -2,8 +2,6 @@
 
 #pylint: disable=no-self-use, no-member, too-few-public-methods, catching-non-exception, import-error, wrong-import-position
 
-import inspect
-import json
 import os
 import signal
 import socket
@@ -16,15 +14,16 @@ from functools import partial
 
 import pydantic
 import stomp
-import xmltodict
 from prometheus_client import Counter, Histogram, start_http_server
 
-CURRENT_DIR = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-PARENT_DIR = os.path.dirname(CURRENT_DIR)
-sys.path.insert(0, PARENT_DIR)
+sys.path.append(os.getcwd())  # nopep8
 
-from rabbitmq.publish import OutboundConnection
+from gateway.rabbitmq.publish import get_outbound_connection
+from gateway.nre.push_port import MESSAGE_FILTERS, parse_update, serialise_update
+from gateway.nre.frame_pool import FramePool, DARWIN_WORKERS
+from gateway.capture import FrameCapture, CAPTURE_DIR
 from gateway.logging.gateway_logging import GatewayLogger
+from gateway.validation import trusted_internal
 
 ALL_MESSAGE_C = Counter(
     'darwin_inbound',
@@ -41,6 +40,12 @@ DARWIN_CON_VARS = {
     'darwin_port': os.getenv('DARWIN_PORT')
 }
 
+# Publish each uR whole, to the fanout exchange for its MessageType
+DARWIN_ENVELOPES = os.getenv('DARWIN_ENVELOPES', 'true').lower() == 'true'
+
+# Publish each record of a uR, with a routing key, to a topic exchange
+DARWIN_SPLIT = os.getenv('DARWIN_SPLIT', 'false').lower() == 'true'
+
 MESSAGE_PROC = {
     'LO': 'process_loading',
     'TO': 'process_train_order',
@@ -52,63 +57,51 @@ MESSAGE_PROC = {
     'NO': 'process_notifications'
 }
 
-RMQ = {
-    'LO': OutboundConnection('darwin-loading'),
-    'TO': OutboundConnection('darwin-train-order'),
-    'AS': OutboundConnection('darwin-associations'),
-    'SF': OutboundConnection('darwin-formations'),
-    'TS': OutboundConnection('darwin-train-status'),
-    'OW': OutboundConnection('darwin-station-messages'),
-    'NO': OutboundConnection('darwin-notifications'),
-    'SC': OutboundConnection('darwin-schedule'),
+EXCHANGES = {
+    'LO': 'darwin-loading',
+    'TO': 'darwin-train-order',
+    'AS': 'darwin-associations',
+    'SF': 'darwin-formations',
+    'TS': 'darwin-train-status',
+    'OW': 'darwin-station-messages',
+    'NO': 'darwin-notifications',
+    'SC': 'darwin-schedule',
 }
 
+# outbound connections by message type, see open_connections
+RMQ = {}
+RECORD_RMQ = {}
+
+RECORD_C = Counter(
+    'darwin_records',
+    'Darwin uR records published individually',
+    ['msg'])
+
 ALL_MESSAGE_L = Histogram(
     'darwin_inbound_message_latency',
     'Inbound DARWIN message latency')
 
-MESSAGE_FILTERS = {
-    'LO': [
-        ('@', ''),
-        ('ns6:', ''),
-        ('#text', 'value')
-    ],
-    'TO': [
-        ('@', ''),
-        ('ns9:', ''),
-        ('#text', 'value')
-    ],
-    'AS': [
-        ('@', ''),
-        ('ns3:', ''),
-        ('#text', 'value')
-    ],
-    'SC': [
-        ('@', ''),
-        ('ns2:', '')
-    ],
-    'SF': [
-        ('@', ''),
-        ('ns4:', ''),
-    ],
-    'TS': [
-        ('@', ''),
-        ('ns5:', ''),
-        ('#text', 'value')
-    ],
-    'OW': [
-        ('@', ''),
-        ('ns7:', ''),
-        ('#text', 'msg')
-    ],
-    'NO': [
-        ('@', ''),
-        ('ns8:', ''),
-    ]
-}
-
 LOG = GatewayLogger(__file__, False)
 
+
+def open_connections() -> None:
+    """Open the outbound connections for each message type, as configured.
+
+    Not on import: spawned FramePool workers import this module, as their
+    parent's main module, and must not open connections or spools.
+    """
+    if DARWIN_ENVELOPES:
+        RMQ.update({
+            msg_type: get_outbound_connection(exchange)
+            for msg_type, exchange in EXCHANGES.items()
+        })
+    if DARWIN_SPLIT:
+        RECORD_RMQ.update({
+            msg_type: get_outbound_connection(f'{exchange}-records', 'topic')
+            for msg_type, exchange in EXCHANGES.items()
+        })
+
+
 if None in DARWIN_CON_VARS.values():
     raise ValueError('Environment variables not set')
 
@@ -123,8 +116,18 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
         title='The STOMP connection'
     )
 
+    pool: FramePool = pydantic.Field(
+        title='Optional process pool, decompressing and parsing frames',
+        default=None
+    )
+
+    capture: FrameCapture = pydantic.Field(
+        title='Optional capture of each frame received, per GATEWAY_CAPTURE_DIR',
+        default=None
+    )
+
     @staticmethod
-    @pydantic.validate_arguments(config=dict(arbitrary_types_allowed=True))
+    @trusted_internal(config=dict(arbitrary_types_allowed=True))
     def log_msg_latency(frame: stomp.utils.Frame) -> float:
         """Return the message latency as a float."""
         now = datetime.now().timestamp() * 1000
@@ -133,44 +136,33 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
             (now - timestamp) / 1000
         )
 
-    @staticmethod
-    @pydantic.validate_arguments
-    def filter_raw(dump: str, filters: list) -> str:
-        """Filter the string based on the filters passed"""
-        for filt in filters:
-            dump = dump.replace(*filt)
-        return dump
-
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def format_darwin_message(cls, message: bytes, filters: list) -> dict:
         """format and filter the darwin message"""
         try:
-            dump = json.dumps(xmltodict.parse(message)['Pport']['uR'])
-            dump = cls.filter_raw(dump, filters)
-            return json.loads(dump)
+            return parse_update(message, filters)
         except KeyError as err:
-            LOG.logger.error(err)
-            LOG.logger.error(message)
+            LOG.logger.error('Unable to parse message, missing %s\n%s', err, message)
             return {}
 
     @pydantic.validate_arguments(config={'arbitrary_types_allowed': True})
     def on_error(self, frame: stomp.utils.Frame) -> None:
         """STOMP Error Frame Received."""
         LOG.logger.error('STOMP error frame received')
-        LOG.logger.error(str(frame.headers))
-        LOG.logger.error(str(frame.body))
+        LOG.logger.error('%s', frame.headers)
+        LOG.logger.error('%s', frame.body)
 
-    @pydantic.validate_arguments(config={'arbitrary_types_allowed': True})
+    @trusted_internal(config={'arbitrary_types_allowed': True})
     def on_message(self, frame: stomp.utils.Frame) -> None:
         """Called when a message is received from the broker."""
 
+        if self.capture:
+            self.capture.put(frame)
+
         msg_type = frame.headers['MessageType']
         filters = MESSAGE_FILTERS.get(msg_type, [])
 
-        # decompress the message body & convert to dict
-        msg = zlib.decompress(frame.body, zlib.MAX_WBITS|32)
-
         # Check for a valid handler
         func = MESSAGE_PROC.get(msg_type, None)
         if not func:
@@ -183,12 +175,38 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
         # Log latency
         self.log_msg_latency(frame)
 
+        if self.pool:
+            self.pool.submit(msg_type, frame.body)
+            return
+
+        # decompress the message body & convert to dict
+        msg = zlib.decompress(frame.body, zlib.MAX_WBITS|32)
+
         # format the message
         msg = self.format_darwin_message(msg, filters)
 
         # Send to RMQ
-        if msg:
-            RMQ[msg_type].send_message(json.dumps(msg))
+        self.publish(msg_type, *serialise_update(msg, DARWIN_ENVELOPES, DARWIN_SPLIT))
+
+    @staticmethod
+    def publish(msg_type: str, body: str, records: list) -> None:
+        """Publish the serialised uR, and each of its serialised records."""
+        if body:
+            RMQ[msg_type].send_message(body)
+
+        for record_type, key, record in records:
+            RECORD_C.labels(msg=record_type).inc()
+            RECORD_RMQ[record_type].send_message(record, routing_key=key)
+
+    def start_pool(self) -> None:
+        """Decompress and parse frames in worker processes, not the receiver thread."""
+        self.pool = FramePool(self.publish, DARWIN_ENVELOPES, DARWIN_SPLIT)
+        self.pool.start()
+
+    def start_capture(self) -> None:
+        """Capture each frame received to segments in GATEWAY_CAPTURE_DIR."""
+        self.capture = FrameCapture('darwin')
+        self.capture.start()
 
     def on_heartbeat_timeout(self):
         """Called when a STOMP heartbeat is not RX at the expected interval."""
@@ -202,7 +220,7 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
     def on_connected(self, frame: stomp.utils.Frame):
         """Called when a STOMP Connection is made with the server."""
         LOG.logger.debug('STOMP Connection made')
-        LOG.logger.debug(str(frame.headers))
+        LOG.logger.debug('%s', frame.headers)
 
     def on_connecting(self, host_and_port: tuple) -> None:
         """Called when a TCP/IP connection is made to the server."""
@@ -267,7 +285,12 @@ class DarwinConnection(pydantic.BaseModel):
                 heartbeats=(15000, 15000),
                 auto_decode=False
             )
-            self.conn.set_listener('', Listener(conn=self.conn))
+            listener = Listener(conn=self.conn)
+            if DARWIN_WORKERS:
+                listener.start_pool()
+            if CAPTURE_DIR:
+                listener.start_capture()
+            self.conn.set_listener('', listener)
         except stomp.exception as err:
             LOG.logger.error('Unable to define STOMP TCP/IP Connection: %s', err)
             sys.exit(1)
@@ -337,15 +360,21 @@ class SignalHandler:
         obj.conn.disconnect()
         LOG.logger.error('DARWIN connection closed')
 
+        # Publish frames already received
+        listener = obj.conn.get_listener('')
+        if listener and listener.pool:
+            listener.pool.stop()
+
         # Disconnect from rabbitMQ
-        for msg, conn in RMQ.items():
-            conn.close_connection(conn)
+        for msg, conn in list(RMQ.items()) + list(RECORD_RMQ.items()):
+            conn.close_connection()
             LOG.logger.error('RMQ Connection for %s closed', msg)
 
         sys.exit(0)
 
 if __name__ == "__main__":
     start_http_server(8000)
+    open_connections()
     DARWIN = DarwinConnection()
     signal.signal(signal.SIGTERM, partial(SignalHandler.handler, DARWIN))
     DARWIN.connect_and_subscribe()
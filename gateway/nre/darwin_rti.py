@@ -2,7 +2,6 @@
 
 #pylint: disable=no-member, too-few-public-methods, catching-non-exception, import-error, wrong-import-position
 
-import inspect
 import os
 import signal
 import socket
@@ -16,12 +15,11 @@ import pydantic
 import stomp
 from prometheus_client import Counter, Histogram, start_http_server
 
-CURRENT_DIR = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-PARENT_DIR = os.path.dirname(CURRENT_DIR)
-sys.path.insert(0, PARENT_DIR)
+sys.path.append(os.getcwd())  # nopep8
 
-from rabbitmq.publish import OutboundConnection
+from gateway.rabbitmq.publish import get_outbound_connection
 from gateway.logging.gateway_logging import GatewayLogger
+from gateway.validation import trusted_internal
 
 ALL_MESSAGE_C = Counter(
     'darwin_rti_inbound',
@@ -29,15 +27,16 @@ ALL_MESSAGE_C = Counter(
     ['msg'])
 
 RMQ = {
-    'RTI': OutboundConnection('darwin-rti')
+    'RTI': get_outbound_connection('darwin-rti')
 }
 
+# RTI_* take precedence, so the feed can share a process with Darwin Push Port
 DARWIN_CON_VARS = {
-    'darwin_user': os.getenv('DARWIN_USER'),
-    'darwin_pass': os.getenv('DARWIN_PASS'),
-    'darwin_topic': os.getenv('DARWIN_TOPIC'),
-    'darwin_host': os.getenv('DARWIN_HOST'),
-    'darwin_port': os.getenv('DARWIN_PORT')
+    'darwin_user': os.getenv('RTI_USER', os.getenv('DARWIN_USER')),
+    'darwin_pass': os.getenv('RTI_PASS', os.getenv('DARWIN_PASS')),
+    'darwin_topic': os.getenv('RTI_TOPIC', os.getenv('DARWIN_TOPIC')),
+    'darwin_host': os.getenv('RTI_HOST', os.getenv('DARWIN_HOST')),
+    'darwin_port': os.getenv('RTI_PORT', os.getenv('DARWIN_PORT'))
 }
 
 ALL_MESSAGE_L = Histogram(
@@ -61,7 +60,7 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
     )
 
     @staticmethod
-    @pydantic.validate_arguments(config={"arbitrary_types_allowed": True})
+    @trusted_internal(config={"arbitrary_types_allowed": True})
     def log_msg_latency(frame: stomp.utils.Frame) -> float:
         """Return the message latency as a float."""
         now = datetime.now().timestamp() * 1000
@@ -75,10 +74,10 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
     def on_error(self, frame: stomp.utils.Frame) -> None:
         """STOMP Error Frame Received."""
         LOG.logger.error('STOMP error frame received')
-        LOG.logger.error(str(frame.headers))
-        LOG.logger.error(str(frame.body))
+        LOG.logger.error('%s', frame.headers)
+        LOG.logger.error('%s', frame.body)
 
-    @pydantic.validate_arguments(config={'arbitrary_types_allowed': True})
+    @trusted_internal(config={'arbitrary_types_allowed': True})
     def on_message(self, frame: stomp.utils.Frame) -> None:
         """Called when a message is received from the broker."""
 
@@ -104,7 +103,7 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
     def on_connected(self, frame: stomp.utils.Frame):
         """Called when a STOMP Connection is made with the server."""
         LOG.logger.debug('STOMP Connection made')
-        LOG.logger.debug(str(frame.headers))
+        LOG.logger.debug('%s', frame.headers)
 
     def on_connecting(self, host_and_port: tuple) -> None:
         """Called when a TCP/IP connection is made to the server."""
@@ -241,7 +240,7 @@ class SignalHandler:
 
         # Disconnect from rabbitMQ
         for msg, conn in RMQ.items():
-            conn.close_connection(conn)
+            conn.close_connection()
             LOG.logger.error('RMQ Connection for %s closed', msg)
 
         sys.exit(0)
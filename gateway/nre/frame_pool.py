@@ -0,0 +1,135 @@
+"""Process pool for decompressing and parsing Darwin Push Port frames."""
+
+# pylint: disable=E0401, C0413, W0718
+
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter, Gauge
+from gateway.nre.push_port import process_frame
+from gateway.logging.gateway_logging import GatewayLogger
+
+DARWIN_WORKERS = int(os.getenv('DARWIN_WORKERS', '0'))
+POOL_QUEUE_SIZE = int(os.getenv('DARWIN_POOL_QUEUE', '10000'))
+POOL_PUT_TIMEOUT = 1
+
+LOG = GatewayLogger(__file__, False)
+
+POOL_PENDING_G = Gauge(
+    'darwin_pool_pending',
+    'Darwin frames submitted to the pool and not yet published'
+)
+
+POOL_DROPPED_C = Counter(
+    'darwin_pool_dropped_count',
+    'Darwin frames dropped because the pool queue was full'
+)
+
+POOL_LOST_C = Counter(
+    'darwin_pool_lost_count',
+    'Darwin frames lost because a worker process died'
+)
+
+
+class FramePool:
+    """Decompress, parse and serialise frames in worker processes.
+
+    The receiver thread only submits frames. Workers may complete in any
+    order, but a single publisher thread waits on each frame's result in the
+    order the frames were received, so every message - and so every message
+    for a given RID - is published in order. Workers are spawned, not
+    forked, as the STOMP and metrics threads are already running. If a
+    worker dies, the frames it held are lost and the pool is rebuilt.
+    """
+
+    def __init__(self, publish: Callable, envelope: bool, split: bool,
+                 workers: int = DARWIN_WORKERS, size: int = POOL_QUEUE_SIZE) -> None:
+        """Initialisation."""
+        self.publish = publish
+        self.envelope = envelope
+        self.split = split
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(size)
+        self.pending = queue.Queue()
+        self.executor = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def new_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Return a new pool of spawned worker processes."""
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def rebuild(self, broken: concurrent.futures.ProcessPoolExecutor) -> None:
+        """Replace the broken pool, unless another thread already has."""
+        with self.lock:
+            if self.executor is not broken:
+                return
+            LOG.logger.error('Darwin worker process died, restarting the pool')
+            self.executor = self.new_executor()
+
+    def start(self) -> None:
+        """Start the worker processes and the publisher thread."""
+        self.executor = self.new_executor()
+        self.thread = threading.Thread(target=self.work, name='darwin-publisher', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop once every submitted frame has been published."""
+        self.pending.put(None)
+        self.thread.join()
+        self.executor.shutdown()
+
+    def submit(self, msg_type: str, body: bytes) -> None:
+        """Queue the frame body for processing."""
+        if not self.slots.acquire(timeout=POOL_PUT_TIMEOUT):
+            POOL_DROPPED_C.inc()
+            return
+
+        executor = self.executor
+        try:
+            future = executor.submit(process_frame, body, msg_type, self.envelope, self.split)
+        except BrokenProcessPool:
+            self.rebuild(executor)
+            try:
+                future = self.executor.submit(
+                    process_frame, body, msg_type, self.envelope, self.split)
+            except BrokenProcessPool as err:
+                LOG.logger.error('Unable to submit %s frame: %s', msg_type, err,
+                                 extra={'msg_type': msg_type})
+                POOL_LOST_C.inc()
+                self.slots.release()
+                return
+        POOL_PENDING_G.inc()
+        self.pending.put((msg_type, future))
+
+    def work(self) -> None:
+        """Publisher loop - publish each result, in the order submitted."""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+
+            msg_type, future = item
+            try:
+                self.publish(msg_type, *future.result())
+            except BrokenProcessPool as err:
+                LOG.logger.error(
+                    'Lost %s frame: %s', msg_type, err, extra={'msg_type': msg_type}
+                )
+                POOL_LOST_C.inc()
+            except Exception as err:
+                LOG.logger.error(
+                    'Unable to process %s frame: %s', msg_type, err, extra={'msg_type': msg_type}
+                )
+            finally:
+                POOL_PENDING_G.dec()
+                self.slots.release()
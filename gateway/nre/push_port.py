@@ -0,0 +1,273 @@
+"""Single pass conversion of Darwin Push Port XML to the published dict.
+
+The gateway has always published the Push Port uR element as produced by
+xmltodict, after dumping it to JSON, removing the attribute '@' and namespace
+prefixes with str.replace, and loading it again. parse_update produces the
+same dict in a single SAX pass with expat, the parser xmltodict uses: keys and
+string values are filtered as they are built, and keys which collide once
+filtered keep the position of the first and the value of the last, as
+json.loads would.
+"""
+
+import json
+import re
+import zlib
+from typing import Iterator, List, Optional, Tuple
+from xml.parsers import expat
+
+MAX_CACHED_KEYS = 10000
+_FILTERS = {}
+
+MESSAGE_FILTERS = {
+    'LO': [
+        ('@', ''),
+        ('ns6:', ''),
+        ('#text', 'value')
+    ],
+    'TO': [
+        ('@', ''),
+        ('ns9:', ''),
+        ('#text', 'value')
+    ],
+    'AS': [
+        ('@', ''),
+        ('ns3:', ''),
+        ('#text', 'value')
+    ],
+    'SC': [
+        ('@', ''),
+        ('ns2:', '')
+    ],
+    'SF': [
+        ('@', ''),
+        ('ns4:', ''),
+    ],
+    'TS': [
+        ('@', ''),
+        ('ns5:', ''),
+        ('#text', 'value')
+    ],
+    'OW': [
+        ('@', ''),
+        ('ns7:', ''),
+        ('#text', 'msg')
+    ],
+    'NO': [
+        ('@', ''),
+        ('ns8:', ''),
+    ]
+}
+
+
+# uR record -> (message type, fields forming the topic routing key)
+RECORD_ROUTES = {
+    'TS': ('TS', ('rid', 'uid')),
+    'schedule': ('SC', ('rid', 'uid')),
+    'deactivated': ('SC', ('rid',)),
+    'association': ('AS', ('tiploc', 'category')),
+    'scheduleFormations': ('SF', ('rid',)),
+    'formationLoading': ('LO', ('rid', 'tpl')),
+    'trainOrder': ('TO', ('tiploc', 'platform')),
+    'OW': ('OW', ('cat', 'sev')),
+    'trainAlert': ('NO', ('AlertID',))
+}
+
+
+def apply_filters(value: str, filters: List[Tuple[str, str]]) -> str:
+    """Apply each (old, new) replacement in turn."""
+    for filt in filters:
+        value = value.replace(*filt)
+    return value
+
+
+class Filters:
+    """A set of filters, with the filtered keys cached across messages."""
+
+    def __init__(self, filters: List[Tuple[str, str]]) -> None:
+        """Initialisation."""
+        self.filters = filters
+        self.pattern = re.compile('|'.join(re.escape(old) for old, _ in filters))
+        self.keys = {}
+
+    def value(self, value: str) -> str:
+        """Return the filtered value, most values need no replacement."""
+        if self.filters and self.pattern.search(value):
+            return apply_filters(value, self.filters)
+        return value
+
+    def key(self, raw: str) -> str:
+        """Return the filtered key."""
+        key = self.keys.get(raw)
+        if key is None:
+            key = apply_filters(raw, self.filters)
+            if len(self.keys) < MAX_CACHED_KEYS:
+                self.keys[raw] = key
+        return key
+
+
+def get_filters(filters: List[Tuple[str, str]]) -> Filters:
+    """Return the cached Filters for the list of filters."""
+    ident = tuple(filters)
+    cached = _FILTERS.get(ident)
+    if cached is None:
+        cached = _FILTERS[ident] = Filters(list(ident))
+    return cached
+
+
+class UpdateHandler:
+    """expat handlers building the filtered value of each uR element."""
+
+    def __init__(self, filters: Filters) -> None:
+        """Initialisation."""
+        self.filters = filters
+        self.depth = 0
+        self.root = None
+        self.updates = []
+        self.stack = []
+        self.item = None
+        self.data = []
+
+    def start(self, name: str, attrs: list) -> None:
+        """Start of an element, attrs are ordered [name, value, ...] pairs."""
+        self.depth += 1
+        if not self.stack and (self.depth != 2 or name != 'uR'):
+            if self.depth == 1:
+                self.root = name
+            return
+
+        self.stack.append((self.item, self.data))
+        item = None
+        if attrs:
+            value = self.filters.value
+            item = {}
+            for idx in range(0, len(attrs), 2):
+                item['@' + attrs[idx]] = value(attrs[idx + 1])
+        self.item = item
+        self.data = []
+
+    def end(self, name: str) -> None:
+        """End of an element, add its value to the parent."""
+        self.depth -= 1
+        if self.depth < len(self.stack) or not self.stack:
+            return
+
+        data = ''.join(self.data).strip() if self.data else ''
+        item = self.item
+        self.item, self.data = self.stack.pop()
+        if item is None:
+            value = self.filters.value(data) if data else None
+        else:
+            if data:
+                item['#text'] = self.filters.value(data)
+            keys = self.filters.keys
+            key = self.filters.key
+            value = {
+                keys[raw] if raw in keys else key(raw): val for raw, val in item.items()
+            }
+
+        if not self.stack:
+            self.updates.append(value)
+            return
+
+        parent = self.item
+        if parent is None:
+            parent = self.item = {}
+        if name not in parent:
+            parent[name] = value
+        elif isinstance(parent[name], list):
+            parent[name].append(value)
+        else:
+            parent[name] = [parent[name], value]
+
+    def characters(self, data: str) -> None:
+        """Character data within the current element."""
+        if self.stack:
+            self.data.append(data)
+
+
+def parse_update(message: bytes, filters: List[Tuple[str, str]]):
+    """Return the filtered uR element of a Push Port message.
+
+    Raises KeyError if the message is not a Pport holding a uR element.
+    """
+    handler = UpdateHandler(get_filters(filters))
+    parser = expat.ParserCreate()
+    parser.ordered_attributes = True
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.characters
+    # As xmltodict, do not expand entities declared in a DTD
+    parser.DefaultHandler = lambda data: None
+    parser.ExternalEntityRefHandler = lambda *args: 1
+    parser.Parse(message, True)
+
+    if handler.root != 'Pport':
+        raise KeyError('Pport')
+    if not handler.updates:
+        raise KeyError('uR')
+    if len(handler.updates) == 1:
+        return handler.updates[0]
+    return handler.updates
+
+
+def routing_key(record, fields: Tuple[str, ...]) -> str:
+    """Return the topic routing key for a record, e.g. 202203118971234.P71234."""
+    if not isinstance(record, dict):
+        return '.'.join('' for _ in fields)
+    words = []
+    for field in fields:
+        value = record.get(field)
+        words.append(value.replace('.', '_') if isinstance(value, str) else '')
+    return '.'.join(words)
+
+
+def split_update(update) -> Iterator[Tuple[str, str, dict]]:
+    """Yield (message type, routing key, record) for each record of a uR.
+
+    Each record is wrapped as a uR holding only that record, alongside the
+    uR's own attributes, e.g. {'updateOrigin': 'TD', 'TS': {...}}, so it has
+    the shape consumers already handle. A list of uR, as parse_update returns
+    for a Pport holding several, is split in order. Unknown record types are
+    skipped.
+    """
+    for ur in update if isinstance(update, list) else [update]:
+        if not isinstance(ur, dict):
+            continue
+        envelope = {
+            key: value for key, value in ur.items()
+            if not isinstance(value, (dict, list)) and key not in RECORD_ROUTES
+        }
+        for key, value in ur.items():
+            route = RECORD_ROUTES.get(key)
+            if not route:
+                continue
+            msg_type, fields = route
+            for record in value if isinstance(value, list) else [value]:
+                yield msg_type, routing_key(record, fields), {**envelope, key: record}
+
+
+Serialised = Tuple[Optional[str], List[Tuple[str, str, str]]]
+
+
+def serialise_update(update, envelope: bool, split: bool) -> Serialised:
+    """Return the uR as JSON, and (message type, routing key, JSON) for each record."""
+    if not update:
+        return None, []
+    body = json.dumps(update) if envelope else None
+    records = [
+        (msg_type, key, json.dumps(record))
+        for msg_type, key, record in split_update(update)
+    ] if split else []
+    return body, records
+
+
+def process_frame(body: bytes, msg_type: str, envelope: bool, split: bool) -> Serialised:
+    """Decompress, parse and serialise the body of a Push Port frame.
+
+    This is the unit of work of a FramePool worker process; it returns only
+    strings, which are cheap to send back to the publishing process.
+    """
+    message = zlib.decompress(body, zlib.MAX_WBITS | 32)
+    update = parse_update(message, MESSAGE_FILTERS.get(msg_type, []))
+    return serialise_update(update, envelope, split)
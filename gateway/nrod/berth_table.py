@@ -0,0 +1,210 @@
+"""TD berth occupancy, built from C-Class messages, served over HTTP."""
+
+# pylint: disable=E0401, C0413
+
+import json
+import os
+import queue
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter, Gauge
+from gateway.nrod.c_class import CClassMessage, MsgType
+from gateway.logging.gateway_logging import GatewayLogger
+
+# serve the berth table on this port, 0 to not keep a berth table
+BERTH_PORT = int(os.getenv('NROD_BERTH_PORT', '0'))
+# changes buffered per stream subscriber before it is disconnected
+SUBSCRIBER_QUEUE_SIZE = 10000
+STREAM_KEEPALIVE = 15
+
+LOG = GatewayLogger(__file__, False)
+
+BERTH_UPDATE_C = Counter(
+    'nrod_berth_update_count',
+    'C-Class messages applied to the berth table, by type',
+    ['msg']
+)
+
+BERTH_G = Gauge(
+    'nrod_berth_occupied',
+    'Berths holding a description'
+)
+
+SUBSCRIBER_G = Gauge(
+    'nrod_berth_subscribers',
+    'Berth stream subscribers connected'
+)
+
+SUBSCRIBER_DROPPED_C = Counter(
+    'nrod_berth_subscriber_dropped_count',
+    'Berth stream subscribers disconnected for falling behind'
+)
+
+
+class BerthTable:
+    """The description held in every occupied berth, by TD area.
+
+    Areas, berths and descriptions are interned, so each distinct string is
+    held once however many berths refer to it. Every change is numbered;
+    subscribers are given a snapshot and then each later change, in order.
+    """
+
+    def __init__(self) -> None:
+        """Initialisation."""
+        self.lock = threading.Lock()
+        self.areas: Dict[str, Dict[str, str]] = {}
+        self.updated: Dict[str, int] = {}
+        self.seq = 0
+        self.occupied = 0
+        self.subscribers = []
+
+    def apply(self, msg: CClassMessage) -> None:
+        """Apply a berth step (CA), cancel (CB), interpose (CC) or heartbeat (CT)."""
+        msg_type = msg.msg_type
+        BERTH_UPDATE_C.labels(msg=msg_type.value).inc()
+        changes = {}
+        if msg_type in (MsgType.CA, MsgType.CB) and msg.from_berth:
+            changes[sys.intern(msg.from_berth)] = None
+        if msg_type in (MsgType.CA, MsgType.CC) and msg.to_berth and msg.descr:
+            changes[sys.intern(msg.to_berth)] = sys.intern(msg.descr)
+
+        area = sys.intern(msg.td)
+        with self.lock:
+            self.updated[area] = msg.time
+            if not changes:
+                return
+
+            berths = self.areas.setdefault(area, {})
+            for berth, descr in changes.items():
+                self.occupied -= berth in berths
+                if descr is None:
+                    berths.pop(berth, None)
+                else:
+                    berths[berth] = descr
+                    self.occupied += 1
+            self.seq += 1
+            BERTH_G.set(self.occupied)
+            if self.subscribers:
+                self.notify({'seq': self.seq, 'area': area, 'time': msg.time, 'berths': changes})
+
+    def notify(self, change: dict) -> None:
+        """Queue the change for each subscriber, dropping any which have fallen behind."""
+        for subscriber in list(self.subscribers):
+            if subscriber.qsize() >= SUBSCRIBER_QUEUE_SIZE:
+                SUBSCRIBER_DROPPED_C.inc()
+                self.subscribers.remove(subscriber)
+                subscriber.put_nowait(None)
+                continue
+            subscriber.put_nowait(change)
+
+    def snapshot(self, area: str = None) -> dict:
+        """Return the occupied berths of every area, or of a single area."""
+        with self.lock:
+            return self._snapshot(area)
+
+    def _snapshot(self, area: Optional[str]) -> dict:
+        """Return the snapshot, the lock being held."""
+        names = [area] if area else list(self.areas)
+        return {
+            'seq': self.seq,
+            'areas': {
+                name: {
+                    'time': self.updated.get(name),
+                    'berths': dict(self.areas.get(name, {}))
+                }
+                for name in names
+            }
+        }
+
+    def subscribe(self, area: str = None):
+        """Return a snapshot, and a queue of each change after it (None once dropped)."""
+        # room for the None which ends the stream
+        subscriber = queue.Queue(SUBSCRIBER_QUEUE_SIZE + 1)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            SUBSCRIBER_G.set(len(self.subscribers))
+            return self._snapshot(area), subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        """Stop queuing changes for the subscriber."""
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            SUBSCRIBER_G.set(len(self.subscribers))
+
+
+class BerthRequestHandler(BaseHTTPRequestHandler):
+    """Serve the berth table.
+
+    GET /berths            every area
+    GET /berths/<area>     a single area
+    GET /berths/stream     a snapshot, then each change, as JSON lines;
+                           ?area=<area> for a single area
+    """
+
+    table: BerthTable = None
+
+    def do_GET(self) -> None:  # pylint: disable=C0103
+        """Route the request."""
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if not parts or parts[0] != 'berths' or len(parts) > 2:
+            self.send_error(404)
+            return
+
+        if parts[1:] == ['stream']:
+            self.stream(parse_qs(url.query).get('area', [None])[0])
+            return
+
+        body = json.dumps(self.table.snapshot(parts[1] if len(parts) > 1 else None)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, area: Optional[str]) -> None:
+        """Write the snapshot, then each change, until the client disconnects."""
+        snapshot, subscriber = self.table.subscribe(area)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+            self.write_line(snapshot)
+            while True:
+                try:
+                    change = subscriber.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    self.wfile.write(b'\n')
+                    self.wfile.flush()
+                    continue
+                if change is None:
+                    return
+                if not area or change['area'] == area:
+                    self.write_line(change)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        finally:
+            self.table.unsubscribe(subscriber)
+
+    def write_line(self, body: dict) -> None:
+        """Write the body as a line of JSON."""
+        self.wfile.write(json.dumps(body, separators=(',', ':')).encode() + b'\n')
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=W0622
+        """Log requests at debug, not to stderr."""
+        LOG.logger.debug(format, *args)
+
+
+def serve(table: BerthTable, port: int = BERTH_PORT) -> ThreadingHTTPServer:
+    """Serve the table on the port, from a daemon thread."""
+    handler = type('Handler', (BerthRequestHandler,), {'table': table})
+    server = ThreadingHTTPServer(('', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='berth-api', daemon=True).start()
+    return server
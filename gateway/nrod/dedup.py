@@ -0,0 +1,66 @@
+"""Suppression of frames and TRUST messages already received."""
+
+# pylint: disable=E0401, C0413
+
+import os
+import sys
+import threading
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter
+
+# keys held per generation; the window holds the last one to two generations
+DEDUP_SIZE = int(os.getenv('NROD_DEDUP_SIZE', '100000'))
+# the TRUST body fields which, with the header, identify a message
+TRUST_KEY_FIELDS = (
+    'train_id', 'loc_stanox', 'event_type', 'actual_timestamp', 'event_timestamp',
+    'canx_timestamp', 'revised_train_id'
+)
+
+DUPLICATE_C = Counter(
+    'nrod_duplicate_count',
+    'Duplicates suppressed, by kind (FRAME, TRUST)',
+    ['msg']
+)
+
+
+def trust_key(element: dict) -> tuple:
+    """Return the key of a TRUST message, which carries no identity of its own."""
+    header = element.get('header') or {}
+    body = element.get('body') or {}
+    return (
+        header.get('msg_type'), header.get('msg_queue_timestamp'),
+        header.get('source_dev_id')
+    ) + tuple(body.get(field) for field in TRUST_KEY_FIELDS)
+
+
+class DedupWindow:
+    """The keys most recently seen, in two rotating generations.
+
+    Keys are added to the current generation; once it holds size keys it
+    becomes the previous generation, replacing the one before. A key is a
+    duplicate if held by either, so each is remembered for at least size
+    further keys. Only the hash of each key is held, keeping the window to
+    a few tens of bytes per key.
+    """
+
+    def __init__(self, kind: str, size: int = DEDUP_SIZE) -> None:
+        """Initialisation."""
+        self.size = size
+        self.lock = threading.Lock()
+        self.current = set()
+        self.previous = set()
+        self.duplicates = DUPLICATE_C.labels(msg=kind)
+
+    def seen(self, key) -> bool:
+        """Return True if the key is already in the window, otherwise add it."""
+        key = hash(key)
+        with self.lock:
+            if key in self.current or key in self.previous:
+                self.duplicates.inc()
+                return True
+            if len(self.current) >= self.size:
+                self.previous = self.current
+                self.current = set()
+            self.current.add(key)
+            return False
+
@@ -9,6 +9,7 @@ import stomp
 import json
 from typing import List
 from datetime import datetime
+from functools import partial
 from gateway.nrod.s_class import SClassMessage
 from gateway.nrod.c_class import CClassMessage
 from gateway.nrod.train_movement import (
@@ -20,10 +21,21 @@ from gateway.nrod.train_movement import (
     ChangeOfIdentity,
     ChangeOfLocation
 )
+from gateway.nrod.train_movement_fast import FAST_PATH
 from gateway.nrod.vstp import VSTPSchedule
+from gateway.nrod.pipeline import FramePipeline, STAGE_L
+from gateway.nrod.td_shard import TDShardPool, TD_SHARDS, area_of
+from gateway.nrod.berth_table import BerthTable, BERTH_PORT, serve
+from gateway.nrod.signal_state import SignalState
+from gateway.nrod.train_index import TrainIndex
+from gateway.nrod.dedup import DedupWindow, trust_key
+from gateway.capture import FrameCapture, CAPTURE_DIR
 from gateway.logging.gateway_logging import GatewayLogger
-from prometheus_client import start_http_server, Counter, Histogram
-from gateway.rabbitmq.publish import OutboundConnection
+from gateway.validation import trusted_internal
+from prometheus_client import (
+    start_http_server, Counter, Histogram, CollectorRegistry, multiprocess
+)
+from gateway.rabbitmq.publish import OutboundConnection, get_outbound_connection
 
 S_CLASS = ['SF_MSG', 'SG_MSG', 'SH_MSG']
 C_CLASS = ['CA_MSG', 'CB_MSG', 'CC_MSG', 'CT_MSG']
@@ -33,6 +45,23 @@ VSTP_TOPIC = 'VSTP_ALL'
 PPM_TOPIC = 'RTPPM_ALL'
 TSR_TOPIC = 'TSR_ALL_ROUTE'
 
+PIPELINE = os.getenv('NROD_PIPELINE', 'false').lower() == 'true'
+# publish each S-Class bit change, from SF, SG and SH messages
+S_CLASS_BITS = os.getenv('NROD_S_CLASS_BITS', 'false').lower() == 'true'
+# publish SF messages whole, as received
+S_CLASS_MESSAGES = os.getenv('NROD_S_CLASS_MESSAGES', 'true').lower() == 'true'
+# add the schedule UID, start date and headcode of the train to TRUST message headers
+TRAIN_INDEX = os.getenv('NROD_TRAIN_INDEX', 'false').lower() == 'true'
+# drop frames (by message-id) and TRUST messages already received
+DEDUP = os.getenv('NROD_DEDUP', 'false').lower() == 'true'
+ADDRESSES = tuple(f'{address:02X}' for address in range(256))
+PIPELINE_WORKERS = {
+    TD_TOPIC: int(os.getenv('NROD_WORKERS_TD', '1')),
+    MVT_TOPIC: int(os.getenv('NROD_WORKERS_TRUST', '1')),
+    VSTP_TOPIC: int(os.getenv('NROD_WORKERS_VSTP', '1')),
+    PPM_TOPIC: int(os.getenv('NROD_WORKERS_RTPPM', '1'))
+}
+
 TRN_MOVEMENT = {
     '0001': 'ACT',
     '0002': 'CAN',
@@ -44,6 +73,18 @@ TRN_MOVEMENT = {
     '0008': 'COL'
 }
 
+MVT_MODELS = {
+    '0001': (Activation, 'act_rmq'),
+    '0002': (Cancellation, 'canx_rmq'),
+    '0003': (Movement, 'mvt_rmq'),
+    '0005': (Reinstatement, 'ren_rmq'),
+    '0006': (ChangeOfOrigin, 'coo_rmq'),
+    '0007': (ChangeOfIdentity, 'coi_rmq'),
+    '0008': (ChangeOfLocation, 'col_rmq')
+}
+
+MVT_FAST_PATH = os.getenv('NROD_FAST_PATH', 'false').lower() == 'true'
+
 LOG = GatewayLogger(__file__, False)
 ALL_MESSAGE_C = Counter(
     'nrod_inbound_message_count',
@@ -73,6 +114,12 @@ TRAIN_MVT_C = Counter(
 ALL_MESSAGE_L = Histogram('inbound_message_latency', 'Inbound NROD message latency')
 
 
+def trust_id_of(element: dict) -> str:
+    """Return the train ID of a TRUST message, if it has one, for logging."""
+    body = element.get('body') if isinstance(element, dict) else None
+    return body.get('train_id') if isinstance(body, dict) else None
+
+
 class MessageHeader(pydantic.BaseModel):
     """A representation of a message header."""
 
@@ -158,70 +205,115 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
 
     s_class_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for s-class',
-        default=OutboundConnection('nrod-s-class')
+        default_factory=partial(get_outbound_connection, 'nrod-s-class')
+    )
+
+    s_class_bits_rmq: OutboundConnection = pydantic.Field(
+        title='The outbound RMQ connection object for s-class bit changes',
+        default_factory=partial(get_outbound_connection, 'nrod-s-class-bits', 'topic')
     )
 
     c_class_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for c-class',
-        default=OutboundConnection('nrod-c-class')
+        default_factory=partial(get_outbound_connection, 'nrod-c-class')
     )
 
     act_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for Activations',
-        default=OutboundConnection('nrod-activation')
+        default_factory=partial(get_outbound_connection, 'nrod-activation')
     )
 
     canx_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for Cancellations',
-        default=OutboundConnection('nrod-canx')
+        default_factory=partial(get_outbound_connection, 'nrod-canx')
     )
 
     mvt_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for Movements',
-        default=OutboundConnection('nrod-movement')
+        default_factory=partial(get_outbound_connection, 'nrod-movement')
     )
 
     ren_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for Reinstatements',
-        default=OutboundConnection('nrod-reinstatement')
+        default_factory=partial(get_outbound_connection, 'nrod-reinstatement')
     )
 
     coo_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for COO',
-        default=OutboundConnection('nrod-coo')
+        default_factory=partial(get_outbound_connection, 'nrod-coo')
     )
 
     coi_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for COI',
-        default=OutboundConnection('nrod-coi')
+        default_factory=partial(get_outbound_connection, 'nrod-coi')
     )
 
     col_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for COL',
-        default=OutboundConnection('nrod-col')
+        default_factory=partial(get_outbound_connection, 'nrod-col')
     )
 
     vstp_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for VSTP',
-        default=OutboundConnection('nrod-vstp')
+        default_factory=partial(get_outbound_connection, 'nrod-vstp')
     )
 
     ppm_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for PPM',
-        default=OutboundConnection('nrod-ppm')
+        default_factory=partial(get_outbound_connection, 'nrod-ppm')
     )
 
     tsr_rmq: OutboundConnection = pydantic.Field(
         title='The outbound RMQ connection object for TSR',
-        default=OutboundConnection('nrod-tsr')
+        default_factory=partial(get_outbound_connection, 'nrod-tsr')
+    )
+
+    pipeline: FramePipeline = pydantic.Field(
+        title='Optional worker pipeline, decoupling receipt from processing',
+        default=None
+    )
+
+    td_shards: TDShardPool = pydantic.Field(
+        title='Optional process pool for TD traffic, sharded by TD area',
+        default=None
+    )
+
+    signals: SignalState = pydantic.Field(
+        title='Optional S-Class state, by TD area, per NROD_S_CLASS_BITS',
+        default_factory=lambda: SignalState() if S_CLASS_BITS else None
+    )
+
+    trains: TrainIndex = pydantic.Field(
+        title='Optional index of activated trains, per NROD_TRAIN_INDEX',
+        default_factory=lambda: TrainIndex() if TRAIN_INDEX else None
+    )
+
+    frames_seen: DedupWindow = pydantic.Field(
+        title='Optional window of frame message-ids received, per NROD_DEDUP',
+        default_factory=lambda: DedupWindow('FRAME') if DEDUP else None
+    )
+
+    trust_seen: DedupWindow = pydantic.Field(
+        title='Optional window of TRUST messages received, per NROD_DEDUP',
+        default_factory=lambda: DedupWindow('TRUST') if DEDUP else None
+    )
+
+    berths: BerthTable = pydantic.Field(
+        title='Optional berth occupancy table, updated from C-Class messages',
+        default=None
+    )
+
+    capture: FrameCapture = pydantic.Field(
+        title='Optional capture of each frame received, per GATEWAY_CAPTURE_DIR',
+        default=None
     )
 
     @pydantic.validate_arguments(config=dict(arbitrary_types_allowed=True))
     def on_error(self, frame: stomp.utils.Frame) -> None:
         """STOMP Error Frame Received."""
         LOG.logger.error('STOMP error frame received')
-        LOG.logger.error(frame.headers)
-        LOG.logger.error(frame.body)
+        LOG.logger.error('%s', frame.headers)
+        LOG.logger.error('%s', frame.body)
 
     def get_message_type(self, message: dict) -> dict:
         """Return the message type, and processing function."""
@@ -245,7 +337,7 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
         }
 
     @staticmethod
-    @pydantic.validate_arguments(config=dict(arbitrary_types_allowed=True))
+    @trusted_internal(config=dict(arbitrary_types_allowed=True))
     def log_msg_latency(frame: stomp.utils.Frame) -> float:
         """Return the message latency as a float."""
         now = datetime.now().timestamp() * 1000
@@ -254,131 +346,156 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
             (now - timestamp) / 1000
         )
 
-    @pydantic.validate_arguments
+    @trusted_internal
     def process_s_class(self, element: dict, msg_type: str) -> None:
         """Process the S-Class message."""
         ALL_MESSAGE_C.labels(msg='s-class').inc()
         S_CLASS_C.labels(msg=msg_type).inc()
-        if msg_type == 'SF_MSG':
-            s_class = SClassMessage(**element['SF_MSG'])
+        if msg_type == 'SF_MSG' or self.signals:
+            s_class = SClassMessage(**element[msg_type])
             TD_AREA_C.labels(msg=s_class.td).inc()
-            self.s_class_rmq.send_message(s_class.json())
+            if self.signals:
+                self.publish_bit_changes(s_class)
+            if msg_type == 'SF_MSG' and S_CLASS_MESSAGES:
+                self.s_class_rmq.send_message(s_class.json())
+
+    def publish_bit_changes(self, s_class: SClassMessage) -> None:
+        """Publish each bit the message changed, routed <area>.<address>.<bit>."""
+        for area, address, bit, value in self.signals.apply(s_class):
+            # area is validated [A-Z0-9]{2}, so needs no JSON escaping
+            self.s_class_bits_rmq.send_message(
+                f'{{"area":"{area}","address":"{ADDRESSES[address]}","bit":{bit},'
+                f'"value":{value},"time":{s_class.time}}}',
+                routing_key=f'{area}.{ADDRESSES[address]}.{bit}'
+            )
 
-    @pydantic.validate_arguments
+    @trusted_internal
     def process_c_class(self, element: dict, msg_type: str) -> None:
         """Process the C-Class message."""
         ALL_MESSAGE_C.labels(msg='c-class').inc()
         C_CLASS_C.labels(msg=msg_type).inc()
         c_class = CClassMessage(**element[msg_type])
         TD_AREA_C.labels(msg=c_class.td).inc()
+        if self.berths:
+            self.berths.apply(c_class)
         self.c_class_rmq.send_message(c_class.json())
 
-    @pydantic.validate_arguments
+    @trusted_internal
     def unknown_message(self, element: dict, msg_type: str) -> None:
         """Deal with an unknow message type."""
         ALL_MESSAGE_C.labels(msg='unknown').inc()
-        LOG.logger.error(f'Unknown message type received: {msg_type}')
-        LOG.logger.error(f'{element}')
+        LOG.logger.error(
+            'Unknown message type received: %s\n%s', msg_type, element,
+            extra={'msg_type': msg_type}
+        )
 
-    @pydantic.validate_arguments(config=dict(arbitrary_types_allowed=True))
+    @trusted_internal(config=dict(arbitrary_types_allowed=True))
     def process_s_c_class(self, element: dict) -> None:
         """Process the message, based on type."""
         msg = self.get_message_type(element)
         msg['func'](element, msg['msg_type'])
 
     @staticmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def get_mvt_msg_type(element: dict) -> str:
         """Extract and return the movement message type."""
         return element['header']['msg_type']
 
     @staticmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def update_mvt_metrics(msg_type: str) -> None:
         """Update the applicable metrics for a movement message."""
         TRAIN_MVT_C.labels(msg=TRN_MOVEMENT[msg_type]).inc()
 
-    @pydantic.validate_arguments
+    @trusted_internal
     def process_train_movements(self, element: dict) -> None:
         """Process a train movements message."""
         msg_type = Listener.get_mvt_msg_type(element)
         Listener.update_mvt_metrics(msg_type)
-        if msg_type == '0001':
-            try:
-                act = Activation.nrod_factory(element)
-                self.act_rmq.send_message(act.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: ACT")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
-        if msg_type == '0002':
-            try:
-                canx = Cancellation.nrod_factory(element)
-                self.canx_rmq.send_message(canx.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: CANX")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
-        if msg_type == '0003':
-            try:
-                mvt = Movement.nrod_factory(element)
-                self.mvt_rmq.send_message(mvt.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: MVT")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
-        if msg_type == '0005':
-            try:
-                ren = Reinstatement.nrod_factory(element)
-                self.ren_rmq.send_message(ren.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: Reinstatement")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
-        if msg_type == '0006':
-            try:
-                coo = ChangeOfOrigin.nrod_factory(element)
-                self.coo_rmq.send_message(coo.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: COO")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
-        if msg_type == '0007':
-            try:
-                coi = ChangeOfIdentity.nrod_factory(element)
-                self.coi_rmq.send_message(coi.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: COI")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
-        if msg_type == '0008':
-            try:
-                col = ChangeOfLocation.nrod_factory(element)
-                self.col_rmq.send_message(col.json())
-            except pydantic.ValidationError as err:
-                LOG.logger.error("Validation Error: COL")
-                LOG.logger.error(err)
-                LOG.logger.error(element)
-                return
+        if msg_type not in MVT_MODELS:
+            return
+        if self.trust_seen and self.trust_seen.seen(trust_key(element)):
+            return
 
-    @pydantic.validate_arguments(config=dict(arbitrary_types_allowed=True))
+        model, rmq = MVT_MODELS[msg_type]
+        try:
+            if MVT_FAST_PATH:
+                values = FAST_PATH[model](element)
+                msg = json.dumps(values)
+            else:
+                record = model.nrod_factory(element)
+                values = record.__dict__
+                msg = record.json()
+        except pydantic.ValidationError as err:
+            LOG.logger.error(
+                "Validation Error%s: %s\n%s\n%s",
+                ' (fast path)' if MVT_FAST_PATH else '', TRN_MOVEMENT[msg_type], err, element,
+                extra={
+                    'rate_key': f'validation.{msg_type}',
+                    'topic': 'TRUST',
+                    'msg_type': msg_type,
+                    'trust_id': trust_id_of(element)
+                }
+            )
+            return
+
+        headers = self.trains.update(msg_type, values) if self.trains else None
+        getattr(self, rmq).send_message(msg, headers=headers)
+
+    @trusted_internal(config=dict(arbitrary_types_allowed=True))
     def on_message(self, frame: stomp.utils.Frame) -> None:
         """Called when a message is received from the broker."""
 
+        if self.capture:
+            self.capture.put(frame)
         ALL_MESSAGE_C.labels(msg='all').inc()
         self.log_msg_latency(frame)
+        if self.frames_seen and self.frames_seen.seen(frame.headers.get('message-id')):
+            return
+
+        if self.pipeline:
+            topic = frame.headers['destination'].replace('/topic/', '')
+            self.pipeline.submit(topic, frame)
+            return
+
+        self.process_frame(frame)
+
+    def start_pipeline(self) -> None:
+        """Process frames on per topic worker threads, not the receiver thread."""
+        self.pipeline = FramePipeline(self.process_frame, PIPELINE_WORKERS)
+        self.pipeline.start()
+
+    def start_td_shards(self) -> None:
+        """Validate and publish TD traffic in worker processes, by TD area."""
+        self.td_shards = TDShardPool(td_shard_handler)
+        self.td_shards.start()
+
+    def start_berth_table(self) -> None:
+        """Keep the berth occupancy table, serving it on NROD_BERTH_PORT."""
+        self.berths = BerthTable()
+        serve(self.berths, BERTH_PORT)
 
+    def start_capture(self) -> None:
+        """Capture each frame received to segments in GATEWAY_CAPTURE_DIR."""
+        self.capture = FrameCapture('nrod')
+        self.capture.start()
+
+    def process_frame(self, frame: stomp.utils.Frame) -> None:
+        """Decode, validate and publish the contents of a frame."""
+        started = time.monotonic()
         msg = Message(
             headers=frame.headers,
             body=frame.body
         )
 
+        dest = msg.headers.destination
+        decoded = time.monotonic()
+        STAGE_L.labels(topic=dest, stage='decode').observe(decoded - started)
+        self.process_message(msg)
+        STAGE_L.labels(topic=dest, stage='process').observe(time.monotonic() - decoded)
+
+    def process_message(self, msg: Message) -> None:
+        """Route the decoded message body by topic."""
         dest = msg.headers.destination
         # if dest == VSTP_TOPIC:
         #     ALL_MESSAGE_C.labels(msg='vstp').inc()
@@ -396,31 +513,48 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
             ALL_MESSAGE_C.labels(msg='PPM').inc()
             self.ppm_rmq.send_message(
                 msg=json.dumps(msg.body),
-                headers=msg.headers
+                headers=dict(msg.headers)
             )
             return
 
+        if dest == TD_TOPIC and self.td_shards:
+            self.td_shards.submit(msg.body)
+            return
+
         for element in msg.body:
             if dest == TD_TOPIC:
-                self.process_s_c_class(element)
+                try:
+                    self.process_s_c_class(element)
+                except Exception as err:
+                    LOG.logger.error(
+                        'Unable to process TD element: %s', err,
+                        extra={'topic': 'TD', 'td_area': area_of(element)}
+                    )
             if dest == MVT_TOPIC:
                 ALL_MESSAGE_C.labels(msg='movement').inc()
-                self.process_train_movements(element)
+                try:
+                    self.process_train_movements(element)
+                except Exception as err:
+                    LOG.logger.error(
+                        'Unable to process TRUST element: %s', err,
+                        extra={'topic': 'TRUST', 'trust_id': trust_id_of(element)}
+                    )
             if dest == PPM_TOPIC:
                 ALL_MESSAGE_C.labels(msg='PPM').inc()
             if dest == TSR_TOPIC:
                 ALL_MESSAGE_C.labels(msg='TSR').inc()
 
-    @pydantic.validate_arguments
+    @trusted_internal
     def process_vstp(self, element: dict) -> None:
         """Process VSTP message."""
         try:
             vstp = VSTPSchedule.nrod_factory(element)
             self.vstp_rmq.send_message(vstp.json())
         except pydantic.ValidationError as err:
-            LOG.logger.error("Validation Error: VSTP")
-            LOG.logger.error(err)
-            LOG.logger.error(element)
+            LOG.logger.error(
+                "Validation Error: VSTP\n%s\n%s", err, element,
+                extra={'rate_key': 'validation.VSTP', 'topic': 'VSTP'}
+            )
 
     def on_heartbeat_timeout(self):
         """Called when a STOMP heartbeat is not RX at the expected interval."""
@@ -434,12 +568,12 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
     def on_connected(self, frame: stomp.utils.Frame):
         """Called when a STOMP Connection is made with the server."""
         LOG.logger.error('STOMP Connection made')
-        LOG.logger.debug(frame.headers)
-        LOG.logger.debug(frame.body)
+        LOG.logger.debug('%s', frame.headers)
+        LOG.logger.debug('%s', frame.body)
 
     def on_connecting(self, host_and_port: tuple) -> None:
         """Called when a TCP/IP connection is made to the server."""
-        LOG.logger.error(f'\tTCP/IP Connection made to {host_and_port}...')
+        LOG.logger.error('\tTCP/IP Connection made to %s...', host_and_port)
 
     def on_disconnecting(self):
         """Called when a DISCONNECT frame is sent to the server."""
@@ -450,6 +584,12 @@ class Listener(stomp.ConnectionListener, pydantic.BaseModel):
         LOG.logger.error('TCP/IP Connection has been lost')
 
 
+def td_shard_handler():
+    """Return the TD element handler, called within each shard process."""
+    # the shard's listener is never connected, it only validates and publishes
+    return Listener(conn=stomp.Connection12([('localhost', 0)])).process_s_c_class
+
+
 class NRODConnection(pydantic.BaseModel):
     """Provides a connection to NROD."""
 
@@ -505,9 +645,20 @@ class NRODConnection(pydantic.BaseModel):
                 keepalive=True,
                 heartbeats=(15000, 15000),
             )
-            self.conn.set_listener('', Listener(conn=self.conn))
+            listener = Listener(conn=self.conn)
+            if TD_SHARDS:
+                listener.start_td_shards()
+            if BERTH_PORT and TD_SHARDS:
+                LOG.logger.error('NROD_BERTH_PORT is ignored with NROD_TD_SHARDS')
+            elif BERTH_PORT:
+                listener.start_berth_table()
+            if PIPELINE:
+                listener.start_pipeline()
+            if CAPTURE_DIR:
+                listener.start_capture()
+            self.conn.set_listener('', listener)
         except stomp.exception as err:
-            LOG.logger.error(f'Unable to define STOMP TCP/IP Connection: {err}')
+            LOG.logger.error('Unable to define STOMP TCP/IP Connection: %s', err)
             exit(1)
 
     def connect(self) -> None:
@@ -522,7 +673,7 @@ class NRODConnection(pydantic.BaseModel):
                 headers={'client-id': self.client_id}
             )
         except stomp.exception as err:
-            LOG.logger.error(f'Unable to create STOMP Connection: {err}')
+            LOG.logger.error('Unable to create STOMP Connection: %s', err)
             exit(1)
         else:
             LOG.logger.error('Waiting for STOMP Connection to return...')
@@ -549,7 +700,7 @@ class NRODConnection(pydantic.BaseModel):
                     headers={'activemq.subscriptionName': f'{topic}-{self.client_id}'}
                 )
             except stomp.exception as err:
-                LOG.logger.error(f'Unable to subscribe to {topic}: {err}')
+                LOG.logger.error('Unable to subscribe to %s: %s', topic, err, extra={'topic': topic})
                 exit(1)
 
     def connect_and_subscribe(self) -> None:
@@ -564,6 +715,11 @@ class NRODConnection(pydantic.BaseModel):
 
 
 if __name__ == "__main__":
-    start_http_server(8000)
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        REGISTRY = CollectorRegistry()
+        multiprocess.MultiProcessCollector(REGISTRY)
+        start_http_server(8000, registry=REGISTRY)
+    else:
+        start_http_server(8000)
     conn = NRODConnection()
     conn.connect_and_subscribe()
@@ -0,0 +1,145 @@
+"""Bounded, staged processing of inbound STOMP frames."""
+
+# pylint: disable=E0401, C0413, W0718
+
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter, Gauge, Histogram
+from gateway.logging.gateway_logging import GatewayLogger
+
+PIPELINE_SIZE = int(os.getenv('NROD_PIPELINE_SIZE', '10000'))
+
+LOG = GatewayLogger(__file__, False)
+
+QUEUE_DEPTH_G = Gauge(
+    'nrod_pipeline_queue_depth',
+    'Frames waiting in the pipeline',
+    ['topic']
+)
+
+DROPPED_C = Counter(
+    'nrod_pipeline_dropped_count',
+    'Frames dropped because the pipeline buffer was full',
+    ['topic']
+)
+
+STAGE_L = Histogram(
+    'nrod_pipeline_stage_latency',
+    'Latency of each stage of inbound frame processing',
+    ['topic', 'stage']
+)
+
+
+class RingBuffer:
+    """A bounded FIFO buffer that overwrites the oldest entry when full."""
+
+    def __init__(self, size: int) -> None:
+        """Initialisation."""
+        self._items = collections.deque(maxlen=size)
+        self._ready = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        """Return the number of buffered items."""
+        return len(self._items)
+
+    def put(self, item) -> bool:
+        """Append an item, return False if the oldest item was dropped."""
+        with self._ready:
+            dropped = len(self._items) == self._items.maxlen
+            self._items.append(item)
+            self._ready.notify()
+        return not dropped
+
+    def get(self, timeout: float = None):
+        """Remove and return the oldest item, None on timeout or close."""
+        with self._ready:
+            if not self._items and not self._closed:
+                self._ready.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self) -> None:
+        """Wake all waiting consumers."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+
+class FramePipeline:
+    """Hand frames from the STOMP receiver thread to pools of workers.
+
+    Each topic has its own ring buffer and worker threads, so a slow topic
+    cannot hold up another, and the receiver thread only appends to a
+    buffer. Frames for topics without workers are handled inline. A topic
+    with more than one worker no longer processes frames strictly in order.
+    """
+
+    def __init__(self, handler: Callable, workers: Dict[str, int],
+                 size: int = PIPELINE_SIZE) -> None:
+        """Initialisation."""
+        self.handler = handler
+        self.workers = {topic: count for topic, count in workers.items() if count > 0}
+        self.buffers = {topic: RingBuffer(size) for topic in self.workers}
+        self.threads = []
+        self._running = False
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        self._running = True
+        for topic, count in self.workers.items():
+            for idx in range(count):
+                thread = threading.Thread(
+                    target=self.work,
+                    args=(topic,),
+                    name=f'{topic}-{idx}',
+                    daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the worker threads once their current frame is handled."""
+        self._running = False
+        for buffer in self.buffers.values():
+            buffer.close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def submit(self, topic: str, frame) -> None:
+        """Queue the frame for its topic's workers."""
+        buffer = self.buffers.get(topic)
+        if buffer is None:
+            self.handler(frame)
+            return
+
+        if not buffer.put((time.monotonic(), frame)):
+            DROPPED_C.labels(topic=topic).inc()
+        QUEUE_DEPTH_G.labels(topic=topic).set(len(buffer))
+
+    def work(self, topic: str) -> None:
+        """Worker loop - take frames from the buffer and handle them."""
+        buffer = self.buffers[topic]
+        queued_l = STAGE_L.labels(topic=topic, stage='queued')
+        depth_g = QUEUE_DEPTH_G.labels(topic=topic)
+        while self._running:
+            item = buffer.get(timeout=1)
+            if item is None:
+                continue
+
+            queued_at, frame = item
+            queued_l.observe(time.monotonic() - queued_at)
+            depth_g.set(len(buffer))
+            try:
+                self.handler(frame)
+            except Exception as err:
+                LOG.logger.error(
+                    'Unable to process %s frame: %s', topic, err, extra={'topic': topic}
+                )
@@ -0,0 +1,76 @@
+"""TD signalling state, kept as a bitmap per TD area."""
+
+# pylint: disable=E0401, C0413
+
+import os
+import sys
+import threading
+from typing import Dict, List, Tuple
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter
+from gateway.nrod.s_class import SClassMessage
+
+AREA_SIZE = 256
+# the bits set in each byte value, least significant (bit 0) first
+SET_BITS = tuple(
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+)
+
+BIT_CHANGE_C = Counter(
+    'nrod_s_class_bit_change_count',
+    'S-Class bits changed, by message type',
+    ['msg']
+)
+
+# (area, address, bit, value)
+BitChange = Tuple[str, int, int, int]
+
+
+class SignalState:
+    """The last known value of every S-Class byte, by TD area.
+
+    SF updates a single byte; SG (refresh) and SH (refresh finished) update
+    consecutive bytes from their address. Each update returns the bits it
+    changed - every bit of a byte not seen before. Updates are applied one
+    at a time, as TD messages may be processed on several worker threads.
+    """
+
+    def __init__(self) -> None:
+        """Initialisation."""
+        self.lock = threading.Lock()
+        self.areas: Dict[str, bytearray] = {}
+        self.known: Dict[str, bytearray] = {}
+
+    def apply(self, msg: SClassMessage) -> List[BitChange]:
+        """Apply the message, return the changed bits."""
+        area = msg.td
+        address = int(msg.address, 16)
+        data = bytes.fromhex(msg.data)
+        changes = []
+        with self.lock:
+            values = self.areas.get(area)
+            if values is None:
+                values = self.areas[area] = bytearray(AREA_SIZE)
+                self.known[area] = bytearray(AREA_SIZE)
+            known = self.known[area]
+
+            for offset, value in enumerate(data):
+                pos = address + offset
+                if pos >= AREA_SIZE:
+                    break
+                diff = (values[pos] ^ value) if known[pos] else 0xFF
+                values[pos] = value
+                known[pos] = 1
+                for bit in SET_BITS[diff]:
+                    changes.append((area, pos, bit, value >> bit & 1))
+
+        if changes:
+            BIT_CHANGE_C.labels(msg=msg.msg_type.value).inc(len(changes))
+        return changes
+
+    def value(self, area: str, address: int) -> int:
+        """Return the byte at the address, None if not yet known."""
+        known = self.known.get(area)
+        if not known or not known[address]:
+            return None
+        return self.areas[area][address]
@@ -0,0 +1,117 @@
+"""Process pool for TD traffic, sharded by TD area."""
+
+# pylint: disable=E0401, C0413, W0718
+
+import multiprocessing
+import os
+import queue
+import sys
+import zlib
+from typing import Callable, List
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter
+from gateway.logging.gateway_logging import GatewayLogger
+
+TD_SHARDS = int(os.getenv('NROD_TD_SHARDS', '0'))
+SHARD_QUEUE_SIZE = int(os.getenv('NROD_TD_SHARD_QUEUE', '10000'))
+SHARD_PUT_TIMEOUT = 1
+
+LOG = GatewayLogger(__file__, False)
+
+SHARD_C = Counter(
+    'nrod_td_shard_count',
+    'TD elements dispatched to each shard',
+    ['shard']
+)
+
+SHARD_DROPPED_C = Counter(
+    'nrod_td_shard_dropped_count',
+    'TD elements dropped because the shard queue was full',
+    ['shard']
+)
+
+
+def area_of(element: dict) -> str:
+    """Return the TD area of an S or C class element."""
+    for msg in element.values():
+        return msg.get('area_id', '') if isinstance(msg, dict) else ''
+    return ''
+
+
+def shard_for(area: str, shards: int) -> int:
+    """Return the shard for a TD area, stable across processes and restarts."""
+    return zlib.crc32(area.encode()) % shards
+
+
+def run_shard(inbox: multiprocessing.Queue, factory: Callable) -> None:
+    """Worker process - handle each element of each batch, in order."""
+    handler = factory()
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            return
+        for element in batch:
+            try:
+                handler(element)
+            except Exception as err:
+                LOG.logger.error(
+                    'Unable to process TD element: %s', err,
+                    extra={'td_area': area_of(element)}
+                )
+
+
+class TDShardPool:
+    """Validate and publish TD elements in worker processes.
+
+    Every element for a TD area is sent to the same worker, and each worker
+    handles its queue in order, so berth steps within an area are published
+    in the order they were received. The factory is called once in each
+    worker, and returns the callable that handles a single element.
+    Workers are spawned, not forked, as the metrics, log writer and
+    publisher threads are already running, so the factory must be picklable,
+    e.g. a module level function.
+    """
+
+    def __init__(self, factory: Callable, shards: int = TD_SHARDS,
+                 size: int = SHARD_QUEUE_SIZE) -> None:
+        """Initialisation."""
+        self.factory = factory
+        self.shards = shards
+        self.context = multiprocessing.get_context('spawn')
+        self.inboxes = [self.context.Queue(size) for _ in range(shards)]
+        self.processes = []
+
+    def start(self) -> None:
+        """Start a worker process per shard."""
+        for idx, inbox in enumerate(self.inboxes):
+            process = self.context.Process(
+                target=run_shard,
+                args=(inbox, self.factory),
+                name=f'td-shard-{idx}',
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def stop(self) -> None:
+        """Stop the workers once their queues are drained."""
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+    def submit(self, elements: List[dict]) -> None:
+        """Send each element to the shard for its TD area."""
+        batches = [[] for _ in range(self.shards)]
+        for element in elements:
+            batches[shard_for(area_of(element), self.shards)].append(element)
+
+        for idx, batch in enumerate(batches):
+            if not batch:
+                continue
+            try:
+                self.inboxes[idx].put(batch, timeout=SHARD_PUT_TIMEOUT)
+                SHARD_C.labels(shard=idx).inc(len(batch))
+            except queue.Full:
+                SHARD_DROPPED_C.labels(shard=idx).inc(len(batch))
@@ -0,0 +1,105 @@
+"""Schedule details of each active train, by TRUST ID."""
+
+# pylint: disable=E0401, C0413
+
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Optional
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter, Gauge
+
+# trains indexed, the least recently seen is evicted beyond this
+INDEX_SIZE = int(os.getenv('NROD_TRAIN_INDEX_SIZE', '100000'))
+# seconds a train is kept without a message
+TRAIN_TTL = int(os.getenv('NROD_TRAIN_TTL', '43200'))
+# seconds a terminated train is kept, for any late messages
+TERMINATED_TTL = 3600
+
+ACTIVATION = '0001'
+MOVEMENT = '0003'
+CHANGE_OF_IDENTITY = '0007'
+
+TRAIN_INDEX_C = Counter(
+    'nrod_train_index_count',
+    'Train index lookups (FOUND, MISSING) and evictions (EXPIRED, EVICTED)',
+    ['msg']
+)
+
+TRAIN_INDEX_G = Gauge(
+    'nrod_train_index_size',
+    'Trains in the train index'
+)
+
+
+class TrainIndex:
+    """The schedule UID, start date and headcode of each activated train.
+
+    Trains are added by their activation and renamed by a change of
+    identity. Each message for a train keeps it for a further ttl seconds;
+    once terminated, it is kept for TERMINATED_TTL seconds at most. Beyond
+    max_size trains, the least recently seen is evicted.
+    """
+
+    def __init__(self, max_size: int = INDEX_SIZE, ttl: float = TRAIN_TTL) -> None:
+        """Initialisation."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # train_id: (headers, expires), least recently seen first
+        self.trains = collections.OrderedDict()
+
+    def update(self, msg_type: str, values: dict, now: float = None) -> Optional[dict]:
+        """Index the validated message, return the headers for its train, if known."""
+        now = time.monotonic() if now is None else now
+        train_id = values.get('train_id')
+        with self.lock:
+            self.expire(now)
+            if msg_type == ACTIVATION:
+                headers = {
+                    'train_uid': values['train_uid'],
+                    'schedule_start_date': values['schedule_start_date'],
+                    'headcode': values['schedule_wtt_id'][:4]
+                }
+                self.add(train_id, headers, now + self.ttl)
+                return headers
+
+            entry = self.trains.pop(train_id, None)
+            if entry is not None and entry[1] <= now:
+                TRAIN_INDEX_C.labels(msg='EXPIRED').inc()
+                entry = None
+            if entry is None:
+                TRAIN_INDEX_C.labels(msg='MISSING').inc()
+                TRAIN_INDEX_G.set(len(self.trains))
+                return None
+
+            TRAIN_INDEX_C.labels(msg='FOUND').inc()
+            headers, expires = entry
+            if msg_type == CHANGE_OF_IDENTITY and values.get('revised_train_id'):
+                train_id = values['revised_train_id']
+            if msg_type == MOVEMENT and values.get('train_terminated') in (True, 'true'):
+                expires = min(expires, now + TERMINATED_TTL)
+            else:
+                expires = max(expires, now + self.ttl)
+            self.add(train_id, headers, expires)
+            return headers
+
+    def add(self, train_id: str, headers: dict, expires: float) -> None:
+        """Add the train as the most recently seen, evicting beyond max_size."""
+        self.trains.pop(train_id, None)
+        self.trains[train_id] = headers, expires
+        while len(self.trains) > self.max_size:
+            self.trains.popitem(last=False)
+            TRAIN_INDEX_C.labels(msg='EVICTED').inc()
+        TRAIN_INDEX_G.set(len(self.trains))
+
+    def expire(self, now: float) -> None:
+        """Remove the least recently seen trains, while expired."""
+        while self.trains:
+            train_id, (_, expires) = next(iter(self.trains.items()))
+            if expires > now:
+                return
+            del self.trains[train_id]
+            TRAIN_INDEX_C.labels(msg='EXPIRED').inc()
@@ -5,6 +5,7 @@ import re
 from typing import Optional, Union
 from enum import Enum
 import pydantic
+from gateway.validation import trusted_internal
 
 DT_REGEX = '[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}'
 VALID_CANX = [
@@ -147,7 +148,7 @@ class ChangeOfLocation(pydantic.BaseModel):
         return val
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return a ChangeOfLocation object from an NROD COL msg."""
         kwargs = {**element['body'], **element['header']}
@@ -228,7 +229,7 @@ class ChangeOfIdentity(pydantic.BaseModel):
         return val
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return a ChangeOfIdentity object from an NROD COI msg."""
         kwargs = {**element['body'], **element['header']}
@@ -356,7 +357,7 @@ class ChangeOfOrigin(pydantic.BaseModel):
         return val
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return a ChangeOfOrigin object from an NROD COO msg."""
         kwargs = {**element['body'], **element['header']}
@@ -477,7 +478,7 @@ class Reinstatement(pydantic.BaseModel):
         return val
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return a Reinstatement object from an NROD reinstatement msg."""
         kwargs = {**element['body'], **element['header']}
@@ -743,7 +744,7 @@ class Movement(pydantic.BaseModel):
         return val
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return a Movement object from an NROD movement msg."""
         kwargs = {**element['body'], **element['header']}
@@ -865,7 +866,7 @@ class Cancellation(pydantic.BaseModel):
         return value
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return a Cancellation object from an NROD activation msg."""
         kwargs = {**element['body'], **element['header']}
@@ -1012,7 +1013,7 @@ class Activation(pydantic.BaseModel):
         return value
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, element: dict) -> object:
         """Return an Activation object from an NROD activation msg."""
         kwargs = {**element['body'], **element['header']}
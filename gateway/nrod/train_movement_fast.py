@@ -0,0 +1,375 @@
+"""Fast path validation for train movement messages, without pydantic models.
+
+Each converter applies the same coercion, constraints and validators as the
+corresponding model in train_movement.py, in the same field order, and returns
+a dict which json.dumps serialises identically to the model's .json(). Invalid
+messages raise pydantic.ValidationError, as the models do.
+"""
+
+# pylint: disable=E1101
+import re
+from decimal import Decimal
+from typing import Callable, Tuple
+import pydantic
+from pydantic.error_wrappers import ErrorWrapper
+from gateway.nrod.train_movement import (
+    VALID_CANX,
+    VALID_VAR_STATUS,
+    Activation,
+    Cancellation,
+    CallMode,
+    CallType,
+    ChangeOfIdentity,
+    ChangeOfLocation,
+    ChangeOfOrigin,
+    EventSource,
+    Movement,
+    MovementEventType,
+    PlannedEventType,
+    Reinstatement
+)
+
+STANOX = re.compile('[0-9]{5}')
+CODE = re.compile('[0-9A-Z]{2}')
+DATE = re.compile('[0-9]{4}-[0-9]{2}-[0-9]{2}')
+UID = re.compile('[ A-Z0-9]{5,6}')
+SCHEDULE_TYPE = re.compile('[CNOP]{1}')
+
+MISSING = object()
+
+
+def to_str(value) -> str:
+    """Coerce to str, as pydantic's str_validator."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (float, int, Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    raise TypeError('str type expected')
+
+
+def to_int(value) -> int:
+    """Coerce to int, as pydantic's int_validator."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return int(value)
+
+
+def constr(min_length: int = None, max_length: int = None, regex=None) -> Callable:
+    """Return a str coercion applying the given constraints."""
+    def validate(value) -> str:
+        value = to_str(value)
+        if min_length is not None and len(value) < min_length:
+            raise ValueError(f'ensure this value has at least {min_length} characters')
+        if max_length is not None and len(value) > max_length:
+            raise ValueError(f'ensure this value has at most {max_length} characters')
+        if regex and not regex.match(value):
+            raise ValueError(f'string does not match regex "{regex.pattern}"')
+        return value
+    return validate
+
+
+def enum(enum_type) -> Callable:
+    """Return a coercion to the value of a member of enum_type."""
+    values = {member.value for member in enum_type}
+
+    def validate(value) -> str:
+        if value not in values:
+            raise ValueError(f'value is not a valid enumeration member: {value}')
+        return value
+    return validate
+
+
+def then(coerce: Callable, validator: Callable) -> Callable:
+    """Return a coercion followed by a validator."""
+    return lambda value: validator(coerce(value))
+
+
+def stripped(value: str):
+    """Strip the value, blank becomes None."""
+    if not value or not value.strip():
+        return None
+    return value.strip()
+
+
+def stanox(value: str):
+    """Validate a stripped STANOX."""
+    val = stripped(value)
+    if val is not None and not STANOX.match(val):
+        raise ValueError(f'Invalid STANOX: {val}')
+    return val
+
+
+def unstripped_stanox(value: str):
+    """Validate a STANOX which is not stripped."""
+    if not value:
+        return None
+    if not STANOX.match(value):
+        raise ValueError(f'Invalid STANOX: {value}')
+    return value
+
+
+def timestamp(value: str):
+    """Validate a stripped, decimal timestamp."""
+    val = stripped(value)
+    if val is not None and not val.isdecimal():
+        raise ValueError(f'Not a valid timestamp: {val}')
+    return val
+
+
+def train_id(value: str):
+    """Validate a stripped TRUST ID."""
+    val = stripped(value)
+    if val is not None and len(val) != 10:
+        raise ValueError(f'Invalid TRUST ID: {val}')
+    return val
+
+
+def str_or_bool(value) -> bool:
+    """Coerce Union[str, bool], then validate as a bool string.
+
+    pydantic tries str first, which accepts a bool as 'True' or 'False'.
+    """
+    return to_str(value).strip() == 'true'
+
+
+def direction(value: str):
+    """Validate a direction."""
+    if not value or not value.strip():
+        return None
+    if value.strip() not in ['UP', 'DOWN']:
+        raise ValueError(f'Invalid Direction: {value}')
+    return value.strip()
+
+
+def one_of(valid: list, name: str) -> Callable:
+    """Return a validator accepting only values in valid."""
+    def validate(value: str) -> str:
+        if value not in valid:
+            raise ValueError(f'Invalid {name}: {value}')
+        return value
+    return validate
+
+
+def int_or_str(value):
+    """Coerce Union[int, str], then validate as an optional int."""
+    try:
+        value = to_int(value)
+    except (TypeError, ValueError):
+        value = to_str(value)
+    if not value:
+        return None
+    return int(value)
+
+
+def schedule_source(value: str) -> str:
+    """Validate the schedule source."""
+    if value.strip() in ('C', 'V'):
+        return value.strip()
+    return 'V'
+
+
+def field(name: str, coerce: Callable, alias: str = None, required=True,
+          default=None, nullable=False, by_name=True) -> Tuple:
+    """Return the specification of a field.
+
+    The keys are looked up in order; the field name is only used if the
+    model allows population by field name.
+    """
+    keys = (alias or name,)
+    if alias and by_name:
+        keys = (alias, name)
+    return name, keys, required, default, nullable, coerce
+
+
+def optional(name: str, coerce: Callable = to_str, alias: str = None, **kwargs) -> Tuple:
+    """Return the specification of an Optional field, default None."""
+    return field(name, coerce, alias, required=False, nullable=True, **kwargs)
+
+
+def error(model, name: str, exc: Exception) -> pydantic.ValidationError:
+    """Return a ValidationError for the field, as the model would raise."""
+    return pydantic.ValidationError([ErrorWrapper(exc, loc=name)], model)
+
+
+def compile_fields(model, fields: Tuple[Tuple, ...]) -> Callable:
+    """Return a converter, from an NROD element to a dict, for the fields."""
+    def convert(element: dict) -> dict:
+        data = {**element['body'], **element['header']}
+        out = {}
+        for name, keys, required, default, nullable, coerce in fields:
+            value = MISSING
+            for key in keys:
+                value = data.get(key, MISSING)
+                if value is not MISSING:
+                    break
+
+            if value is MISSING:
+                if required:
+                    raise error(model, name, pydantic.errors.MissingError())
+                out[name] = default
+                continue
+
+            if value is None:
+                if not nullable:
+                    raise error(model, name, pydantic.errors.NoneIsNotAllowedError())
+                out[name] = None
+                continue
+
+            try:
+                out[name] = coerce(value)
+            except (ValueError, TypeError, AssertionError) as exc:
+                raise error(model, name, exc) from None
+        return out
+    return convert
+
+
+change_of_location = compile_fields(ChangeOfLocation, (
+    field('source_id', to_str, 'source_dev_id'),
+    field('data_source', to_str, 'original_data_source'),
+    field('source_system', to_str, 'source_system_id'),
+    optional('original_loc_timestamp', then(to_str, timestamp)),
+    optional('current_train_id', then(to_str, train_id)),
+    optional('train_file_address'),
+    field('train_service_code', to_str),
+    optional('dep_timestamp', then(to_str, timestamp)),
+    optional('loc_stanox', then(constr(max_length=5), stanox)),
+    optional('train_id', then(to_str, train_id)),
+    optional('original_loc_stanox', then(to_str, stanox)),
+    optional('event_timestamp', then(to_str, timestamp))
+))
+
+change_of_identity = compile_fields(ChangeOfIdentity, (
+    optional('source_id', alias='source_dev_id'),
+    field('data_source', to_str, 'original_data_source'),
+    field('source_system', to_str, 'source_system_id'),
+    optional('current_train_id'),
+    optional('train_file_address'),
+    field('train_service_code', to_str),
+    optional('revised_train_id', then(to_str, train_id)),
+    optional('train_id', then(to_str, train_id)),
+    optional('event_timestamp', then(to_str, timestamp))
+))
+
+change_of_origin = compile_fields(ChangeOfOrigin, (
+    optional('source_id', alias='source_dev_id'),
+    field('data_source', to_str, 'original_data_source'),
+    field('source_system', to_str, 'source_system_id'),
+    optional('reason_code', constr(2, 2, CODE)),
+    optional('current_train_id', then(to_str, train_id)),
+    optional('original_loc_timestamp', then(to_str, timestamp)),
+    optional('train_file_address'),
+    field('train_service_code', to_str),
+    field('toc_id', constr(2, 2, CODE)),
+    optional('dep_timestamp', then(to_str, timestamp)),
+    optional('coo_timestamp', then(to_str, timestamp)),
+    field('division_code', constr(2, 2, CODE)),
+    optional('loc_stanox', then(constr(max_length=5), stanox)),
+    optional('train_id', then(to_str, train_id)),
+    optional('original_loc_stanox', then(to_str, stanox))
+))
+
+reinstatement = compile_fields(Reinstatement, (
+    field('source_id', to_str, 'source_dev_id'),
+    field('data_source', to_str, 'original_data_source'),
+    field('source_system', to_str, 'source_system_id'),
+    optional('train_id', then(to_str, train_id)),
+    optional('current_train_id', then(to_str, train_id)),
+    optional('original_loc_timestamp', then(to_str, timestamp)),
+    optional('dep_timestamp', then(to_str, timestamp)),
+    optional('loc_stanox', then(constr(max_length=5), stanox)),
+    optional('original_loc_stanox', then(to_str, stanox)),
+    optional('reinstatement_timestamp', then(to_str, timestamp)),
+    field('toc_id', constr(2, 2, CODE)),
+    field('division_code', constr(2, 2, CODE)),
+    optional('train_file_address'),
+    field('train_service_code', to_str)
+))
+
+movement = compile_fields(Movement, (
+    field('source_id', to_str, 'source_system_id'),
+    field('data_source', to_str, 'original_data_source', required=False, default='TRUST'),
+    field('source_system', to_str, 'source_system_id'),
+    field('event_type', enum(MovementEventType)),
+    optional('gbtt_timestamp', then(to_str, timestamp)),
+    optional('original_loc_stanox', then(to_str, stanox)),
+    optional('planned_timestamp', then(to_str, timestamp)),
+    field('timetable_variation', to_int),
+    optional('original_loc_timestamp', then(to_str, timestamp)),
+    optional('current_train_id', then(to_str, train_id)),
+    field('delay_monitoring_point', str_or_bool),
+    optional('next_report_run_time', then(to_str, stripped)),
+    optional('reporting_stanox', then(to_str, stanox)),
+    field('actual_timestamp', then(to_str, timestamp)),
+    field('correction_ind', str_or_bool),
+    field('event_source', enum(EventSource)),
+    optional('train_file_address', then(to_str, stripped)),
+    optional('platform', then(to_str, stripped)),
+    field('division_code', constr(2, 2, CODE)),
+    field('train_terminated', str_or_bool),
+    field('train_id', constr(10, 10)),
+    field('offroute_ind', str_or_bool),
+    field('variation_status', then(to_str, one_of(VALID_VAR_STATUS, 'variation status'))),
+    field('train_service_code', to_str),
+    field('toc_id', constr(2, 2, CODE)),
+    optional('loc_stanox', then(constr(max_length=5), stanox)),
+    field('auto_expected', str_or_bool, required=False, default=False),
+    optional('direction_ind', then(to_str, direction)),
+    optional('route', then(to_str, stripped)),
+    field('planned_event_type', enum(PlannedEventType)),
+    optional('next_report_stanox', then(to_str, stanox)),
+    optional('line_ind', then(to_str, stripped))
+))
+
+cancellation = compile_fields(Cancellation, (
+    optional('source_id', alias='source_dev_id'),
+    optional('data_source', alias='original_data_source'),
+    field('source_system', to_str, 'source_system_id'),
+    optional('train_file_address'),
+    field('train_service_code', to_str),
+    optional('orig_loc_stanox', then(constr(max_length=5), unstripped_stanox)),
+    field('toc_id', constr(2, 2, CODE)),
+    field('dep_timestamp', to_int),
+    field('division_code', constr(2, 2, CODE)),
+    field('loc_stanox', then(constr(max_length=5), unstripped_stanox)),
+    field('canx_timestamp', to_int),
+    field('canx_reason_code', constr(2, 2, CODE)),
+    field('train_id', constr(10, 10)),
+    optional('orig_loc_timestamp', int_or_str),
+    field('canx_type', then(to_str, one_of(VALID_CANX, 'cancellation type')))
+))
+
+activation = compile_fields(Activation, (
+    optional('source_id', alias='source_dev_id', by_name=False),
+    optional('data_source', alias='original_data_source', by_name=False),
+    optional('source_system', alias='source_system_id', by_name=False),
+    field('schedule_source', then(to_str, schedule_source)),
+    optional('train_file_address'),
+    field('schedule_end_date', constr(10, 10, DATE)),
+    field('train_id', constr(10, 10)),
+    field('tp_origin_timestamp', constr(10, 10, DATE)),
+    field('creation_timestamp', to_int),
+    optional('tp_origin_stanox', then(constr(max_length=5), unstripped_stanox)),
+    field('origin_dep_timestamp', to_int),
+    field('train_service_code', to_str),
+    field('toc_id', constr(2, 2, CODE)),
+    field('d1266_record_number', to_str),
+    field('train_call_type', enum(CallType)),
+    field('train_uid', then(constr(5, 6, UID), str.strip)),
+    field('train_call_mode', enum(CallMode)),
+    field('schedule_type', constr(regex=SCHEDULE_TYPE)),
+    field('sched_origin_stanox', then(constr(max_length=5), unstripped_stanox)),
+    field('schedule_wtt_id', constr(5, 5)),
+    field('schedule_start_date', constr(10, 10, DATE))
+))
+
+FAST_PATH = {
+    Activation: activation,
+    Cancellation: cancellation,
+    Movement: movement,
+    Reinstatement: reinstatement,
+    ChangeOfOrigin: change_of_origin,
+    ChangeOfIdentity: change_of_identity,
+    ChangeOfLocation: change_of_location
+}
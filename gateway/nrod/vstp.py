@@ -3,6 +3,7 @@
 from typing import Union, List, Optional
 import re
 import pydantic
+from gateway.validation import trusted_internal
 
 REF = 'VSTPCIFMsgV1'
 DT_REGEX = '[0-9]{4}-[0-9]{2}-[0-9]{2}'
@@ -102,7 +103,7 @@ class ScheduleRow(pydantic.BaseModel):
         return value.strip()
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, schedule_row: dict) -> object:
         """Creates a ScheduleRow object from an nrod vstp schedule row."""
         sched = schedule_row
@@ -152,7 +153,7 @@ class BasicScheduleExtra(pydantic.BaseModel):
     )
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, schedule: dict) -> object:
         """Creates a BasicScheduleExtra object from an nrod vstp schedule."""
         sched = schedule[REF]['schedule']
@@ -301,7 +302,7 @@ class BasicSchedule(pydantic.BaseModel):
         return val
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, schedule: dict) -> object:
         """Creates a BasicSchedule object from an nrod vstp schedule."""
         sched = schedule[REF]['schedule']
@@ -328,7 +329,7 @@ class MessageDetails(pydantic.BaseModel):
     )
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, schedule: dict) -> object:
         """Creates a MessageDetails object from an nrod vstp schedule."""
         kwargs = schedule[REF]['Sender']
@@ -367,7 +368,7 @@ class VSTPSchedule(pydantic.BaseModel):
     )
 
     @staticmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def get_intermediate_rows(schedule_rows: list) -> List[LocationIntermediate]:
         """Return a list of LI objects."""
         schedule_rows = schedule_rows[1:]
@@ -375,7 +376,7 @@ class VSTPSchedule(pydantic.BaseModel):
         return [LocationIntermediate.nrod_factory(row) for row in schedule_rows]
 
     @classmethod
-    @pydantic.validate_arguments
+    @trusted_internal
     def nrod_factory(cls, schedule: dict) -> object:
         """Create a VSTP schedule object from an NROD VSTP record."""
         kwargs = {
@@ -2,57 +2,107 @@
 
 # pylint: disable=E0401, C0413, R0903
 
+import atexit
+import collections
+import itertools
 import os
 import sys
+import threading
+import time
+import zlib
 import pika
-import pydantic
-from prometheus_client import Counter
+from prometheus_client import Counter, Histogram
 sys.path.append(os.getcwd())  # nopep8
 from gateway.logging.gateway_logging import GatewayLogger
+from gateway.validation import trusted_internal
+from gateway.rabbitmq.spool import SPOOL_DIR, SpooledPublisher, open_spool, orphan_spools
 
 MAX_RETRY = 5
 LOG = GatewayLogger(__file__, False)
 
+BATCH_PUBLISH = os.getenv('RMQ_BATCH_PUBLISH', 'false').lower() == 'true'
+BATCH_SIZE = int(os.getenv('RMQ_BATCH_SIZE', '500'))
+BATCH_WINDOW = float(os.getenv('RMQ_BATCH_WINDOW', '0.05'))
+BATCH_MAX_PENDING = int(os.getenv('RMQ_BATCH_MAX_PENDING', '100000'))
+CONFIRM_WINDOW = int(os.getenv('RMQ_CONFIRM_WINDOW', '5000'))
+POOL_SIZE = int(os.getenv('RMQ_POOL_SIZE', '0'))
+HEALTH_INTERVAL = 30
+RECONNECT_DELAY = 5
+
 RMQ_DELIVERY_C = Counter(
     'nrod_rmq_delivery_stats',
     'RMQ send message retry count',
     ['msg']
 )
 
+RMQ_BATCH_SIZE_H = Histogram(
+    'rmq_batch_size',
+    'Number of messages published per batch',
+    ['exchange'],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+
+RMQ_POOL_C = Counter(
+    'rmq_pool_connection_stats',
+    'Shared RMQ connections opened (CONNECTED), failed (FAILED) or found closed (LOST)',
+    ['msg']
+)
+
+RMQ_FLUSH_LATENCY_H = Histogram(
+    'rmq_batch_flush_latency',
+    'Seconds from publishing a batch until the broker confirms it',
+    ['exchange']
+)
+
+
+def get_connection_parameters() -> pika.ConnectionParameters:
+    """Return the RMQ connection parameters from the environment."""
+    credentials = pika.PlainCredentials(
+        username=os.getenv('RMQ_PROD_USER'),
+        password=os.getenv('RMQ_PROD_PASS')
+    )
+
+    return pika.ConnectionParameters(
+        host=os.getenv('RMQ_HOST'),
+        port=int(os.getenv('RMQ_PORT')),
+        virtual_host='/',
+        credentials=credentials,
+        heartbeat=600,
+        blocked_connection_timeout=300
+    )
+
 
 class OutboundConnection:
     """Representation of an outbound connection to RMQ."""
 
+    # spool messages to RMQ_SPOOL_DIR rather than drop them when RMQ is unavailable
+    spool_failed = True
+
     class Config:
         """Pydantic configuration."""
 
         arbitrary_types_allowed = True
 
-    def __init__(self, exchange: str) -> None:
+    def __init__(self, exchange: str, exchange_type: str = 'fanout') -> None:
         """Initialisation."""
         self.exchange = exchange
+        self.exchange_type = exchange_type
 
-        self.credentials = pika.PlainCredentials(
-            username=os.getenv('RMQ_PROD_USER'),
-            password=os.getenv('RMQ_PROD_PASS')
-        )
+        self.parameters = get_connection_parameters()
+        self.credentials = self.parameters.credentials
 
         self.send_message_properties = pika.BasicProperties(
             expiration='100000',
         )
 
-        self.parameters = pika.ConnectionParameters(
-            host=os.getenv('RMQ_HOST'),
-            port=int(os.getenv('RMQ_PORT')),
-            virtual_host='/',
-            credentials=self.credentials,
-            heartbeat=600,
-            blocked_connection_timeout=300
-        )
-
         self.channel = None
         self.connection = None
 
+        self.spooled = None
+        if SPOOL_DIR and self.spool_failed:
+            self.spooled = SpooledPublisher(
+                open_spool(exchange), self.publish_spooled, orphan_spools(exchange))
+
     def create_connection(self) -> bool:
         """Create the RMQ Connection."""
         try:
@@ -60,7 +110,7 @@ class OutboundConnection:
             self.channel = self.connection.channel()
             self.channel.exchange_declare(
                 exchange=self.exchange,
-                exchange_type='fanout',
+                exchange_type=self.exchange_type,
                 durable=True
             )
             return True
@@ -68,15 +118,16 @@ class OutboundConnection:
             LOG.logger.error('Unable to create the connection: %s', err)
             return False
 
-    @pydantic.validate_arguments
-    def publish_message(self, msg: str) -> bool:
+    @trusted_internal(config={'arbitrary_types_allowed': True})
+    def publish_message(self, msg: str, routing_key: str = '',
+                        properties: pika.BasicProperties = None) -> bool:
         """Publish the message to the exchange."""
         try:
             self.channel.basic_publish(
                 body=msg,
                 exchange=self.exchange,
-                routing_key='',
-                properties=self.send_message_properties
+                routing_key=routing_key,
+                properties=properties or self.send_message_properties
             )
             RMQ_DELIVERY_C.labels(msg='DELIVERED').inc()
             return True
@@ -95,11 +146,16 @@ class OutboundConnection:
             self.channel = None
             self.connection = None
 
-    @pydantic.validate_arguments
-    def send_message(self, msg: str, headers: dict = None, attempt=1) -> bool:
+    @trusted_internal
+    def send_message(self, msg: str, headers: dict = None, attempt=1,
+                     routing_key: str = '') -> bool:
         """Publish a message to the broker."""
+        if self.spooled:
+            return self.spooled.send(msg, headers, routing_key)
+
+        properties = self.send_message_properties
         if headers:
-            self.send_message_properties = pika.BasicProperties(
+            properties = pika.BasicProperties(
                 expiration='100000',
                 headers=headers
             )
@@ -107,11 +163,591 @@ class OutboundConnection:
         if not self.channel or not self.channel.is_open:
             self.create_connection()
 
-        if not self.publish_message(msg):
+        if not self.publish_message(msg, routing_key, properties):
             att = attempt + 1
             if att > MAX_RETRY:
                 return False
             RMQ_DELIVERY_C.labels(msg='RETRY').inc()
             self.close_connection()
-            self.send_message(msg, headers=headers, attempt=att)
+            return self.send_message(msg, headers=headers, attempt=att, routing_key=routing_key)
         return True
+
+    def publish_spooled(self, msg: str, headers: dict = None, routing_key: str = '') -> bool:
+        """Publish a single attempt for the spool, return False if not sent."""
+        if not self.channel or not self.channel.is_open:
+            if not self.create_connection():
+                return False
+
+        properties = self.send_message_properties
+        if headers:
+            properties = pika.BasicProperties(expiration='100000', headers=headers)
+
+        if self.publish_message(msg, routing_key, properties):
+            return True
+        RMQ_DELIVERY_C.labels(msg='RETRY').inc()
+        self.close_connection()
+        return False
+
+
+class ExchangeState:
+    """Buffer and confirm tracking for one exchange of a BatchPublisher."""
+
+    def __init__(self, exchange: str, exchange_type: str = 'fanout') -> None:
+        """Initialisation."""
+        self.exchange = exchange
+        self.exchange_type = exchange_type
+        self.buffer = collections.deque()
+        self.unconfirmed = collections.OrderedDict()
+        self.batches = collections.deque()
+        self.channel = None
+        self.next_tag = 1
+
+    @property
+    def ready(self) -> bool:
+        """Return True if the channel is open and in confirm mode."""
+        return self.channel is not None and self.channel.is_open
+
+    def requeue_unconfirmed(self) -> int:
+        """Return unconfirmed messages to the front of the buffer, in order."""
+        pending = list(self.unconfirmed.values())
+        self.buffer.extendleft(reversed(pending))
+        self.unconfirmed.clear()
+        self.batches.clear()
+        return len(pending)
+
+
+class BatchPublisher:
+    """Coalesce messages into batches, publish them with pipelined confirms.
+
+    Messages are buffered per exchange by the calling thread and published
+    by a single I/O thread running a pika SelectConnection. Each flush sends
+    at most batch_size messages, and no more than confirm_window messages
+    per exchange may be awaiting a broker confirm at any time. Callers never
+    wait on the broker; if an exchange buffer reaches max_pending, new
+    messages are rejected and counted as DROPPED.
+    """
+
+    def __init__(self, parameters: pika.ConnectionParameters,
+                 batch_size: int = BATCH_SIZE, window: float = BATCH_WINDOW,
+                 max_pending: int = BATCH_MAX_PENDING,
+                 confirm_window: int = CONFIRM_WINDOW) -> None:
+        """Initialisation."""
+        self.parameters = parameters
+        self.batch_size = batch_size
+        self.window = window
+        self.max_pending = max_pending
+        self.confirm_window = confirm_window
+        self.exchanges = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._connection = None
+        self._stopping = False
+        self._wake_pending = False
+
+    def register(self, exchange: str, exchange_type: str = 'fanout') -> ExchangeState:
+        """Register an exchange with the publisher, return its state."""
+        with self._lock:
+            state = self.exchanges.get(exchange)
+            if state:
+                return state
+            state = ExchangeState(exchange, exchange_type)
+            self.exchanges[exchange] = state
+
+        connection = self._connection
+        if connection and connection.is_open:
+            self._threadsafe(lambda: self._open_channel(state))
+        return state
+
+    def publish(self, exchange: str, body: str,
+                properties: pika.BasicProperties, routing_key: str = '') -> bool:
+        """Buffer a message for publishing, return False if rejected."""
+        state = self.exchanges.get(exchange) or self.register(exchange)
+        if len(state.buffer) >= self.max_pending:
+            RMQ_DELIVERY_C.labels(msg='DROPPED').inc()
+            return False
+
+        state.buffer.append((body, properties, routing_key))
+        self.start()
+
+        if len(state.buffer) >= self.batch_size and not self._wake_pending:
+            self._wake_pending = True
+            self._threadsafe(self._flush_all)
+        return True
+
+    def start(self) -> None:
+        """Start the I/O thread, if not already running."""
+        if self._thread:
+            return
+        with self._lock:
+            if self._thread:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run,
+                name='rmq-batch-publisher',
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Flush what can be flushed within timeout, then close."""
+        thread = self._thread
+        if not thread:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(
+                state.buffer or state.unconfirmed for state in self.exchanges.values()):
+            time.sleep(self.window)
+
+        self._stopping = True
+        self._threadsafe(self._close)
+        thread.join(max(deadline - time.monotonic(), 1))
+        self._thread = None
+
+    def flush(self, exchange: str, timeout: float = 10) -> bool:
+        """Wait up to timeout for the exchange's messages to be confirmed, return True if so."""
+        state = self.exchanges.get(exchange)
+        if not state or not self._thread:
+            return not (state and (state.buffer or state.unconfirmed))
+        self._threadsafe(self._flush_all)
+        deadline = time.monotonic() + timeout
+        while (state.buffer or state.unconfirmed) and time.monotonic() < deadline:
+            time.sleep(self.window)
+        return not (state.buffer or state.unconfirmed)
+
+    def _threadsafe(self, callback) -> None:
+        """Run callback on the I/O thread."""
+        connection = self._connection
+        if not connection:
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(callback)
+        except Exception as err:
+            LOG.logger.debug('Unable to schedule on the I/O loop: %s', err)
+
+    def _run(self) -> None:
+        """I/O thread - connect, run the loop, reconnect when it stops."""
+        while not self._stopping:
+            self._connection = pika.SelectConnection(
+                parameters=self.parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed
+            )
+            self._connection.ioloop.start()
+            if not self._stopping:
+                time.sleep(RECONNECT_DELAY)
+
+    def _close(self) -> None:
+        """Close the connection, from the I/O thread."""
+        connection = self._connection
+        if connection.is_open:
+            connection.close()
+        elif not connection.is_closing:
+            self._connection_ended(connection)
+
+    def _connection_ended(self, connection) -> None:
+        """The connection has closed or failed to open - return to _run."""
+        connection.ioloop.stop()
+
+    def _on_connection_open(self, connection) -> None:
+        """Open a channel per exchange and start the flush timer."""
+        for state in list(self.exchanges.values()):
+            self._open_channel(state)
+        connection.ioloop.call_later(self.window, self._on_timer)
+
+    def _on_connection_error(self, connection, err) -> None:
+        """The connection could not be opened."""
+        LOG.logger.error('Unable to create the connection: %s', err)
+        self._connection_ended(connection)
+
+    def _on_connection_closed(self, connection, reason) -> None:
+        """The connection closed - keep unconfirmed messages for the next one."""
+        for state in self.exchanges.values():
+            state.channel = None
+            if state.requeue_unconfirmed():
+                RMQ_DELIVERY_C.labels(msg='RETRY').inc()
+        if not self._stopping:
+            LOG.logger.error('RMQ connection closed: %s', reason)
+        self._connection_ended(connection)
+
+    def _open_channel(self, state: ExchangeState) -> None:
+        """Open, declare and confirm-enable the channel for an exchange."""
+        def on_confirm_ok(_frame):
+            state.next_tag = 1
+            state.channel = channel
+
+        def on_declared(_frame):
+            channel.confirm_delivery(
+                ack_nack_callback=lambda frame: self._on_confirmation(state, frame),
+                callback=on_confirm_ok
+            )
+
+        def on_open(chan):
+            nonlocal channel
+            channel = chan
+            chan.add_on_close_callback(
+                lambda _chan, reason: self._on_channel_closed(state, reason))
+            chan.exchange_declare(
+                exchange=state.exchange,
+                exchange_type=state.exchange_type,
+                durable=True,
+                callback=on_declared
+            )
+
+        channel = None
+        self._connection.channel(on_open_callback=on_open)
+
+    def _on_channel_closed(self, state: ExchangeState, reason) -> None:
+        """A channel closed - requeue its unconfirmed messages and reopen."""
+        state.channel = None
+        if state.requeue_unconfirmed():
+            RMQ_DELIVERY_C.labels(msg='RETRY').inc()
+        connection = self._connection
+        if connection and connection.is_open and not self._stopping:
+            LOG.logger.error('Channel for %s closed: %s', state.exchange, reason)
+            connection.ioloop.call_later(RECONNECT_DELAY, lambda: self._open_channel(state))
+
+    def _on_timer(self) -> None:
+        """Periodic flush, so no message waits longer than the window."""
+        self._flush_all()
+        connection = self._connection
+        if connection and connection.is_open:
+            connection.ioloop.call_later(self.window, self._on_timer)
+
+    def _flush_all(self) -> None:
+        """Flush every exchange with buffered messages."""
+        self._wake_pending = False
+        again = False
+        for state in list(self.exchanges.values()):
+            if state.ready and state.buffer:
+                self._flush(state)
+                again = again or (
+                    len(state.buffer) >= self.batch_size
+                    and len(state.unconfirmed) < self.confirm_window
+                )
+        if again:
+            self._connection.ioloop.call_later(0, self._flush_all)
+
+    def _flush(self, state: ExchangeState) -> int:
+        """Publish a single batch for the exchange, return its size."""
+        room = self.confirm_window - len(state.unconfirmed)
+        size = min(self.batch_size, room, len(state.buffer))
+        if size <= 0:
+            return 0
+
+        started = time.monotonic()
+        for _ in range(size):
+            message = state.buffer.popleft()
+            body, properties, routing_key = message
+            state.channel.basic_publish(
+                exchange=state.exchange,
+                routing_key=routing_key,
+                body=body,
+                properties=properties
+            )
+            state.unconfirmed[state.next_tag] = message
+            state.next_tag += 1
+
+        state.batches.append((state.next_tag - 1, started))
+        RMQ_BATCH_SIZE_H.labels(exchange=state.exchange).observe(size)
+        return size
+
+    def _on_confirmation(self, state: ExchangeState, frame) -> None:
+        """Handle a Basic.Ack or Basic.Nack from the broker."""
+        method = frame.method
+        tag = method.delivery_tag
+        if method.multiple:
+            tags = list(itertools.takewhile(lambda key: key <= tag, state.unconfirmed))
+        else:
+            tags = [tag] if tag in state.unconfirmed else []
+
+        confirmed = [state.unconfirmed.pop(key) for key in tags]
+        if isinstance(method, pika.spec.Basic.Nack):
+            state.buffer.extendleft(reversed(confirmed))
+            RMQ_DELIVERY_C.labels(msg='RETRY').inc(len(confirmed))
+        else:
+            RMQ_DELIVERY_C.labels(msg='DELIVERED').inc(len(confirmed))
+
+        oldest = next(iter(state.unconfirmed), None)
+        now = time.monotonic()
+        while state.batches and (oldest is None or state.batches[0][0] < oldest):
+            _, started = state.batches.popleft()
+            RMQ_FLUSH_LATENCY_H.labels(exchange=state.exchange).observe(now - started)
+
+
+BATCH_PUBLISHER = None
+BATCH_PUBLISHER_LOCK = threading.Lock()
+
+
+def get_batch_publisher() -> BatchPublisher:
+    """Return the process wide BatchPublisher, creating it if required."""
+    global BATCH_PUBLISHER  # pylint: disable=W0603
+    with BATCH_PUBLISHER_LOCK:
+        if not BATCH_PUBLISHER:
+            BATCH_PUBLISHER = BatchPublisher(get_connection_parameters())
+        return BATCH_PUBLISHER
+
+
+def reset_batch_publisher() -> None:
+    """Forget the parent's BatchPublisher in a forked child process."""
+    global BATCH_PUBLISHER, BATCH_PUBLISHER_LOCK  # pylint: disable=W0603
+    BATCH_PUBLISHER = None
+    BATCH_PUBLISHER_LOCK = threading.Lock()
+
+
+def stop_batch_publisher() -> None:
+    """Flush and stop the process wide BatchPublisher, on process exit."""
+    publisher = BATCH_PUBLISHER
+    if publisher:
+        publisher.stop()
+
+
+def install_batch_publisher(publisher: BatchPublisher) -> None:
+    """Make publisher the process wide BatchPublisher, used by every new connection."""
+    global BATCH_PUBLISH, BATCH_PUBLISHER  # pylint: disable=W0603
+    with BATCH_PUBLISHER_LOCK:
+        BATCH_PUBLISH = True
+        BATCH_PUBLISHER = publisher
+
+
+atexit.register(stop_batch_publisher)
+os.register_at_fork(after_in_child=reset_batch_publisher)
+
+
+class BatchOutboundConnection(OutboundConnection):
+    """An outbound connection that hands messages to the BatchPublisher."""
+
+    # the BatchPublisher buffers messages itself
+    spool_failed = False
+
+    def __init__(self, exchange: str, publisher: BatchPublisher = None,
+                 exchange_type: str = 'fanout') -> None:
+        """Initialisation."""
+        super().__init__(exchange, exchange_type)
+        self.publisher = publisher or get_batch_publisher()
+        self.publisher.register(exchange, exchange_type)
+
+    def create_connection(self) -> bool:
+        """The publisher owns the connection."""
+        self.publisher.start()
+        return True
+
+    def close_connection(self):
+        """Flush this exchange's outstanding messages.
+
+        The publisher, and its connection, are shared by every exchange in
+        the process, so are left running; stop_batch_publisher stops them
+        when the process exits.
+        """
+        if not self.publisher.flush(self.exchange):
+            LOG.logger.error('Unable to flush %s before closing', self.exchange)
+
+    def send_message(self, msg: str, headers: dict = None, attempt=1,
+                     routing_key: str = '') -> bool:
+        """Buffer the message for publishing, without waiting on the broker."""
+        properties = self.send_message_properties
+        if headers:
+            properties = pika.BasicProperties(
+                expiration='100000',
+                headers=headers
+            )
+        return self.publisher.publish(self.exchange, msg, properties, routing_key)
+
+
+class PooledConnection:
+    """A BlockingConnection shared by several outbound connections.
+
+    BlockingConnection is not thread safe, so every use must hold the lock.
+    After a failure, no further attempt to connect is made for
+    RECONNECT_DELAY seconds, however many exchanges are publishing.
+    """
+
+    def __init__(self, parameters: pika.ConnectionParameters) -> None:
+        """Initialisation."""
+        self.parameters = parameters
+        self.lock = threading.RLock()
+        self.connection = None
+        self.generation = 0
+        self.retry_at = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if the connection is open."""
+        return self.connection is not None and self.connection.is_open
+
+    def connect(self) -> bool:
+        """Open the connection, if not already open."""
+        with self.lock:
+            if self.is_open:
+                return True
+            if time.monotonic() < self.retry_at:
+                return False
+            try:
+                self.connection = pika.BlockingConnection(self.parameters)
+                self.generation += 1
+                RMQ_POOL_C.labels(msg='CONNECTED').inc()
+                return True
+            except Exception as err:
+                LOG.logger.error('Unable to create the connection: %s', err)
+                RMQ_POOL_C.labels(msg='FAILED').inc()
+                self.connection = None
+                self.retry_at = time.monotonic() + RECONNECT_DELAY
+                return False
+
+    def channel(self, exchange: str, exchange_type: str = 'fanout'):
+        """Return a new channel with the exchange declared, or None."""
+        with self.lock:
+            if not self.connect():
+                return None
+            try:
+                channel = self.connection.channel()
+                channel.exchange_declare(
+                    exchange=exchange,
+                    exchange_type=exchange_type,
+                    durable=True
+                )
+                return channel
+            except Exception as err:
+                LOG.logger.error('Unable to open a channel for %s: %s', exchange, err)
+                return None
+
+    def check(self) -> None:
+        """Service heartbeats, and reconnect if the connection was lost."""
+        with self.lock:
+            if self.connection is None:
+                return
+            try:
+                self.connection.process_data_events(time_limit=0)
+            except Exception as err:
+                LOG.logger.error('Shared RMQ connection lost: %s', err)
+            if not self.connection.is_open:
+                RMQ_POOL_C.labels(msg='LOST').inc()
+                self.connection = None
+                self.connect()
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self.lock:
+            try:
+                if self.is_open:
+                    self.connection.close()
+            except Exception as err:
+                LOG.logger.debug('Problems closing the connection: %s', err)
+            finally:
+                self.connection = None
+
+
+class ConnectionPool:
+    """A small number of connections, shared by exchange, with a channel each.
+
+    Each exchange always uses the same connection, so messages to an exchange
+    are published in order. A health thread services heartbeats for idle
+    connections and replaces any which have closed; channels are reopened
+    lazily by their outbound connections.
+    """
+
+    def __init__(self, parameters: pika.ConnectionParameters, size: int = POOL_SIZE,
+                 interval: float = HEALTH_INTERVAL) -> None:
+        """Initialisation."""
+        self.connections = [PooledConnection(parameters) for _ in range(max(size, 1))]
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def get(self, exchange: str) -> PooledConnection:
+        """Return the connection for the exchange."""
+        return self.connections[zlib.crc32(exchange.encode()) % len(self.connections)]
+
+    def start(self) -> None:
+        """Start the health thread, if not already running."""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='rmq-pool-health', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Health thread - check every connection each interval."""
+        while not self._stopping.wait(self.interval):
+            for connection in self.connections:
+                connection.check()
+
+    def close(self) -> None:
+        """Stop the health thread and close every connection."""
+        self._stopping.set()
+        for connection in self.connections:
+            connection.close()
+
+
+CONNECTION_POOL = None
+CONNECTION_POOL_LOCK = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Return the process wide ConnectionPool, creating it if required."""
+    global CONNECTION_POOL  # pylint: disable=W0603
+    with CONNECTION_POOL_LOCK:
+        if not CONNECTION_POOL:
+            CONNECTION_POOL = ConnectionPool(get_connection_parameters())
+            CONNECTION_POOL.start()
+        return CONNECTION_POOL
+
+
+def reset_connection_pool() -> None:
+    """Forget the parent's ConnectionPool in a forked child process."""
+    global CONNECTION_POOL, CONNECTION_POOL_LOCK  # pylint: disable=W0603
+    CONNECTION_POOL = None
+    CONNECTION_POOL_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_connection_pool)
+
+
+class PooledOutboundConnection(OutboundConnection):
+    """An outbound connection using a channel on a shared connection."""
+
+    def __init__(self, exchange: str, pool: ConnectionPool = None,
+                 exchange_type: str = 'fanout') -> None:
+        """Initialisation."""
+        super().__init__(exchange, exchange_type)
+        self.shared = (pool or get_connection_pool()).get(exchange)
+        self.generation = 0
+
+    def create_connection(self) -> bool:
+        """Open a channel on the shared connection."""
+        with self.shared.lock:
+            self.channel = self.shared.channel(self.exchange, self.exchange_type)
+            self.connection = self.shared.connection
+            self.generation = self.shared.generation
+            return self.channel is not None
+
+    def publish_message(self, msg: str, routing_key: str = '',
+                        properties: pika.BasicProperties = None) -> bool:
+        """Publish the message, reopening the channel if the connection was replaced."""
+        with self.shared.lock:
+            if not self.channel or not self.channel.is_open \
+                    or self.generation != self.shared.generation:
+                if not self.create_connection():
+                    return False
+            return super().publish_message(msg, routing_key, properties)
+
+    def close_connection(self):
+        """Close the channel, the shared connection stays open."""
+        with self.shared.lock:
+            try:
+                if self.channel and self.channel.is_open:
+                    self.channel.close()
+            except Exception as err:
+                LOG.logger.debug('Problems closing the channel: %s', err)
+            finally:
+                self.channel = None
+                self.connection = None
+
+
+def get_outbound_connection(exchange: str, exchange_type: str = 'fanout') -> OutboundConnection:
+    """Return an outbound connection for the exchange, per RMQ_BATCH_PUBLISH and RMQ_POOL_SIZE."""
+    if BATCH_PUBLISH:
+        return BatchOutboundConnection(exchange, exchange_type=exchange_type)
+    if POOL_SIZE:
+        return PooledOutboundConnection(exchange, exchange_type=exchange_type)
+    return OutboundConnection(exchange, exchange_type)
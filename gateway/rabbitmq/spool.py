@@ -0,0 +1,426 @@
+"""Disk backed, append only spool for outbound RMQ messages."""
+
+# pylint: disable=E0401, C0413, W0718, R0902
+
+import collections
+import fcntl
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional
+sys.path.append(os.getcwd())  # nopep8
+from prometheus_client import Counter, Gauge
+from gateway.logging.gateway_logging import GatewayLogger
+
+SPOOL_DIR = os.getenv('RMQ_SPOOL_DIR')
+SEGMENT_SIZE = int(os.getenv('RMQ_SPOOL_SEGMENT_MB', '16')) * 1024 * 1024
+MAX_SPOOL_SIZE = int(os.getenv('RMQ_SPOOL_MAX_MB', '1024')) * 1024 * 1024
+DRAIN_BATCH = 500
+RECONNECT_DELAY = 5
+
+# magic, crc32, timestamp, routing key length, headers length, body length
+HEADER = struct.Struct('<IIdHII')
+MAGIC = 0x4C4F5053
+CURSOR = struct.Struct('<QQ')
+SUFFIX = '.seg'
+
+LOG = GatewayLogger(__file__, False)
+
+SPOOL_MESSAGES_G = Gauge(
+    'rmq_spool_messages',
+    'Messages spooled to disk, awaiting publication, by spool directory',
+    ['spool']
+)
+
+SPOOL_BYTES_G = Gauge(
+    'rmq_spool_bytes',
+    'Size of the spooled messages, by spool directory',
+    ['spool']
+)
+
+SPOOL_AGE_G = Gauge(
+    'rmq_spool_oldest_message_age',
+    'Seconds since the oldest spooled message was spooled, by spool directory',
+    ['spool']
+)
+
+SPOOL_GAUGES = (SPOOL_MESSAGES_G, SPOOL_BYTES_G, SPOOL_AGE_G)
+
+SPOOL_C = Counter(
+    'rmq_spool_count',
+    'Messages spooled (SPOOLED), published from the spool (DRAINED) or rejected (DROPPED)',
+    ['exchange', 'msg']
+)
+
+Record = collections.namedtuple('Record', 'timestamp body headers routing_key')
+
+
+class Segment:
+    """A memory mapped, pre-allocated spool segment file."""
+
+    def __init__(self, path: str, seq: int, size: int = 0) -> None:
+        """Initialisation, create the file if size is given."""
+        self.path = path
+        self.seq = seq
+        with open(path, 'a+b') as file:
+            if size and os.fstat(file.fileno()).st_size < size:
+                file.truncate(size)
+            self.map = mmap.mmap(file.fileno(), 0)
+        self.size = len(self.map)
+
+    def record(self, pos: int):
+        """Return (record, next position) at pos, or None at the end of the data."""
+        if pos + HEADER.size > self.size:
+            return None
+        magic, crc, stamp, key_len, headers_len, body_len = HEADER.unpack_from(self.map, pos)
+        start = pos + HEADER.size
+        end = start + key_len + headers_len + body_len
+        if magic != MAGIC or end > self.size:
+            return None
+        payload = self.map[start:end]
+        if zlib.crc32(payload) != crc:
+            return None
+        key = payload[:key_len].decode()
+        headers = json.loads(payload[key_len:key_len + headers_len]) if headers_len else None
+        body = payload[key_len + headers_len:].decode()
+        return Record(stamp, body, headers, key), end
+
+    def write(self, pos: int, record: bytes) -> None:
+        """Write the encoded record at pos, the header last."""
+        self.map[pos + HEADER.size:pos + len(record)] = record[HEADER.size:]
+        self.map[pos:pos + HEADER.size] = record[:HEADER.size]
+
+    def close(self) -> None:
+        """Flush and unmap the segment."""
+        self.map.flush()
+        self.map.close()
+
+
+class Spool:
+    """An append only log of outbound messages, in memory mapped segments.
+
+    Messages are appended at the tail and read from the head in the order
+    they were appended. The head position is kept in a cursor file, and a
+    segment is deleted once every message in it has been committed, so a
+    restarted process resumes from the first uncommitted message - delivery
+    is at least once. Each spool directory is locked by a single process.
+    """
+
+    def __init__(self, directory: str, exchange: str = '',
+                 segment_size: int = SEGMENT_SIZE, max_size: int = MAX_SPOOL_SIZE) -> None:
+        """Initialisation, recover any messages already spooled in the directory."""
+        self.directory = directory
+        self.exchange = exchange
+        self.name = os.path.basename(os.path.normpath(directory))
+        self.segment_size = segment_size
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, 'lock'), 'a+b')  # pylint: disable=R1732
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise
+
+        self.segments = {}
+        self.pending = 0
+        self.size = 0
+        self._ahead = []
+        self._recover()
+
+        SPOOL_MESSAGES_G.labels(spool=self.name).set_function(lambda: self.pending)
+        SPOOL_BYTES_G.labels(spool=self.name).set_function(lambda: self.size)
+        SPOOL_AGE_G.labels(spool=self.name).set_function(self.oldest_age)
+
+    def _path(self, seq: int) -> str:
+        """Return the path of a segment."""
+        return os.path.join(self.directory, f'{seq:020d}{SUFFIX}')
+
+    def _segment(self, seq: int) -> Segment:
+        """Return the open segment."""
+        segment = self.segments.get(seq)
+        if segment is None:
+            segment = self.segments[seq] = Segment(self._path(seq), seq)
+        return segment
+
+    def _recover(self) -> None:
+        """Find the head and tail, and count the messages spooled."""
+        seqs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            # left empty by a crash between creating and sizing the segment
+            if not os.path.getsize(os.path.join(self.directory, name)):
+                os.remove(os.path.join(self.directory, name))
+                continue
+            seqs.append(int(name[:-len(SUFFIX)]))
+        seqs.sort()
+        cursor_path = os.path.join(self.directory, 'cursor')
+        with open(cursor_path, 'a+b') as file:
+            if os.fstat(file.fileno()).st_size < CURSOR.size:
+                file.truncate(CURSOR.size)
+            self._cursor = mmap.mmap(file.fileno(), CURSOR.size)
+
+        head_seq, head_pos = CURSOR.unpack_from(self._cursor)
+        if not seqs:
+            seqs = [max(head_seq, 1)]
+            self.segments[seqs[0]] = Segment(self._path(seqs[0]), seqs[0], self.segment_size)
+        if head_seq not in seqs:
+            head_seq, head_pos = seqs[0], 0
+
+        for seq in seqs:
+            if seq < head_seq:
+                os.remove(self._path(seq))
+
+        self.head_seq, self.head_pos = head_seq, head_pos
+        self.read_seq, self.read_pos = head_seq, head_pos
+        self.tail_seq, self.tail_pos = seqs[-1], 0
+
+        for seq in [seq for seq in seqs if seq >= head_seq]:
+            segment = self._segment(seq)
+            pos = head_pos if seq == head_seq else 0
+            while True:
+                found = segment.record(pos)
+                if not found:
+                    break
+                self.pending += 1
+                self.size += found[1] - pos
+                pos = found[1]
+            if seq == self.tail_seq:
+                self.tail_pos = pos
+        self._save_cursor()
+
+    def _save_cursor(self) -> None:
+        """Persist the head position."""
+        CURSOR.pack_into(self._cursor, 0, self.head_seq, self.head_pos)
+
+    @staticmethod
+    def encode(body: str, headers: dict = None, routing_key: str = '') -> bytes:
+        """Return the encoded record."""
+        key = routing_key.encode()
+        head = json.dumps(headers).encode() if headers else b''
+        data = body.encode() if isinstance(body, str) else body
+        payload = key + head + data
+        return HEADER.pack(
+            MAGIC, zlib.crc32(payload), time.time(), len(key), len(head), len(data)
+        ) + payload
+
+    def append(self, body: str, headers: dict = None, routing_key: str = '') -> bool:
+        """Append a message, return False if the spool is full."""
+        record = self.encode(body, headers, routing_key)
+        with self._lock:
+            if self.size + len(record) > self.max_size:
+                SPOOL_C.labels(exchange=self.exchange, msg='DROPPED').inc()
+                return False
+
+            segment = self._segment(self.tail_seq)
+            # leave a zeroed header after each record, marking the end of the data
+            if self.tail_pos + len(record) + HEADER.size > segment.size:
+                segment.map.flush()
+                self.tail_seq += 1
+                self.tail_pos = 0
+                segment = self.segments[self.tail_seq] = Segment(
+                    self._path(self.tail_seq), self.tail_seq,
+                    max(self.segment_size, len(record) + HEADER.size)
+                )
+            segment.write(self.tail_pos, record)
+            self.tail_pos += len(record)
+            self.pending += 1
+            self.size += len(record)
+        SPOOL_C.labels(exchange=self.exchange, msg='SPOOLED').inc()
+        return True
+
+    def read(self, limit: int = DRAIN_BATCH) -> List[Record]:
+        """Return up to limit messages following those already read.
+
+        Messages are not removed until they are committed.
+        """
+        records = []
+        with self._lock:
+            while len(records) < limit:
+                found = self._segment(self.read_seq).record(self.read_pos)
+                if found:
+                    record, end = found
+                    records.append(record)
+                    self._ahead.append((self.read_seq, end, end - self.read_pos))
+                    self.read_pos = end
+                    continue
+                if self.read_seq >= self.tail_seq:
+                    break
+                self.read_seq, self.read_pos = self.read_seq + 1, 0
+        return records
+
+    def commit(self, count: int) -> None:
+        """Remove the first count messages read; read again from the next."""
+        with self._lock:
+            if count:
+                self.head_seq, self.head_pos, _ = self._ahead[count - 1]
+                self._save_cursor()
+                self.pending -= count
+                self.size -= sum(size for _, _, size in self._ahead[:count])
+                for seq in [seq for seq in self.segments if seq < self.head_seq]:
+                    self.segments.pop(seq).close()
+                    os.remove(self._path(seq))
+
+            # anything read but not committed is read again
+            self._ahead = []
+            self.read_seq, self.read_pos = self.head_seq, self.head_pos
+        if count:
+            SPOOL_C.labels(exchange=self.exchange, msg='DRAINED').inc(count)
+
+    def oldest_age(self) -> float:
+        """Return the seconds since the oldest message was spooled."""
+        with self._lock:
+            if not self.pending:
+                return 0
+            found = self._segment(self.head_seq).record(self.head_pos)
+            if not found and self.head_seq < self.tail_seq:
+                found = self._segment(self.head_seq + 1).record(0)
+        return time.time() - found[0].timestamp if found else 0
+
+    def close(self) -> None:
+        """Flush and close every segment, and release the directory."""
+        with self._lock:
+            for segment in self.segments.values():
+                segment.close()
+            self.segments = {}
+            self._cursor.flush()
+            self._cursor.close()
+            self._lock_file.close()
+        for gauge in SPOOL_GAUGES:
+            try:
+                gauge.remove(self.name)
+            except KeyError:
+                pass
+
+
+def open_spool(exchange: str, directory: str = SPOOL_DIR) -> Spool:
+    """Return a spool for the exchange, in the first of its directories not locked.
+
+    Several connections may publish to an exchange, within a process or
+    across processes, so its directories are <exchange>, <exchange>.1 and so
+    on; see orphan_spools for those left with messages after a restart.
+    """
+    for idx in itertools.count():
+        path = os.path.join(directory, exchange if not idx else f'{exchange}.{idx}')
+        try:
+            return Spool(path, exchange)
+        except BlockingIOError:
+            continue
+
+
+def orphan_spools(exchange: str, directory: str = SPOOL_DIR) -> List[Spool]:
+    """Return the spools of the exchange no longer open, which still hold messages.
+
+    Their messages are drained by the caller, and each is then closed,
+    freeing its directory for reuse. Empty spools are closed at once.
+    """
+    if not os.path.isdir(directory):
+        return []
+    orphans = []
+    for name in sorted(os.listdir(directory)):
+        if name != exchange and not (
+                name.startswith(f'{exchange}.') and name[len(exchange) + 1:].isdigit()):
+            continue
+        try:
+            spool = Spool(os.path.join(directory, name), exchange)
+        except BlockingIOError:
+            continue
+        if spool.pending:
+            LOG.logger.error('Draining %d messages left in spool %s', spool.pending, name)
+            orphans.append(spool)
+        else:
+            spool.close()
+    return orphans
+
+
+class SpooledPublisher:
+    """Publish directly while possible, otherwise spool and drain in order.
+
+    Once a message is spooled, every later message is spooled behind it
+    until a background thread has published the backlog, so messages are
+    always published in the order they were sent. The publish callable must
+    (re)connect if required and return False if the message was not sent.
+    Orphaned spools, see orphan_spools, are drained first, as the oldest
+    messages, and then closed.
+    """
+
+    def __init__(self, spool: Spool, publish: Callable[[str, Optional[dict], str], bool],
+                 orphans: List[Spool] = ()) -> None:
+        """Initialisation, start draining if messages were spooled before a restart."""
+        self.spool = spool
+        self.orphans = list(orphans)
+        self.publish = publish
+        self.lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        if spool.pending or self.orphans:
+            self.start()
+
+    def start(self) -> None:
+        """Start the drain thread, if not already running."""
+        if self._thread:
+            return
+        self._thread = threading.Thread(
+            target=self.drain, name=f'spool-{self.spool.exchange}', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Stop the drain thread; undrained messages stay in the spool."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        for spool in self.orphans:
+            spool.close()
+        self.spool.close()
+
+    def send(self, body: str, headers: dict = None, routing_key: str = '') -> bool:
+        """Publish the message, or spool it, return False if it was dropped."""
+        with self.lock:
+            if not (self.spool.pending or self.orphans) and \
+                    self.publish(body, headers, routing_key):
+                return True
+            spooled = self.spool.append(body, headers, routing_key)
+        self.start()
+        self._wake.set()
+        return spooled
+
+    def drain(self) -> None:
+        """Drain thread - publish the spooled messages, in order."""
+        while not self._stopping.is_set():
+            spool = self.orphans[0] if self.orphans else self.spool
+            if not spool.pending:
+                if spool is not self.spool:
+                    with self.lock:
+                        self.orphans.pop(0).close()
+                    continue
+                self._wake.wait(1)
+                self._wake.clear()
+                continue
+
+            records = spool.read(DRAIN_BATCH)
+            sent = 0
+            with self.lock:
+                try:
+                    for record in records:
+                        if not self.publish(record.body, record.headers, record.routing_key):
+                            break
+                        sent += 1
+                except Exception as err:  # pylint: disable=W0703
+                    LOG.logger.error('Unable to publish spooled message to %s: %s',
+                                     spool.exchange, err)
+                spool.commit(sent)
+
+            if sent < len(records):
+                self._stopping.wait(RECONNECT_DELAY)
@@ -0,0 +1,29 @@
+"""Argument validation for per message methods."""
+
+# pylint: disable=E0401
+
+import os
+import pydantic
+
+# skip argument validation on calls made within the gateway, see trusted_internal
+TRUSTED_INTERNAL = os.getenv('GATEWAY_TRUSTED_INTERNAL', 'false').lower() == 'true'
+
+
+def trusted_internal(func=None, *, config: dict = None):
+    """As pydantic.validate_arguments, unless GATEWAY_TRUSTED_INTERNAL=true.
+
+    For methods only called by the gateway itself, with arguments already
+    validated where they entered the gateway, e.g. the Message model of a
+    STOMP frame. With GATEWAY_TRUSTED_INTERNAL the method is left
+    undecorated, saving a model build and copy of its arguments per call.
+    """
+    def decorate(func):
+        if TRUSTED_INTERNAL:
+            return func
+        if config:
+            return pydantic.validate_arguments(config=config)(func)
+        return pydantic.validate_arguments(func)
+
+    if func is None:
+        return decorate
+    return decorate(func)
@@ -0,0 +1,126 @@
+"""Report the per message cost of validating internal method arguments.
+
+Each case is run twice in fresh interpreters, validating arguments with
+pydantic.validate_arguments (the default) and with GATEWAY_TRUSTED_INTERNAL,
+and once more counting the validated calls per message:
+
+    python test/benchmark/profile_validation.py
+    python test/benchmark/profile_validation.py --scale 0.1 --case td_on_message
+"""
+
+# pylint: disable=C0415, E0401, C0413
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+
+import run_benchmark
+
+CASES = (
+    'td_on_message',
+    'td_process_s_c_class',
+    'trust_on_message',
+    'trust_process_train_movements',
+    'vstp_nrod_factory',
+    'darwin_on_message'
+)
+
+
+def count_validated_calls(counter: list) -> None:
+    """Count every call of a pydantic.validate_arguments method decorated hereafter.
+
+    Counted by wrapping rather than with cProfile, which cannot see into the
+    compiled pydantic wheels.
+    """
+    import pydantic
+    validate_arguments = pydantic.validate_arguments
+
+    def counting(func=None, *, config=None):
+        def decorate(func):
+            validated = validate_arguments(config=config)(func) if config else \
+                validate_arguments(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                counter[0] += 1
+                return validated(*args, **kwargs)
+            return wrapper
+
+        if func is None:
+            return decorate
+        return decorate(func)
+
+    pydantic.validate_arguments = counting
+
+
+def validated_calls(name: str, scale: float) -> dict:
+    """Run the case, return its validated calls and messages."""
+    for key, value in run_benchmark.ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    os.chdir(run_benchmark.ROOT)
+    sys.path.insert(0, run_benchmark.ROOT)
+
+    counter = [0]
+    count_validated_calls(counter)
+    func, items, messages = run_benchmark.CASES[name](scale)
+    counter[0] = 0
+    for item in items:
+        func(item)
+    return {'messages': messages, 'calls': counter[0]}
+
+
+def run_worker(args: list, trusted: bool = False) -> dict:
+    """Run a worker in a fresh interpreter, return its result."""
+    env = dict(os.environ, GATEWAY_TRUSTED_INTERNAL='true' if trusted else 'false')
+    proc = subprocess.run(
+        [sys.executable] + args, cwd=run_benchmark.ROOT, env=env,
+        capture_output=True, text=True, check=False
+    )
+    if proc.returncode:
+        print(proc.stderr, file=sys.stderr)
+        return None
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def per_message_us(result: dict) -> float:
+    """Return the mean microseconds per message."""
+    return result['seconds'] / result['messages'] * 1e6
+
+
+def main() -> int:
+    """Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--case', action='append', choices=CASES,
+                        help='run only this case (may be repeated)')
+    parser.add_argument('--scale', type=float, default=0.1,
+                        help='multiply the message counts of run_benchmark.py')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(validated_calls(args.worker, args.scale)))
+        return 0
+
+    bench = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_benchmark.py')
+    print(f'{"case":32}{"calls/msg":>11}{"us/msg":>10}{"trusted":>10}{"saved":>10}{"":>8}')
+    for name in args.case or CASES:
+        print(f'{name}...', file=sys.stderr, flush=True)
+        scale = ['--scale', str(args.scale)]
+        profiled = run_worker([os.path.abspath(__file__), '--worker', name] + scale)
+        validated = run_worker([bench, '--worker', name] + scale)
+        trusted = run_worker([bench, '--worker', name] + scale, trusted=True)
+        if not (profiled and validated and trusted):
+            continue
+
+        before, after = per_message_us(validated), per_message_us(trusted)
+        print(f'{name:32}{profiled["calls"] / profiled["messages"]:>11.1f}'
+              f'{before:>10.1f}{after:>10.1f}{before - after:>10.1f}'
+              f'{run_benchmark.change(after, before):>8}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
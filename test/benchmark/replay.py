@@ -0,0 +1,152 @@
+"""Replay captured frames through the NROD or Darwin listener.
+
+Frames captured with GATEWAY_CAPTURE_DIR are fed to Listener.on_message,
+publishing to in memory connections, at the speed they were received (1),
+N times that, or as fast as they are processed (0). The listener takes its
+options from the environment as in service, e.g. NROD_FAST_PATH:
+
+    python test/benchmark/replay.py /var/www/capture/nrod-20260301T0700*
+    python test/benchmark/replay.py --speed 10 /var/www/capture
+    python test/benchmark/replay.py --speed 0 --service darwin capture/
+
+Lag is how late each frame was processed against the capture's timing;
+it grows while the listener cannot keep up.
+"""
+
+# pylint: disable=C0415, E0401, C0413
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from typing import Callable, Iterator, List, Tuple
+
+import run_benchmark
+
+
+def nrod_listener() -> Callable:
+    """Return the NROD Listener.on_message, publishing to in memory connections."""
+    return run_benchmark.nrod_listener().on_message
+
+
+def darwin_listener() -> Callable:
+    """Return the Darwin Listener.on_message, publishing to in memory connections."""
+    import stomp
+    from gateway.nre import darwin
+    for connections in (darwin.RMQ, darwin.RECORD_RMQ):
+        connections.update({
+            msg_type: run_benchmark.memory_connection(msg_type) for msg_type in darwin.EXCHANGES
+        })
+    return darwin.Listener(conn=stomp.Connection12([('localhost', 0)])).on_message
+
+
+LISTENERS = {
+    'nrod': nrod_listener,
+    'darwin': darwin_listener
+}
+
+
+def service_of(paths: List[str]) -> str:
+    """Return the service that captured the first segment, by its name."""
+    from gateway.capture import segments
+    found = segments(paths)
+    if not found:
+        return None
+    return os.path.basename(found[0]).split('-')[0]
+
+
+def retimed(frames: Iterator, started: float) -> Iterator[Tuple[float, object]]:
+    """Yield each frame's offset into the capture, its timestamp moved to now.
+
+    The timestamp header is moved by the time since capture, so the latency
+    the listener observes is that of the replay.
+    """
+    first = None
+    for received, frame in frames:
+        if first is None:
+            first = received
+        shift = int((started - first) * 1000)
+        if 'timestamp' in frame.headers:
+            frame.headers['timestamp'] = str(int(frame.headers['timestamp']) + shift)
+        yield received - first, frame
+
+
+def replay(func: Callable, frames: Iterator, speed: float) -> dict:
+    """Feed the frames to func at the speed, return the throughput and latency."""
+    samples = []
+    lags = []
+    clock = time.perf_counter
+    started = clock()
+    for offset, frame in retimed(frames, time.time()):
+        due = started + offset / speed if speed else clock()
+        wait = due - clock()
+        if wait > 0:
+            time.sleep(wait)
+        call_started = clock()
+        func(frame)
+        finished = clock()
+        samples.append(finished - call_started)
+        lags.append(max(finished - due, 0))
+    elapsed = clock() - started
+
+    samples.sort()
+    lags.sort()
+    return {
+        'frames': len(samples),
+        'seconds': round(elapsed, 3),
+        'frames_per_sec': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'p50_us': round(percentile(samples, 50) * 1e6, 1),
+        'p99_us': round(percentile(samples, 99) * 1e6, 1),
+        'p99_lag_ms': round(percentile(lags, 99) * 1e3, 1),
+        'max_lag_ms': round(lags[-1] * 1e3, 1) if lags else 0,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Return the percentile of the sorted samples."""
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main() -> int:
+    """Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='segment files, or directories of them')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='multiple of the captured speed, 0 for as fast as possible')
+    parser.add_argument('--service', choices=sorted(LISTENERS),
+                        help='the listener to replay through, by default that which captured')
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args()
+    paths = [os.path.abspath(path) for path in args.paths]
+
+    for key, value in run_benchmark.ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    os.chdir(run_benchmark.ROOT)
+    sys.path.insert(0, run_benchmark.ROOT)
+    from gateway.capture import read_segments
+
+    service = args.service or service_of(paths)
+    if service not in LISTENERS:
+        print(f'No service given, or known from the segment names: {service}', file=sys.stderr)
+        return 1
+
+    result = replay(LISTENERS[service](), read_segments(paths), args.speed)
+    if args.json:
+        print(json.dumps(result))
+        return 0
+
+    print(f'{"frames":>10}{"seconds":>10}{"frames/sec":>12}{"p50 us":>10}'
+          f'{"p99 us":>10}{"p99 lag ms":>12}{"max lag ms":>12}{"rss MB":>9}')
+    print(f'{result["frames"]:>10,}{result["seconds"]:>10.1f}{result["frames_per_sec"]:>12,.0f}'
+          f'{result["p50_us"]:>10.1f}{result["p99_us"]:>10.1f}{result["p99_lag_ms"]:>12.1f}'
+          f'{result["max_lag_ms"]:>12.1f}{result["peak_rss_mb"]:>9.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
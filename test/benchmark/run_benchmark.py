@@ -0,0 +1,417 @@
+"""Benchmark the NROD and Darwin message processing hot paths.
+
+Each case runs in a fresh interpreter, so peak RSS is that of the case alone.
+Results are saved to test/benchmark/results/<commit>.json and can be compared
+with those of an earlier commit:
+
+    python test/benchmark/run_benchmark.py
+    python test/benchmark/run_benchmark.py --scale 0.1 --case td_on_message
+    python test/benchmark/run_benchmark.py --compare 4b2f473
+"""
+
+# pylint: disable=C0415, E0401, C0413
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+TD_COUNT = 1_000_000
+TRUST_COUNT = 100_000
+VSTP_COUNT = 10_000
+DARWIN_COUNT = 10_000
+LDB_COUNT = 1_000
+LDB_ROWS = 100
+ELEMENTS_PER_FRAME = 32
+SEED = 1
+
+ENVIRONMENT = {
+    'LOG_DIR': tempfile.gettempdir(),
+    'LOG_LEVEL': 'ERROR',
+    'RMQ_HOST': 'localhost',
+    'RMQ_PORT': '5672',
+    'DARWIN_USER': 'benchmark',
+    'DARWIN_PASS': 'benchmark',
+    'DARWIN_TOPIC': 'benchmark',
+    'DARWIN_STATUS': 'benchmark',
+    'DARWIN_HOST': 'localhost',
+    'DARWIN_PORT': '61613'
+}
+
+
+def memory_connection(exchange: str):
+    """Return an OutboundConnection which counts messages, rather than sending them."""
+    from gateway.rabbitmq.publish import OutboundConnection
+
+    class MemoryConnection(OutboundConnection):
+        """In memory stand-in for an outbound RMQ connection."""
+
+        def __init__(self, exchange: str) -> None:
+            """Initialisation."""
+            super().__init__(exchange)
+            self.count = 0
+            self.size = 0
+
+        def create_connection(self) -> bool:
+            """Nothing to connect to."""
+            return True
+
+        def close_connection(self):
+            """Nothing to close."""
+
+        def send_message(self, msg: str, headers: dict = None, attempt=1,
+                         routing_key: str = '') -> bool:
+            """Count the message."""
+            self.count += 1
+            self.size += len(msg)
+            return True
+
+    return MemoryConnection(exchange)
+
+
+def nrod_listener():
+    """Return an NROD Listener publishing to in memory connections."""
+    import stomp
+    from gateway.nrod import nrod_connection
+
+    fields = {
+        name: memory_connection(name)
+        for name in nrod_connection.Listener.__fields__ if name.endswith('_rmq')
+    }
+    return nrod_connection.Listener(conn=stomp.Connection12([('localhost', 0)]), **fields)
+
+
+def td_on_message(scale: float) -> Tuple[Callable, List, int]:
+    """TD frames through Listener.on_message."""
+    import synthetic
+    count = int(TD_COUNT * scale)
+    frames = synthetic.frames(
+        'TD_ALL_SIG_AREA', synthetic.td_elements(count, random.Random(SEED)), ELEMENTS_PER_FRAME)
+    return nrod_listener().on_message, frames, count
+
+
+def td_process_s_c_class(scale: float) -> Tuple[Callable, List, int]:
+    """TD elements through Listener.process_s_c_class."""
+    import synthetic
+    count = int(TD_COUNT * scale)
+    elements = list(synthetic.td_elements(count, random.Random(SEED)))
+    return nrod_listener().process_s_c_class, elements, count
+
+
+def td_s_class_bits(scale: float) -> Tuple[Callable, List, int]:
+    """TD elements through Listener.process_s_c_class, with NROD_S_CLASS_BITS."""
+    from gateway.nrod import nrod_connection
+    nrod_connection.S_CLASS_BITS = True
+    return td_process_s_c_class(scale)
+
+
+def trust_process_train_movements(scale: float) -> Tuple[Callable, List, int]:
+    """TRUST elements through Listener.process_train_movements."""
+    import synthetic
+    count = int(TRUST_COUNT * scale)
+    elements = list(synthetic.trust_elements(count, random.Random(SEED)))
+    return nrod_listener().process_train_movements, elements, count
+
+
+def trust_fast_path(scale: float) -> Tuple[Callable, List, int]:
+    """TRUST elements through Listener.process_train_movements, with NROD_FAST_PATH."""
+    from gateway.nrod import nrod_connection
+    nrod_connection.MVT_FAST_PATH = True
+    return trust_process_train_movements(scale)
+
+
+def trust_on_message(scale: float) -> Tuple[Callable, List, int]:
+    """TRUST frames through Listener.on_message."""
+    import synthetic
+    count = int(TRUST_COUNT * scale)
+    frames = synthetic.frames(
+        'TRAIN_MVT_ALL_TOC', synthetic.trust_elements(count, random.Random(SEED)),
+        ELEMENTS_PER_FRAME)
+    return nrod_listener().on_message, frames, count
+
+
+def vstp_nrod_factory(scale: float) -> Tuple[Callable, List, int]:
+    """VSTP schedules through VSTPSchedule.nrod_factory."""
+    import synthetic
+    from gateway.nrod.vstp import VSTPSchedule
+    count = int(VSTP_COUNT * scale)
+    elements = list(synthetic.vstp_elements(count, random.Random(SEED)))
+    return lambda element: VSTPSchedule.nrod_factory(element).json(), elements, count
+
+
+def darwin_format_message(scale: float) -> Tuple[Callable, List, int]:
+    """Push Port TS messages through Listener.format_darwin_message."""
+    import synthetic
+    from gateway.nre import darwin
+    count = int(DARWIN_COUNT * scale)
+    messages = synthetic.darwin_messages(count, random.Random(SEED))
+    filters = darwin.MESSAGE_FILTERS['TS']
+    return lambda msg: darwin.Listener.format_darwin_message(msg, filters), messages, count
+
+
+def darwin_on_message(scale: float) -> Tuple[Callable, List, int]:
+    """Compressed Push Port TS frames through Listener.on_message."""
+    import stomp
+    import synthetic
+    from gateway.nre import darwin
+    count = int(DARWIN_COUNT * scale)
+    frames = synthetic.darwin_frames(synthetic.darwin_messages(count, random.Random(SEED)))
+    darwin.RMQ.update({msg_type: memory_connection(msg_type) for msg_type in darwin.EXCHANGES})
+    listener = darwin.Listener(conn=stomp.Connection12([('localhost', 0)]))
+    return listener.on_message, frames, count
+
+
+def darwin_split(scale: float) -> Tuple[Callable, List, int]:
+    """Compressed Push Port TS frames through Listener.on_message, with DARWIN_SPLIT."""
+    from gateway.nre import darwin
+    darwin.DARWIN_SPLIT = True
+    darwin.RECORD_RMQ = {msg_type: memory_connection(msg_type) for msg_type in darwin.EXCHANGES}
+    return darwin_on_message(scale)
+
+
+def darwin_pool(scale: float) -> Tuple[Callable, List, int]:
+    """Compressed Push Port TS frames through Listener.on_message, with DARWIN_WORKERS.
+
+    Latency is that of the receiver thread; the run ends once every frame
+    has been published.
+    """
+    from gateway.nre import darwin
+    from gateway.nre.frame_pool import FramePool
+    func, frames, count = darwin_on_message(scale)
+    listener = func.__self__
+    listener.pool = FramePool(
+        listener.publish, darwin.DARWIN_ENVELOPES, darwin.DARWIN_SPLIT, workers=os.cpu_count())
+    listener.pool.start()
+    last = frames[-1]
+
+    def on_message(frame):
+        func(frame)
+        if frame is last:
+            listener.pool.stop()
+    return on_message, frames, count
+
+
+def ldb_boards(scale: float) -> List:
+    """Return distinct 100 row boards; each is serialised once."""
+    import synthetic
+    rng = random.Random(SEED)
+    return [synthetic.ldb_board(LDB_ROWS, rng) for _ in range(max(int(LDB_COUNT * scale), 1))]
+
+
+def ldb_jsonpickle(scale: float) -> Tuple[Callable, List, int]:
+    """100 row LDB boards, as published before: jsonpickle within json."""
+    import json
+    import jsonpickle
+    boards = ldb_boards(scale)
+    return (
+        lambda board: json.dumps({'results': jsonpickle.encode(board, unpicklable=False)}),
+        boards, len(boards)
+    )
+
+
+def ldb_board_json(scale: float) -> Tuple[Callable, List, int]:
+    """100 row LDB boards through board_dict and board_json."""
+    from gateway.ldb.board_json import board_dict, board_json
+    boards = ldb_boards(scale)
+    return lambda board: board_json(board_dict(board)), boards, len(boards)
+
+
+CASES: Dict[str, Callable] = {
+    'td_on_message': td_on_message,
+    'td_process_s_c_class': td_process_s_c_class,
+    'td_s_class_bits': td_s_class_bits,
+    'trust_on_message': trust_on_message,
+    'trust_process_train_movements': trust_process_train_movements,
+    'trust_fast_path': trust_fast_path,
+    'vstp_nrod_factory': vstp_nrod_factory,
+    'darwin_format_message': darwin_format_message,
+    'darwin_on_message': darwin_on_message,
+    'darwin_split': darwin_split,
+    'darwin_pool': darwin_pool,
+    'ldb_jsonpickle': ldb_jsonpickle,
+    'ldb_board_json': ldb_board_json
+}
+
+
+def percentile(ordered: List[int], pct: float) -> float:
+    """Return the percentile of the sorted samples, in microseconds."""
+    idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[idx] / 1000
+
+
+def run_case(name: str, scale: float) -> dict:
+    """Run a single case in this process, return its result."""
+    for key, value in ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    func, items, messages = CASES[name](scale)
+    samples = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for item in items:
+        call_started = clock()
+        func(item)
+        samples.append(clock() - call_started)
+    elapsed = (clock() - started) / 1e9
+
+    samples.sort()
+    return {
+        'messages': messages,
+        'calls': len(samples),
+        'seconds': round(elapsed, 3),
+        'msgs_per_sec': round(messages / elapsed, 1) if elapsed else 0,
+        'p50_us': round(percentile(samples, 50), 1),
+        'p99_us': round(percentile(samples, 99), 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def git_commit(ref: str = 'HEAD') -> str:
+    """Return the short commit hash for the ref."""
+    return subprocess.run(
+        ['git', 'rev-parse', '--short', ref],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def git_dirty() -> bool:
+    """Return True if the working tree has uncommitted changes to tracked files."""
+    return bool(subprocess.run(
+        ['git', 'status', '--porcelain', '--untracked-files=no'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip())
+
+
+def run_all(names: List[str], scale: float) -> dict:
+    """Run each case in a subprocess, return the collected results."""
+    results = {}
+    for name in names:
+        print(f'{name}...', file=sys.stderr, flush=True)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', name, '--scale', str(scale)],
+            cwd=ROOT, capture_output=True, text=True, check=False
+        )
+        if proc.returncode:
+            print(proc.stderr, file=sys.stderr)
+            continue
+        results[name] = json.loads(proc.stdout.splitlines()[-1])
+    return results
+
+
+def report(results: dict, baseline: dict = None) -> None:
+    """Print the results, with the change against the baseline if given."""
+    header = f'{"case":32}{"msgs/sec":>12}{"p50 us":>10}{"p99 us":>10}{"rss MB":>9}'
+    if baseline:
+        header += f'{"msgs/sec":>11}{"p99":>9}'
+    print(header)
+    for name, res in results.items():
+        line = (f'{name:32}{res["msgs_per_sec"]:>12,.0f}{res["p50_us"]:>10.1f}'
+                f'{res["p99_us"]:>10.1f}{res["peak_rss_mb"]:>9.1f}')
+        old = (baseline or {}).get(name)
+        if old:
+            line += f'{change(res["msgs_per_sec"], old["msgs_per_sec"]):>11}'
+            line += f'{change(res["p99_us"], old["p99_us"]):>9}'
+        print(line)
+
+
+def change(new: float, old: float) -> str:
+    """Return the percentage change as a string."""
+    if not old:
+        return '-'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Return the cases whose throughput fell by more than threshold percent."""
+    return [
+        name for name, res in results.items()
+        if name in baseline and baseline[name]['msgs_per_sec']
+        and res['msgs_per_sec'] < baseline[name]['msgs_per_sec'] * (1 - threshold / 100)
+    ]
+
+
+def load(commit: str) -> dict:
+    """Return the saved results for the commit."""
+    with open(os.path.join(RESULTS_DIR, f'{commit}.json'), encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(commit: str, scale: float, results: dict) -> str:
+    """Save the results for the commit, merging with any cases already saved."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{commit}.json')
+    saved = {'results': {}}
+    if os.path.exists(path):
+        saved = load(commit)
+        if saved.get('scale') != scale:
+            saved = {'results': {}}
+    saved.update({
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'scale': scale
+    })
+    saved['results'].update(results)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(saved, file, indent=2)
+    return path
+
+
+def main() -> int:
+    """Entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--case', action='append', choices=sorted(CASES),
+                        help='run only this case (may be repeated)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply the message counts, e.g. 0.1 for a quick run')
+    parser.add_argument('--compare', metavar='COMMIT',
+                        help='compare with the saved results of an earlier commit')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='exit non-zero if throughput falls by more than this percent')
+    parser.add_argument('--no-save', action='store_true', help='do not save the results')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(args.worker, args.scale)))
+        return 0
+
+    baseline = None
+    if args.compare:
+        ref = args.compare
+        if not os.path.exists(os.path.join(RESULTS_DIR, f'{ref}.json')):
+            ref = git_commit(ref)
+        saved = load(ref)
+        if saved.get('scale') != args.scale:
+            print(f'Warning: baseline was run at scale {saved.get("scale")}', file=sys.stderr)
+        baseline = saved['results']
+
+    results = run_all(args.case or list(CASES), args.scale)
+    commit = git_commit()
+    if git_dirty():
+        commit += '-dirty'
+    if not args.no_save:
+        print(f'Saved to {save(commit, args.scale, results)}', file=sys.stderr)
+
+    report(results, baseline)
+    if baseline and regressions(results, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Synthetic NROD and Darwin traffic for the benchmarks."""
+
+import datetime
+import json
+import os
+import random
+import sys
+import zlib
+from typing import Iterator, List
+import stomp
+from zeep import xsd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'unit_test'))  # nopep8
+import train_movement_fixtures as tmf
+from vstp_fixtures import SCHED
+
+TD_AREAS = [f'{a}{b}' for a in 'ABCDEFGHKLMNPQRSTUVWXYZ' for b in '0123456789'][:120]
+
+# Approximate share of each TRUST message type on TRAIN_MVT_ALL_TOC
+TRUST_MIX = [
+    (tmf.MOVEMENT, 80),
+    (tmf.ACTIVATION, 9),
+    (tmf.CANCELLATION, 4),
+    (tmf.REINSTATEMENT, 1),
+    (tmf.COO, 1),
+    (tmf.COI, 1),
+    (tmf.COL, 4)
+]
+
+DARWIN_TS = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<Pport xmlns="http://www.thalesgroup.com/rtti/PushPort/v16" \
+xmlns:ns5="http://www.thalesgroup.com/rtti/PushPort/Forecasts/v3" \
+ts="2022-03-11T16:26:21.0000000Z" version="16.0">\
+<uR updateOrigin="TD"><TS rid="{rid}" uid="{uid}" ssd="2022-03-11">\
+<ns5:LateReason>106</ns5:LateReason>{locations}</TS></uR></Pport>"""
+
+DARWIN_LOCATION = """\
+<ns5:Location tpl="{tpl}" wta="{hh:02d}:{mm:02d}" wtd="{hh:02d}:{mm2:02d}" \
+pta="{hh:02d}:{mm:02d}" ptd="{hh:02d}:{mm2:02d}">\
+<ns5:arr et="{hh:02d}:{mm:02d}" src="Darwin"/>\
+<ns5:dep et="{hh:02d}:{mm2:02d}" src="Darwin"/>\
+<ns5:plat platsup="true" conf="true" platsrc="A">{plat}</ns5:plat></ns5:Location>"""
+
+TIPLOCS = ['EUSTON', 'WATFDJ', 'MKNSCEN', 'RUGBY', 'NMPTN', 'CREWE', 'STAFFRD', 'WVRMPTN']
+
+
+def td_elements(count: int, rng: random.Random) -> Iterator[dict]:
+    """Yield S and C class elements, in the proportion seen on TD_ALL_SIG_AREA."""
+    for idx in range(count):
+        area = rng.choice(TD_AREAS)
+        time = str(1647015981000 + idx)
+        roll = rng.random()
+        if roll < 0.6:
+            yield {'SF_MSG': {
+                'time': time, 'area_id': area, 'address': f'{rng.randrange(256):02X}',
+                'msg_type': 'SF', 'data': f'{rng.randrange(256):02X}'}}
+        elif roll < 0.9:
+            yield {'CA_MSG': {
+                'to': f'{rng.randrange(10000):04d}', 'time': time, 'area_id': area,
+                'msg_type': 'CA', 'from': f'{rng.randrange(10000):04d}',
+                'descr': f'{rng.randrange(10)}{rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ")}{rng.randrange(100):02d}'}}
+        elif roll < 0.95:
+            yield {'CB_MSG': {
+                'time': time, 'area_id': area, 'msg_type': 'CB',
+                'from': f'{rng.randrange(10000):04d}', 'descr': '2J01'}}
+        elif roll < 0.99:
+            yield {'CC_MSG': {
+                'time': time, 'area_id': area, 'msg_type': 'CC',
+                'descr': '2J01', 'to': f'{rng.randrange(10000):04d}'}}
+        else:
+            yield {'CT_MSG': {
+                'time': time, 'area_id': area, 'msg_type': 'CT', 'report_time': '1249'}}
+
+
+def trust_elements(count: int, rng: random.Random) -> Iterator[dict]:
+    """Yield TRUST movement elements, in the proportion seen on TRAIN_MVT_ALL_TOC."""
+    templates = [json.loads(msg) for msg, _ in TRUST_MIX]
+    weights = [weight for _, weight in TRUST_MIX]
+    for template in rng.choices(templates, weights, k=count):
+        element = {'header': dict(template['header']), 'body': dict(template['body'])}
+        element['body']['train_id'] = f'{rng.randrange(10, 99)}1P{rng.randrange(10, 99)}MP{rng.randrange(10, 31)}'
+        yield element
+
+
+def vstp_elements(count: int, rng: random.Random) -> Iterator[dict]:
+    """Yield VSTP schedules."""
+    template = json.loads(SCHED)
+    for _ in range(count):
+        element = json.loads(json.dumps(template))
+        element['VSTPCIFMsgV1']['schedule']['CIF_train_uid'] = f' {rng.randrange(10000, 99999)}'
+        yield element
+
+
+def frames(topic: str, elements: Iterator[dict], per_frame: int) -> List[stomp.utils.Frame]:
+    """Return STOMP frames for the topic, each holding per_frame elements."""
+    out = []
+    batch = []
+    for element in elements:
+        batch.append(element)
+        if len(batch) == per_frame:
+            out.append(frame(topic, batch, len(out)))
+            batch = []
+    if batch:
+        out.append(frame(topic, batch, len(out)))
+    return out
+
+
+def frame(topic: str, body: list, idx: int) -> stomp.utils.Frame:
+    """Return a single STOMP MESSAGE frame."""
+    return stomp.utils.Frame(
+        cmd='MESSAGE',
+        headers={
+            'message-id': f'ID:opendata-backend.rockshore.net-35170-1645015525532-11:1:2:1:{idx}',
+            'destination': f'/topic/{topic}',
+            'timestamp': '1647015981040',
+            'expires': '1647016281040',
+            'subscription': '1',
+            'persistent': 'true',
+            'priority': '4'
+        },
+        body=json.dumps(body)
+    )
+
+
+def darwin_messages(count: int, rng: random.Random) -> List[bytes]:
+    """Return uncompressed Push Port TS (forecast) messages."""
+    out = []
+    for _ in range(count):
+        hour = rng.randrange(5, 23)
+        locations = ''.join(
+            DARWIN_LOCATION.format(
+                tpl=tpl, hh=hour, mm=idx * 6, mm2=idx * 6 + 1, plat=rng.randrange(1, 16))
+            for idx, tpl in enumerate(TIPLOCS)
+        )
+        out.append(DARWIN_TS.format(
+            rid=f'2022031{rng.randrange(10**8, 10**9)}',
+            uid=f'P{rng.randrange(10000, 99999)}',
+            locations=locations
+        ).encode())
+    return out
+
+
+def darwin_frames(messages: List[bytes]) -> List[stomp.utils.Frame]:
+    """Return gzip compressed Push Port frames, as received from Darwin."""
+    out = []
+    for msg in messages:
+        compress = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        out.append(stomp.utils.Frame(
+            cmd='MESSAGE',
+            headers={'MessageType': 'TS', 'timestamp': '1647015981040'},
+            body=compress.compress(msg) + compress.flush()
+        ))
+    return out
+
+
+def _complex(*fields, lists=()) -> xsd.ComplexType:
+    """Return a zeep ComplexType of string fields, and unbounded complex lists."""
+    elements = [xsd.Element(name, kind) for name, kind in fields]
+    elements += [xsd.Element(name, kind, max_occurs='unbounded') for name, kind in lists]
+    return xsd.ComplexType(elements)
+
+
+def _strings(*names) -> list:
+    return [(name, xsd.String()) for name in names]
+
+
+LDB_LOCATION = _complex(*_strings('locationName', 'crs', 'via', 'futureChangeTo'),
+                        ('assocIsCancelled', xsd.Boolean()))
+LDB_LOCATIONS = _complex(lists=[('location', LDB_LOCATION)])
+LDB_CALLING_POINT = _complex(*_strings('locationName', 'crs', 'st', 'et', 'at'),
+                             ('isCancelled', xsd.Boolean()), ('length', xsd.Int()),
+                             ('detachFront', xsd.Boolean()))
+LDB_CALLING_POINT_LIST = _complex(lists=[('callingPoint', LDB_CALLING_POINT)])
+LDB_CALLING_POINTS = _complex(lists=[('callingPointList', LDB_CALLING_POINT_LIST)])
+LDB_SERVICE = _complex(
+    *_strings('sta', 'eta', 'std', 'etd', 'platform', 'operator', 'operatorCode'),
+    ('isCircularRoute', xsd.Boolean()), ('isCancelled', xsd.Boolean()),
+    ('filterLocationCancelled', xsd.Boolean()), *_strings('serviceType'),
+    ('length', xsd.Int()), ('detachFront', xsd.Boolean()), ('isReverseFormation', xsd.Boolean()),
+    *_strings('cancelReason', 'delayReason', 'serviceID', 'rsid'),
+    ('origin', LDB_LOCATIONS), ('destination', LDB_LOCATIONS),
+    ('currentOrigins', LDB_LOCATIONS), ('currentDestinations', LDB_LOCATIONS),
+    ('previousCallingPoints', LDB_CALLING_POINTS), ('subsequentCallingPoints', LDB_CALLING_POINTS)
+)
+LDB_SERVICES = _complex(lists=[('service', LDB_SERVICE)])
+LDB_BOARD = _complex(
+    ('generatedAt', xsd.DateTime()),
+    *_strings('locationName', 'crs', 'filterLocationName', 'filtercrs', 'filterType', 'nrccMessages'),
+    ('platformAvailable', xsd.Boolean()), ('areServicesAvailable', xsd.Boolean()),
+    ('trainServices', LDB_SERVICES), ('busServices', LDB_SERVICES), ('ferryServices', LDB_SERVICES)
+)
+
+
+def _calling_points(rng: random.Random, hour: int):
+    """Return the calling points of an LDB service."""
+    points = [
+        LDB_CALLING_POINT(
+            locationName=f'Station {tpl}', crs=tpl[:3], st=f'{hour:02d}:{idx * 6:02d}',
+            et=rng.choice(['On time', 'Delayed', f'{hour:02d}:{idx * 6 + 2:02d}']),
+            at=None, isCancelled=None, length=rng.choice([None, 4, 8, 12]), detachFront=None
+        )
+        for idx, tpl in enumerate(TIPLOCS)
+    ]
+    return LDB_CALLING_POINTS(callingPointList=[LDB_CALLING_POINT_LIST(callingPoint=points)])
+
+
+def ldb_board(rows: int, rng: random.Random):
+    """Return a GetArrDepBoardWithDetails result, as zeep objects."""
+    services = []
+    for _ in range(rows):
+        hour = rng.randrange(5, 23)
+        origin = LDB_LOCATIONS(location=[LDB_LOCATION(
+            locationName='London Euston', crs='EUS', via=None, futureChangeTo=None,
+            assocIsCancelled=None)])
+        destination = LDB_LOCATIONS(location=[LDB_LOCATION(
+            locationName='Glasgow Central', crs='GLC', via='via Preston', futureChangeTo=None,
+            assocIsCancelled=None)])
+        services.append(LDB_SERVICE(
+            sta=f'{hour:02d}:10', eta='On time', std=f'{hour:02d}:12',
+            etd=rng.choice(['On time', 'Delayed', f'{hour:02d}:15']),
+            platform=str(rng.randrange(1, 16)), operator='Avanti West Coast',
+            operatorCode='VT', isCircularRoute=None, isCancelled=None,
+            filterLocationCancelled=None, serviceType='train', length=11, detachFront=None,
+            isReverseFormation=None, cancelReason=None, delayReason=None,
+            serviceID=f'{rng.randrange(10 ** 6, 10 ** 7)}CREWE___', rsid=f'VT{rng.randrange(1000, 9999)}00',
+            origin=origin, destination=destination, currentOrigins=None, currentDestinations=None,
+            previousCallingPoints=_calling_points(rng, hour),
+            subsequentCallingPoints=_calling_points(rng, hour)
+        ))
+    return LDB_BOARD(
+        generatedAt=datetime.datetime(2022, 3, 11, 16, 26, 21, 469021),
+        locationName='Crewe', crs='CRE', filterLocationName=None, filtercrs=None,
+        filterType=None, nrccMessages=None, platformAvailable=True, areServicesAvailable=True,
+        trainServices=LDB_SERVICES(service=services), busServices=None, ferryServices=None
+    )
@@ -0,0 +1,117 @@
+"""Fixtures for Darwin Push Port unit tests."""
+
+PPORT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Pport xmlns="http://www.thalesgroup.com/rtti/PushPort/v16" '
+    'xmlns:ns2="http://www.thalesgroup.com/rtti/PushPort/Schedules/v3" '
+    'xmlns:ns3="http://www.thalesgroup.com/rtti/PushPort/Schedules/v2" '
+    'xmlns:ns4="http://www.thalesgroup.com/rtti/PushPort/Formations/v2" '
+    'xmlns:ns5="http://www.thalesgroup.com/rtti/PushPort/Forecasts/v3" '
+    'xmlns:ns6="http://www.thalesgroup.com/rtti/PushPort/Formations/v2" '
+    'xmlns:ns7="http://www.thalesgroup.com/rtti/PushPort/StationMessages/v1" '
+    'xmlns:ns8="http://www.thalesgroup.com/rtti/PushPort/TrainAlerts/v1" '
+    'xmlns:ns9="http://www.thalesgroup.com/rtti/PushPort/TrainOrder/v1" '
+    'ts="2022-03-11T16:26:21.4690215Z" version="16.0">'
+    '<uR updateOrigin="{origin}">{body}</uR></Pport>'
+)
+
+BODIES = {
+    'TS': (
+        'TD',
+        '<TS rid="202203118971234" uid="P71234" ssd="2022-03-11">'
+        '<ns5:LateReason tiploc="CREWE" near="true">106</ns5:LateReason>'
+        '<ns5:Location tpl="EUSTON" wtd="16:20" ptd="16:20">'
+        '<ns5:dep at="16:21" src="TD"/><ns5:plat platsup="true" conf="true">7</ns5:plat>'
+        '</ns5:Location>'
+        '<ns5:Location tpl="WATFDJ" wtp="16:33:30"><ns5:pass et="16:34" src="Darwin"/></ns5:Location>'
+        '<ns5:Location tpl="MKNSCEN" wta="16:52" wtd="16:53" pta="16:52" ptd="16:53">'
+        '<ns5:arr et="16:53" src="Darwin"/><ns5:dep et="16:54" src="Darwin"/>'
+        '<ns5:plat>4A</ns5:plat><ns5:length>11</ns5:length></ns5:Location>'
+        '</TS>'
+    ),
+    'SC': (
+        'CIS',
+        '<schedule rid="202203118971234" uid="P71234" trainId="1A23" ssd="2022-03-11" '
+        'toc="VT" status="P" trainCat="XX">'
+        '<ns2:OR tpl="EUSTON" act="TB" ptd="16:20" wtd="16:20"/>'
+        '<ns2:PP tpl="WATFDJ" wtp="16:33:30"/>'
+        '<ns2:IP tpl="MKNSCEN" act="T " pta="16:52" ptd="16:53" wta="16:52" wtd="16:53"/>'
+        '<ns2:DT tpl="BHAMNWS" act="TF" pta="17:45" wta="17:45"/>'
+        '<ns2:cancelReason>100</ns2:cancelReason>'
+        '</schedule>'
+    ),
+    'AS': (
+        'CIS',
+        '<association tiploc="CREWE" category="VV" isCancelled="true">'
+        '<ns3:main rid="202203118971234" wta="18:20" wtd="18:30"/>'
+        '<ns3:assoc rid="202203118979999" wtd="18:35"/>'
+        '</association>'
+    ),
+    'SF': (
+        'CIS',
+        '<scheduleFormations rid="202203118971234">'
+        '<ns4:formation fid="202203118971234-001">'
+        '<ns4:coaches><ns4:coach coachNumber="A" coachClass="First"><ns4:toilet>Accessible</ns4:toilet></ns4:coach>'
+        '<ns4:coach coachNumber="B" coachClass="Standard"><ns4:toilet status="NotInService">Standard</ns4:toilet></ns4:coach>'
+        '<ns4:coach coachNumber="C" coachClass="Standard"/></ns4:coaches>'
+        '</ns4:formation></scheduleFormations>'
+    ),
+    'LO': (
+        'CIS',
+        '<formationLoading fid="202203118971234-001" rid="202203118971234" tpl="MKNSCEN" '
+        'wta="16:52" wtd="16:53" pta="16:52" ptd="16:53">'
+        '<ns6:loading coachNumber="A" src="CIS" srcInst="at01">12</ns6:loading>'
+        '<ns6:loading coachNumber="B" src="CIS" srcInst="at01">64</ns6:loading>'
+        '<ns6:loading coachNumber="C">0</ns6:loading>'
+        '</formationLoading>'
+    ),
+    'TO': (
+        'CIS',
+        '<trainOrder tiploc="EUSTON" crs="EUS" platform="7">'
+        '<ns9:set><ns9:first><ns9:rid wtd="16:20">202203118971234</ns9:rid></ns9:first>'
+        '<ns9:second><ns9:trainID>2B45</ns9:trainID></ns9:second></ns9:set>'
+        '</trainOrder>'
+    ),
+    'OW': (
+        'CIS',
+        '<OW id="19443" cat="Train" sev="1" suppress="false">'
+        '<ns7:Station crs="EUS"/><ns7:Station crs="MKC"/>'
+        '<ns7:Msg>Disruption between <ns7:a href="http://nationalrail.co.uk/service_disruptions/1.aspx">'
+        'Euston and Milton Keynes</ns7:a>. Contact help@example.com &amp; see the '
+        '<ns7:p>journey planner</ns7:p> for more.</ns7:Msg>'
+        '</OW>'
+    ),
+    'NO': (
+        'CIS',
+        '<trainAlert><ns8:AlertID>41234</ns8:AlertID>'
+        '<ns8:AlertServices><ns8:AlertService RID="202203118971234" UID="P71234" SSD="2022-03-11">'
+        '<ns8:Location>EUSTON</ns8:Location><ns8:Location>MKNSCEN</ns8:Location></ns8:AlertService>'
+        '</ns8:AlertServices><ns8:SendAlertBySMS>true</ns8:SendAlertBySMS>'
+        '<ns8:AlertText>   </ns8:AlertText><ns8:Audience>Customer</ns8:Audience></trainAlert>'
+    )
+}
+
+# Awkward, but well formed, content the parser must treat as xmltodict does
+EDGE_CASES = [
+    # comments, processing instructions and whitespace between children
+    '<TS rid="1">\n  <!-- a comment -->\n  <ns5:Location tpl="A">\n'
+    '    text <?pi data?> more \n  </ns5:Location>\n</TS>',
+    # an attribute and a child which collide once filtered
+    '<TS rid="1"><ns5:rid>2</ns5:rid><ns5:value>v</ns5:value>text</TS>',
+    # repeated children separated by another
+    '<TS><ns5:a>1</ns5:a><ns5:b/><ns5:a>2</ns5:a><ns5:a x="1"/></TS>',
+    # text which is emptied by the filters
+    '<TS><ns5:a>@</ns5:a><ns5:b c="ns5:">@</ns5:b></TS>',
+    # CDATA, entities and non-ASCII text
+    '<OW><ns7:Msg><![CDATA[<b>bold</b> & #text]]> café &lt;&gt;</ns7:Msg></OW>',
+    # a namespace declared within the update, and a namespaced attribute
+    '<TS xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:type="x">'
+    '<x:a xmlns:x="urn:x" x:b="c">d</x:a><ns5:e xml:lang="en"/></TS>',
+    # empty elements
+    '<TS/><TS></TS><TS>  </TS>'
+]
+
+
+def pport(body: str, origin: str = 'CIS') -> bytes:
+    """Return a Push Port message holding the update body."""
+    return PPORT.format(origin=origin, body=body).encode()
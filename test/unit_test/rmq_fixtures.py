@@ -0,0 +1,30 @@
+"""Fixtures for unit tests of listeners publishing to RMQ."""
+
+import stomp
+from gateway.nrod import nrod_connection as nc
+from gateway.rabbitmq.publish import OutboundConnection
+
+
+class RecordingConnection(OutboundConnection):
+    """An outbound connection recording each message rather than sending it."""
+
+    def __init__(self, exchange):
+        super().__init__(exchange)
+        self.sent = []
+        self.headers = []
+        self.routing_keys = []
+
+    def send_message(self, msg, headers=None, attempt=1, routing_key=''):
+        self.sent.append(msg)
+        self.headers.append(headers)
+        self.routing_keys.append(routing_key)
+        return True
+
+
+def recording_listener(**fields) -> nc.Listener:
+    """Return an NROD Listener publishing every message to a RecordingConnection."""
+    connections = {
+        name: RecordingConnection(name)
+        for name in nc.Listener.__fields__ if name.endswith('_rmq')
+    }
+    return nc.Listener(conn=stomp.Connection12([('localhost', 0)]), **connections, **fields)
@@ -0,0 +1,69 @@
+"""Unit tests for gateway/aio/amqp.py."""
+
+import asyncio
+from gateway.aio.amqp import AsyncioPublisher
+
+
+class FakeChannel:
+    def __init__(self):
+        self.is_open = True
+        self.published = []
+
+    def add_on_close_callback(self, callback):
+        pass
+
+    def exchange_declare(self, exchange, exchange_type, durable, callback):
+        callback(None)
+
+    def confirm_delivery(self, ack_nack_callback, callback):
+        callback(None)
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append(body)
+
+
+class FakeConnection:
+    """An open connection whose ioloop is the asyncio loop, as AsyncioConnection's is."""
+
+    def __init__(self, loop):
+        self.ioloop = loop
+        self.is_open = True
+        self.is_closing = False
+        self.channels = []
+
+    def channel(self, on_open_callback):
+        self.channels.append(FakeChannel())
+        on_open_callback(self.channels[-1])
+
+    def close(self):
+        self.is_open = False
+
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class TestAsyncioPublisher:
+    def test_register_publish_and_stop_from_another_thread(self):
+        async def run():
+            loop = asyncio.get_running_loop()
+            publisher = AsyncioPublisher(None, loop, batch_size=2)
+            publisher.start = lambda: None
+            publisher._connection = FakeConnection(loop)
+
+            state = await loop.run_in_executor(None, publisher.register, 'late-exchange')
+            await settle()
+            assert state.ready
+
+            for body in ('a', 'b'):
+                await loop.run_in_executor(
+                    None, publisher.publish, 'late-exchange', body, None)
+            await settle()
+            assert state.channel.published == ['a', 'b']
+
+            await loop.run_in_executor(None, publisher.stop)
+            await settle()
+            assert not publisher._connection.is_open
+
+        asyncio.run(run())
@@ -0,0 +1,119 @@
+"""Unit tests for gateway/aio/stomp_client.py."""
+
+import asyncio
+import gzip
+import pytest
+from gateway.aio import stomp_client as sc
+
+
+def reader_for(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+class TestFrames:
+    def test_round_trip(self):
+        headers = {'destination': '/topic/TD_ALL_SIG_AREA', 'odd:key': 'a\nb\\c'}
+        data = sc.encode_frame('MESSAGE', headers, b'[{"a": 1}]')
+
+        async def read():
+            return await sc.read_frame(reader_for(data))
+
+        frame = asyncio.run(read())
+        assert frame.cmd == 'MESSAGE'
+        assert frame.headers['odd:key'] == 'a\nb\\c'
+        assert frame.headers['content-length'] == '10'
+        assert frame.body == '[{"a": 1}]'
+
+    def test_binary_body_and_heartbeats(self):
+        body = gzip.compress(b'<Pport/>') + b'\x00\x00'
+        data = b'\n\r\n' + sc.encode_frame('MESSAGE', {'MessageType': 'TS'}, body)
+
+        async def read():
+            reader = reader_for(data)
+            return [await sc.read_frame(reader, auto_decode=False) for _ in range(3)]
+
+        first, second, frame = asyncio.run(read())
+        assert first is None and second is None
+        assert frame.body == body
+
+    def test_repeated_header(self):
+        data = b'MESSAGE\nfoo:1\nfoo:2\n\nbody\x00'
+
+        async def read():
+            return await sc.read_frame(reader_for(data))
+
+        frame = asyncio.run(read())
+        assert frame.headers == {'foo': '1'}
+        assert frame.body == 'body'
+
+    def test_connect_is_not_escaped(self):
+        assert b'passcode:a:b\n' in sc.encode_frame('CONNECT', {'passcode': 'a:b'})
+
+
+class Listener:
+    def __init__(self):
+        self.events = []
+
+    def on_connected(self, frame):
+        self.events.append(('connected', frame.headers['version']))
+
+    def on_message(self, frame):
+        self.events.append(('message', frame.headers['destination'], frame.body))
+
+
+class TestStompClient:
+    @pytest.mark.parametrize('ack', ['auto', 'client-individual'])
+    def test_session(self, ack):
+        received = []
+
+        async def broker(reader, writer):
+            received.append(await sc.read_frame(reader))
+            writer.write(sc.encode_frame('CONNECTED', {'version': '1.2', 'heart-beat': '0,0'}))
+            received.append(await sc.read_frame(reader))
+            for idx in range(3):
+                headers = {'destination': '/topic/TD', 'message-id': str(idx)}
+                if ack != 'auto':
+                    headers['ack'] = str(idx)
+                writer.write(b'\n' + sc.encode_frame('MESSAGE', headers, str(idx).encode()))
+            if ack != 'auto':
+                for _ in range(3):
+                    received.append(await sc.read_frame(reader))
+            received.append(await sc.read_frame(reader))
+            writer.write(sc.encode_frame('RECEIPT', {'receipt-id': 'disconnect'}))
+
+        async def run():
+            server = await asyncio.start_server(broker, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            listener = Listener()
+            client = sc.StompClient('127.0.0.1', port, 'user', 'pass', listener,
+                                    headers={'client-id': 'test'})
+            client.subscribe('/topic/TD', id='TD-test', ack=ack)
+            task = asyncio.ensure_future(client.run())
+            while len(listener.events) < 4:
+                await asyncio.sleep(0.01)
+            await client.disconnect()
+            await asyncio.wait_for(task, 5)
+            server.close()
+            return listener
+
+        listener = asyncio.run(run())
+        assert listener.events == [
+            ('connected', '1.2'),
+            ('message', '/topic/TD', '0'),
+            ('message', '/topic/TD', '1'),
+            ('message', '/topic/TD', '2')
+        ]
+        connect, subscribe, *acks, disconnect = received
+        assert connect.cmd == 'CONNECT'
+        assert connect.headers['client-id'] == 'test'
+        assert subscribe.headers == {'destination': '/topic/TD', 'id': 'TD-test', 'ack': ack}
+        assert [frame.headers['id'] for frame in acks] == ([] if ack == 'auto' else ['0', '1', '2'])
+        assert disconnect.cmd == 'DISCONNECT'
+
+    def test_negotiate(self):
+        client = sc.StompClient('host', 0, 'user', 'pass', None, heartbeats=(15000, 10000))
+        assert client.negotiate('5000,20000') == (20, 10)
+        assert client.negotiate('0,0') == (0, 0)
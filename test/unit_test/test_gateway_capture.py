@@ -0,0 +1,89 @@
+"""Unit tests for gateway/capture.py."""
+
+import gzip
+import os
+import time
+import stomp
+import train_movement_fixtures as tmf
+from gateway import capture
+from gateway.nrod import nrod_connection as nc
+
+
+def frame(body, msg_id='ID:1'):
+    return stomp.utils.Frame('MESSAGE', {
+        'message-id': msg_id,
+        'destination': '/topic/TRAIN_MVT_ALL_TOC',
+        'timestamp': str(int(time.time() * 1000))
+    }, body)
+
+
+class TestSegments:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / f'nrod{capture.SEGMENT_SUFFIX}'
+        with gzip.open(path, 'wb') as file:
+            capture.write_record(file, 1.5, frame('[{"a": 1}]'))
+            capture.write_record(file, 2.5, frame(b'\x1f\x8b\x00', 'ID:2'))
+
+        records = list(capture.read_segments([str(tmp_path)]))
+        assert [received for received, _ in records] == [1.5, 2.5]
+        assert records[0][1].body == '[{"a": 1}]'
+        assert records[1][1].body == b'\x1f\x8b\x00'
+        assert records[1][1].headers['message-id'] == 'ID:2'
+
+    def test_truncated(self, tmp_path):
+        path = tmp_path / f'nrod{capture.SEGMENT_SUFFIX}'
+        with gzip.open(path, 'wb') as file:
+            for idx in range(3):
+                capture.write_record(file, idx, frame('x' * 1000))
+        data = path.read_bytes()
+        path.write_bytes(data[:len(data) - 20])
+        assert len(list(capture.read_segments([str(path)]))) == 2
+
+    def test_partial_segment_in_directory(self, tmp_path):
+        path = tmp_path / f'nrod{capture.SEGMENT_SUFFIX}.partial'
+        with gzip.open(path, 'wb') as file:
+            capture.write_record(file, 1.5, frame('a'))
+        assert capture.segments([str(tmp_path)]) == [str(path)]
+        assert len(list(capture.read_segments([str(tmp_path)]))) == 1
+
+    def test_truncated_headers(self, tmp_path):
+        path = tmp_path / f'nrod{capture.SEGMENT_SUFFIX}'
+        with gzip.open(path, 'wb') as file:
+            capture.write_record(file, 1.5, frame('a'))
+            record = capture.RECORD.pack(2.5, True, 100, 1)
+            file.write(record + b'{"message-id": "ID')
+        assert len(list(capture.read_segments([str(path)]))) == 1
+
+
+class TestFrameCapture:
+    def test_rotation(self, tmp_path):
+        cap = capture.FrameCapture('nrod', str(tmp_path), segment_bytes=1500)
+        cap.start()
+        for idx in range(4):
+            cap.put(frame('x' * 1000, f'ID:{idx}'))
+        cap.stop()
+
+        names = sorted(os.listdir(tmp_path))
+        assert len(names) == 2
+        assert all(name.startswith('nrod-') and name.endswith(capture.SEGMENT_SUFFIX)
+                   for name in names)
+        ids = [frm.headers['message-id'] for _, frm in capture.read_segments([str(tmp_path)])]
+        assert ids == ['ID:0', 'ID:1', 'ID:2', 'ID:3']
+
+    def test_queue_full(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(capture, 'CAPTURE_QUEUE_SIZE', 1)
+        cap = capture.FrameCapture('nrod', str(tmp_path))
+        before = capture.CAPTURE_C.labels(msg='DROPPED')._value.get()
+        cap.put(frame('a'))
+        cap.put(frame('b'))
+        assert capture.CAPTURE_C.labels(msg='DROPPED')._value.get() == before + 1
+
+    def test_listener(self, tmp_path):
+        listener = nc.Listener(conn=stomp.Connection12([('localhost', 0)]))
+        listener.capture = capture.FrameCapture('nrod', str(tmp_path))
+        listener.capture.start()
+        listener.on_message(frame(f'[{tmf.MOVEMENT}]'))
+        listener.capture.stop()
+
+        (_, captured), = capture.read_segments([str(tmp_path)])
+        assert captured.body == f'[{tmf.MOVEMENT}]'
@@ -0,0 +1,75 @@
+"""Unit tests for gateway/ldb/board_delta.py."""
+
+import copy
+from gateway.ldb import board_delta as bd
+
+
+def service(service_id, std='10:00', etd='On time', platform='1', **kwargs):
+    return {
+        'serviceID': service_id, 'std': std, 'etd': etd, 'platform': platform,
+        'operatorCode': 'VT', 'serviceType': 'train', **kwargs
+    }
+
+
+def board(*services, **kwargs):
+    return {
+        'generatedAt': '2022-03-11T16:26:21',
+        'locationName': 'Crewe',
+        'crs': 'CRE',
+        'nrccMessages': None,
+        'platformAvailable': True,
+        'trainServices': {'service': list(services)},
+        'busServices': None,
+        'ferryServices': None,
+        **kwargs
+    }
+
+
+class TestBoardDelta:
+    def test_changes(self):
+        old = board(service('A'), service('B'), service('C'))
+        new = board(service('A', etd='10:05'), service('C', platform='2'), service('D'),
+                    generatedAt='2022-03-11T16:26:41')
+        delta = bd.board_delta(old, new)
+        assert delta['crs'] == 'CRE'
+        assert delta['generatedAt'] == '2022-03-11T16:26:41'
+        assert delta['new'] == [service('D')]
+        assert delta['removed'] == ['B']
+        assert delta['changed'] == [
+            {'serviceID': 'A', 'etd': '10:05'},
+            {'serviceID': 'C', 'platform': '2'}
+        ]
+        assert delta['board'] == {}
+
+    def test_removed_field_and_board_change(self):
+        old = board(service('A', isCancelled=None))
+        new = board(service('A', platform=None, isCancelled=True), nrccMessages=['Disruption'])
+        delta = bd.board_delta(old, new)
+        assert delta['changed'] == [{'serviceID': 'A', 'platform': None, 'isCancelled': True}]
+        assert delta['board'] == {'nrccMessages': ['Disruption']}
+
+    def test_bus_services_and_missing_ids(self):
+        bus = {'std': '11:00', 'operatorCode': 'XR', 'rsid': None, 'serviceType': 'bus'}
+        old = board(busServices={'service': [bus]})
+        new = board(busServices={'service': [dict(bus, etd='11:10')]}, trainServices=None)
+        delta = bd.board_delta(old, new)
+        assert delta['changed'] == [{'serviceID': '11:00-XR-None', 'etd': '11:10'}]
+
+
+class TestBoardTracker:
+    def test_snapshots_deltas_and_unchanged(self):
+        tracker = bd.BoardTracker(snapshot_interval=60)
+        first = board(service('A'))
+        assert tracker.update(first, now=0) == ('snapshot', first)
+
+        same = copy.deepcopy(first)
+        same['generatedAt'] = 'later'
+        assert tracker.update(same, now=20) is None
+
+        kind, delta = tracker.update(board(service('A', etd='Delayed')), now=40)
+        assert kind == 'delta'
+        assert delta['changed'] == [{'serviceID': 'A', 'etd': 'Delayed'}]
+
+        # compared with the last board, not the last snapshot
+        assert tracker.update(board(service('A', etd='Delayed')), now=50) is None
+        assert tracker.update(first, now=60)[0] == 'snapshot'
@@ -0,0 +1,57 @@
+"""Unit tests for gateway/ldb/board_json.py."""
+
+import datetime
+import json
+from zeep import xsd
+from zeep.helpers import serialize_object
+from gateway.ldb import board_json as bj
+
+LOCATION = xsd.ComplexType([
+    xsd.Element('locationName', xsd.String()),
+    xsd.Element('crs', xsd.String())
+])
+LOCATIONS = xsd.ComplexType([xsd.Element('location', LOCATION, max_occurs='unbounded')])
+SERVICE = xsd.ComplexType([
+    xsd.Element('std', xsd.String()),
+    xsd.Element('isCancelled', xsd.Boolean()),
+    xsd.Element('length', xsd.Int()),
+    xsd.Element('origin', LOCATIONS)
+])
+SERVICES = xsd.ComplexType([xsd.Element('service', SERVICE, max_occurs='unbounded')])
+BOARD = xsd.ComplexType([
+    xsd.Element('generatedAt', xsd.DateTime()),
+    xsd.Element('crs', xsd.String()),
+    xsd.Element('trainServices', SERVICES),
+    xsd.Element('busServices', xsd.String())
+])
+
+
+def board():
+    origin = LOCATIONS(location=[LOCATION(locationName='Crewe', crs='CRE')])
+    services = [
+        SERVICE(std='10:00', isCancelled=None, length=11, origin=origin),
+        SERVICE(std='10:05', isCancelled=True, length=None, origin=None)
+    ]
+    return BOARD(
+        generatedAt=datetime.datetime(2022, 3, 11, 16, 26, 21, 469021),
+        crs='CRE',
+        trainServices=SERVICES(service=services),
+        busServices=None
+    )
+
+
+class TestBoardJson:
+    def test_matches_serialize_object(self):
+        expected = serialize_object(board(), dict)
+        expected['generatedAt'] = expected['generatedAt'].isoformat()
+        assert bj.board_dict(board()) == expected
+
+    def test_compact_document(self):
+        doc = bj.board_json(bj.board_dict(board()))
+        assert ': ' not in doc and ', ' not in doc
+        results = json.loads(doc)['results']
+        assert results['generatedAt'] == '2022-03-11T16:26:21.469021'
+        assert results['trainServices']['service'][0]['origin']['location'] == [
+            {'locationName': 'Crewe', 'crs': 'CRE'}
+        ]
+        assert results['trainServices']['service'][1]['isCancelled'] is True
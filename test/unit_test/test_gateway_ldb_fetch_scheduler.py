@@ -0,0 +1,66 @@
+"""Unit tests for gateway/ldb/fetch_scheduler.py."""
+
+import threading
+import time
+from gateway.ldb import fetch_scheduler as fs
+
+
+class TestRateLimiter:
+    def test_unlimited(self):
+        limiter = fs.RateLimiter()
+        started = time.monotonic()
+        for _ in range(100):
+            limiter.wait()
+        assert time.monotonic() - started < 0.1
+
+    def test_rate(self):
+        limiter = fs.RateLimiter(rate=50)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        assert time.monotonic() - started >= 0.1
+
+
+class TestScheduler:
+    def test_staggered(self):
+        calls = []
+        jobs = [(crs, lambda crs=crs: calls.append((crs, time.monotonic()))) for crs in 'ABCD']
+        scheduler = fs.Scheduler(jobs, interval=0.4, workers=4)
+        started = time.monotonic()
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        time.sleep(0.35)
+        scheduler.stop()
+        thread.join()
+
+        assert [crs for crs, _ in calls] == ['A', 'B', 'C', 'D']
+        offsets = [at - started for _, at in calls]
+        assert offsets[-1] >= 0.25
+
+    def test_slow_job_is_skipped(self):
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(1)
+
+        scheduler = fs.Scheduler([('slow', slow)], interval=1)
+        due = [0.0]
+        scheduler.tick(0, due)
+        scheduler.tick(1, due)
+        scheduler.tick(2, due)
+        release.set()
+        scheduler.stop()
+        assert calls == [1]
+        assert due == [3.0]
+
+    def test_errors_are_logged(self):
+        def fail():
+            raise ValueError('upstream error')
+
+        scheduler = fs.Scheduler([('fail', fail), ('ok', lambda: None)], interval=1)
+        due = [0.0, 0.0]
+        scheduler.tick(0, due)
+        scheduler.stop()
+        assert scheduler.running['fail'].exception() is None
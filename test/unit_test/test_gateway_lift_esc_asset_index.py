@@ -0,0 +1,61 @@
+"""Unit tests for gateway/lift_esc/asset_index.py."""
+
+from gateway.lift_esc import asset_index as ai
+
+
+def asset(asset_id, crs='CRE', status='Available', isolated=False, **kwargs):
+    return {
+        'id': asset_id, 'sensorId': f's{asset_id}', 'crs': crs, 'type': 'Lift',
+        'displayName': f'Lift {asset_id}', 'blockId': 1, 'description': 'Lift',
+        'location': 'Platform 1',
+        'status': {
+            'status': status, 'isolated': isolated, 'engineerOnSite': False,
+            'independent': False, 'sensorId': f's{asset_id}', **kwargs
+        }
+    }
+
+
+class TestAssetIndex:
+    def test_first_update_has_no_events(self):
+        index = ai.AssetIndex()
+        assert index.update([asset(1), asset(2)]) == []
+        assert index.update([asset(1), asset(2)]) == []
+
+    def test_events(self):
+        index = ai.AssetIndex()
+        index.update([asset(1), asset(2), asset(3)])
+        events = index.update([
+            asset(1, status='NotAvailable', isolated=True), asset(2), asset(4, crs='EUS')
+        ])
+        assert [(event['event'], event['id']) for event in events] == [
+            ('changed', 1), ('new', 4), ('removed', 3)
+        ]
+        changed = events[0]
+        assert changed['changed'] == ['status', 'isolated']
+        assert changed['previous']['status'] == 'Available'
+        assert changed['status']['isolated'] is True
+        assert 'location' not in changed and 'sensorId' not in changed['status']
+        assert ai.routing_key(changed) == 'CRE.1'
+        assert ai.routing_key(events[1]) == 'EUS.4'
+
+    def test_keyed_by_sensor_id_and_missing_status(self):
+        index = ai.AssetIndex()
+        index.update([dict(asset(None), status=None)])
+        events = index.update([asset(None, engineerOnSite=True)])
+        assert len(events) == 1
+        assert events[0]['changed'] == ['status', 'isolated', 'engineerOnSite', 'independent']
+        assert ai.routing_key({'crs': None, 'id': 'a.b'}) == '.a_b'
+
+    def test_snapshot(self):
+        index = ai.AssetIndex(snapshot_interval=60)
+        index.update([asset(1), asset(1), asset(2)])
+        assert index.snapshot_due(now=0)
+        assert not index.snapshot_due(now=59)
+        assert index.snapshot_due(now=60)
+        snapshot = index.snapshot()
+        assert [item['id'] for item in snapshot] == [1, 2]
+        assert snapshot[0] == {
+            'id': 1, 'sensorId': 's1', 'crs': 'CRE', 'type': 'Lift', 'displayName': 'Lift 1',
+            'status': {'status': 'Available', 'isolated': False,
+                       'engineerOnSite': False, 'independent': False}
+        }
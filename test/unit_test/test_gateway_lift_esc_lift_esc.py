@@ -0,0 +1,76 @@
+"""Unit tests for gateway/lift_esc/lift_esc.py."""
+
+import json
+import pytest
+from gateway.lift_esc import lift_esc as le
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.text = json.dumps(body or {})
+        self.content = self.text.encode()
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.tokens = 0
+        self.posts = []
+
+    def request(self, method, url, **kwargs):
+        self.tokens += 1
+        return FakeResponse(body={'access_token': f'token{self.tokens}', 'expires_in': 600})
+
+    def post(self, url, headers=None, **kwargs):
+        self.posts.append(dict(headers))
+        return self.responses.pop(0)
+
+
+ASSETS = {'data': {'assets': [{'id': 1, 'crs': 'CRE', 'status': {'status': 'Available'}}]}}
+
+
+@pytest.fixture
+def status(monkeypatch):
+    session = FakeSession([])
+    monkeypatch.setattr(le, 'get_session', lambda: session)
+    clock = [1000.0]
+    monkeypatch.setattr(le.time, 'monotonic', lambda: clock[0])
+    lift_esc = le.LiftEscStatus()
+    sent = []
+    monkeypatch.setattr(lift_esc, 'send_message', lambda msg, **kwargs: sent.append(msg))
+    return lift_esc, session, clock, sent
+
+
+class TestLiftEscStatus:
+    def test_token_refreshed_before_expiry(self, status):
+        lift_esc, session, clock, sent = status
+        session.responses = [FakeResponse(body=ASSETS), FakeResponse(body=ASSETS)]
+        lift_esc.fetch()
+        assert session.posts[0]['Authorization'] == 'Bearer token1'
+
+        clock[0] += 600 - le.TOKEN_REFRESH_MARGIN
+        lift_esc.fetch()
+        assert session.posts[1]['Authorization'] == 'Bearer token2'
+        assert len(sent) == 2
+
+    def test_token_refreshed_when_rejected(self, status):
+        lift_esc, session, _, sent = status
+        session.responses = [FakeResponse(401), FakeResponse(body=ASSETS)]
+        lift_esc.fetch()
+        assert [post['Authorization'] for post in session.posts] == [
+            'Bearer token1', 'Bearer token2'
+        ]
+        assert len(sent) == 1
+
+    def test_not_modified(self, status):
+        lift_esc, session, _, sent = status
+        session.responses = [
+            FakeResponse(body=ASSETS, headers={'ETag': '"v1"'}), FakeResponse(304)
+        ]
+        lift_esc.fetch()
+        lift_esc.fetch()
+        assert 'If-None-Match' not in session.posts[0]
+        assert session.posts[1]['If-None-Match'] == '"v1"'
+        assert len(sent) == 1
@@ -1,9 +1,15 @@
 """Unit tests for gateway_logging_gateway_logging.py."""
 
+import json
+import logging
+import queue
+import sys
+import threading
 import pytest
 import pydantic
 
 from gateway.logging.gateway_logging import GatewayLogger
+from gateway.logging import gateway_logging as gl
 
 
 class TestGatewayLogger:
@@ -11,3 +17,73 @@ class TestGatewayLogger:
         log = GatewayLogger('test.py', False).logger
         log.error('FOO')
         assert 'FOO' in caplog.text
+
+
+def record(msg='Validation Error: %s', args=('0003',), **extra):
+    rec = logging.LogRecord('nrod', logging.ERROR, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+class TestRateLimitFilter:
+    def test_limit_per_window(self, monkeypatch):
+        clock = [0.0]
+        monkeypatch.setattr(gl.time, 'monotonic', lambda: clock[0])
+        rate = gl.RateLimitFilter(2, 60)
+        assert [rate.filter(record()) for _ in range(4)] == [True, True, False, False]
+        # other records are counted separately
+        assert rate.filter(record(rate_key='validation.0001'))
+
+        clock[0] = 60
+        passed = record()
+        assert rate.filter(passed)
+        assert passed.getMessage() == 'Validation Error: 0003 [2 similar records suppressed]'
+        assert rate.filter(record()) and not rate.filter(record())
+
+
+class TestBoundedQueueHandler:
+    def test_writes_on_writer_thread(self, monkeypatch):
+        monkeypatch.setattr(gl, 'LOG_WRITER', None)
+        written = []
+        target = logging.Handler()
+        target.emit = lambda rec: written.append((rec.getMessage(), threading.current_thread()))
+        handler = gl.BoundedQueueHandler(target)
+        handler.handle(record())
+        gl.stop_log_writer()
+        assert written[0][0] == 'Validation Error: 0003'
+        assert written[0][1] is not threading.current_thread()
+
+    def test_drops_when_full(self, monkeypatch):
+        writer = gl.LogWriter(queue.Queue(1))
+        monkeypatch.setattr(gl, 'LOG_WRITER', writer)
+        handler = gl.BoundedQueueHandler(logging.Handler())
+        dropped = gl.LOG_DROPPED_C.labels(msg='QUEUE_FULL')._value.get()
+        handler.handle(record())
+        handler.handle(record())
+        assert writer.queue.qsize() == 1
+        assert gl.LOG_DROPPED_C.labels(msg='QUEUE_FULL')._value.get() == dropped + 1
+
+
+class TestJsonFormatter:
+    def test_format(self):
+        rec = record(trust_id='172A57MR11', msg_type='0003', rate_key='validation.0003')
+        rec.created, rec.msecs = 1647015981.25, 250
+        line = json.loads(gl.JsonFormatter('nrod_connection').format(rec))
+        assert line == {
+            'ts': '2022-03-11T16:26:21.250Z',
+            'level': 'ERROR',
+            'service': 'nrod_connection',
+            'logger': 'nrod',
+            'message': 'Validation Error: 0003',
+            'msg_type': '0003',
+            'trust_id': '172A57MR11'
+        }
+
+    def test_exception(self):
+        try:
+            raise KeyError('uR')
+        except KeyError:
+            rec = logging.LogRecord('darwin', logging.ERROR, __file__, 1, 'Failed', None,
+                                    sys.exc_info())
+        line = json.loads(gl.JsonFormatter('darwin').format(rec))
+        assert "KeyError: 'uR'" in line['exc']
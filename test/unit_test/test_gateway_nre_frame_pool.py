@@ -0,0 +1,89 @@
+"""Unit tests for gateway/nre/frame_pool.py."""
+
+import json
+import os
+import subprocess
+import sys
+import zlib
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from push_port_fixtures import BODIES, pport
+from gateway.nre import frame_pool
+from gateway.nre import push_port as pp
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# as a spawned worker imports its parent's main module, here darwin.py
+WORKER_IMPORT = """
+import json, logging, runpy, sys
+sys.path.insert(0, '.')
+from gateway.rabbitmq import publish
+created = []
+publish.get_outbound_connection = lambda *args, **kwargs: created.append(args)
+runpy.run_path('gateway/nre/darwin.py', run_name='__mp_main__')
+print(json.dumps({'connections': created, 'handlers': len(logging.getLogger('darwin').handlers)}))
+"""
+
+
+def compress(message: bytes) -> bytes:
+    comp = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    return comp.compress(message) + comp.flush()
+
+
+class TestFramePool:
+    def test_published_in_order(self):
+        published = []
+        pool = frame_pool.FramePool(
+            lambda *args: published.append(args), envelope=True, split=True, workers=2)
+        pool.start()
+
+        # frames of very different sizes, so workers finish out of order
+        frames = []
+        for idx in range(40):
+            msg_type = sorted(BODIES)[idx % len(BODIES)]
+            origin, body = BODIES[msg_type]
+            frames.append((msg_type, compress(pport(body * (1 + idx % 7 * 20), origin))))
+        frames.append(('TS', b'not compressed'))
+
+        for msg_type, body in frames:
+            pool.submit(msg_type, body)
+        pool.stop()
+
+        expected = [
+            (msg_type, *pp.process_frame(body, msg_type, True, True))
+            for msg_type, body in frames[:-1]
+        ]
+        assert published == expected
+
+    def test_rebuilt_when_a_worker_dies(self):
+        published = []
+        pool = frame_pool.FramePool(
+            lambda *args: published.append(args), envelope=True, split=False, workers=1, size=1)
+        pool.start()
+        broken = pool.executor
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+
+        origin, body = BODIES['TS']
+        frame = compress(pport(body, origin))
+        before = frame_pool.POOL_LOST_C._value.get()
+        pool.submit('TS', frame)
+        pool.stop()
+
+        assert pool.executor is not broken
+        assert published == [('TS', *pp.process_frame(frame, 'TS', True, False))]
+        assert frame_pool.POOL_LOST_C._value.get() == before
+        assert pool.slots.acquire(blocking=False)
+
+    def test_workers_open_no_connections(self, tmp_path):
+        env = dict(
+            os.environ, LOG_DIR=str(tmp_path), DARWIN_SPLIT='true',
+            DARWIN_USER='user', DARWIN_PASS='pass', DARWIN_TOPIC='topic',
+            DARWIN_STATUS='status', DARWIN_HOST='localhost', DARWIN_PORT='61613'
+        )
+        proc = subprocess.run(
+            [sys.executable, '-c', WORKER_IMPORT], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True
+        )
+        assert json.loads(proc.stdout.splitlines()[-1]) == {'connections': [], 'handlers': 0}
@@ -0,0 +1,95 @@
+"""Unit tests for gateway_nre_push_port.py."""
+
+import json
+import pytest
+import xmltodict
+from xml.parsers import expat
+from push_port_fixtures import BODIES, EDGE_CASES, pport
+from gateway.nre import push_port as pp
+
+
+def reference(message: bytes, filters: list):
+    """The original xmltodict, json, str.replace, json round trip."""
+    dump = json.dumps(xmltodict.parse(message)['Pport']['uR'])
+    for filt in filters:
+        dump = dump.replace(*filt)
+    return json.loads(dump)
+
+
+class TestParseUpdate:
+    @pytest.mark.parametrize('msg_type', sorted(BODIES))
+    def test_matches_reference(self, msg_type):
+        origin, body = BODIES[msg_type]
+        message = pport(body, origin)
+        filters = pp.MESSAGE_FILTERS[msg_type]
+        res = pp.parse_update(message, filters)
+        assert json.dumps(res) == json.dumps(reference(message, filters))
+
+    @pytest.mark.parametrize('body', EDGE_CASES)
+    @pytest.mark.parametrize('msg_type', sorted(pp.MESSAGE_FILTERS))
+    def test_edge_cases(self, body, msg_type):
+        message = pport(body)
+        filters = pp.MESSAGE_FILTERS[msg_type]
+        res = pp.parse_update(message, filters)
+        assert json.dumps(res) == json.dumps(reference(message, filters))
+
+    def test_unfiltered(self):
+        origin, body = BODIES['TS']
+        message = pport(body, origin)
+        assert pp.parse_update(message, []) == xmltodict.parse(message)['Pport']['uR']
+
+    def test_missing_update(self):
+        with pytest.raises(KeyError):
+            pp.parse_update(b'<Pport ts="1"><sR/></Pport>', [])
+        with pytest.raises(KeyError):
+            pp.parse_update(b'<Other><uR/></Other>', [])
+
+    def test_invalid_xml(self):
+        with pytest.raises(expat.ExpatError):
+            pp.parse_update(b'<Pport><uR>', [])
+
+
+class TestSplitUpdate:
+    def test_records(self):
+        origin, body = BODIES['TS']
+        update = pp.parse_update(pport(body + body.replace('P71234', 'P70000'), origin),
+                                 pp.MESSAGE_FILTERS['TS'])
+        records = list(pp.split_update(update))
+        assert [(msg_type, key) for msg_type, key, _ in records] == [
+            ('TS', '202203118971234.P71234'),
+            ('TS', '202203118971234.P70000')
+        ]
+        for _, _, record in records:
+            assert record['updateOrigin'] == 'TD'
+            assert isinstance(record['TS'], dict)
+
+    def test_several_updates(self):
+        ts_origin, ts_body = BODIES['TS']
+        _, ow_body = BODIES['OW']
+        message = pport(f'{ts_body}</uR><uR updateOrigin="CIS">{ow_body}', ts_origin)
+        update = pp.parse_update(message, pp.MESSAGE_FILTERS['TS'])
+        assert isinstance(update, list)
+        records = list(pp.split_update(update))
+        assert [(msg_type, record['updateOrigin']) for msg_type, _, record in records] == [
+            ('TS', 'TD'),
+            ('OW', 'CIS')
+        ]
+
+    @pytest.mark.parametrize('msg_type', sorted(BODIES))
+    def test_record_types(self, msg_type):
+        origin, body = BODIES[msg_type]
+        update = pp.parse_update(pport(body, origin), pp.MESSAGE_FILTERS[msg_type])
+        records = list(pp.split_update(update))
+        assert len(records) == 1
+        assert records[0][0] == msg_type
+        assert json.dumps(records[0][2]) == json.dumps(update)
+
+    def test_routing_key(self):
+        assert pp.routing_key({'tiploc': 'CREWE', 'category': 'VV'}, ('tiploc', 'category')) == 'CREWE.VV'
+        assert pp.routing_key({'rid': 'a.b'}, ('rid', 'uid')) == 'a_b.'
+        assert pp.routing_key(None, ('rid',)) == ''
+
+    def test_unknown_records(self):
+        update = {'updateOrigin': 'CIS', 'alarm': {'id': '1'}}
+        assert not list(pp.split_update(update))
+        assert not list(pp.split_update(None))
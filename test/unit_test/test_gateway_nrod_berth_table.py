@@ -0,0 +1,98 @@
+"""Unit tests for gateway/nrod/berth_table.py."""
+
+import json
+import urllib.request
+from gateway.nrod import berth_table as bt
+from gateway.nrod.c_class import CClassMessage
+
+
+def c_class(msg_type, area='SK', time=1647015981000, **fields):
+    return CClassMessage(area_id=area, msg_type=msg_type, time=time, **fields)
+
+
+def table_with_steps():
+    table = bt.BerthTable()
+    table.apply(c_class('CC', to='0123', descr='1A23'))
+    table.apply(c_class('CA', **{'from': '0123', 'to': '0125', 'descr': '1A23'}))
+    table.apply(c_class('CC', area='EK', to='A001', descr='2B45'))
+    return table
+
+
+class TestBerthTable:
+    def test_steps_cancels_and_interposes(self):
+        table = table_with_steps()
+        assert table.snapshot() == {
+            'seq': 3,
+            'areas': {
+                'SK': {'time': 1647015981000, 'berths': {'0125': '1A23'}},
+                'EK': {'time': 1647015981000, 'berths': {'A001': '2B45'}}
+            }
+        }
+        assert table.occupied == 2
+
+        table.apply(c_class('CB', area='EK', **{'from': 'A001', 'descr': '2B45'}))
+        table.apply(c_class('CT', area='EK', time=1647015999000, report_time='1249'))
+        snapshot = table.snapshot('EK')
+        assert snapshot == {
+            'seq': 4, 'areas': {'EK': {'time': 1647015999000, 'berths': {}}}
+        }
+        assert table.occupied == 1
+
+    def test_strings_interned(self):
+        table = bt.BerthTable()
+        table.apply(c_class('CC', to=''.join(['01', '23']), descr=''.join(['1A', '23'])))
+        table.apply(c_class('CC', to='0124', descr=''.join(['1A', '23'])))
+        berths = table.areas['SK']
+        assert berths['0123'] is berths['0124']
+
+    def test_subscribe(self):
+        table = table_with_steps()
+        snapshot, changes = table.subscribe('SK')
+        assert snapshot['seq'] == 3 and list(snapshot['areas']) == ['SK']
+
+        table.apply(c_class('CA', **{'from': '0125', 'to': '0127', 'descr': '1A23'}))
+        assert changes.get_nowait() == {
+            'seq': 4, 'area': 'SK', 'time': 1647015981000,
+            'berths': {'0125': None, '0127': '1A23'}
+        }
+
+        table.unsubscribe(changes)
+        table.apply(c_class('CB', **{'from': '0127', 'descr': '1A23'}))
+        assert changes.empty()
+
+    def test_slow_subscriber_dropped(self, monkeypatch):
+        monkeypatch.setattr(bt, 'SUBSCRIBER_QUEUE_SIZE', 2)
+        table = bt.BerthTable()
+        _, changes = table.subscribe()
+        for berth in ('0001', '0002', '0003'):
+            table.apply(c_class('CC', to=berth, descr='1A23'))
+        assert [changes.get_nowait()['seq'] for _ in range(2)] == [1, 2]
+        assert changes.get_nowait() is None
+        assert not table.subscribers
+
+
+class TestBerthApi:
+    def test_snapshots_and_stream(self):
+        table = table_with_steps()
+        server = bt.serve(table, 0)
+        url = f'http://127.0.0.1:{server.server_address[1]}/berths'
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert json.load(response)['seq'] == 3
+            with urllib.request.urlopen(f'{url}/EK', timeout=5) as response:
+                assert json.load(response)['areas'] == {
+                    'EK': {'time': 1647015981000, 'berths': {'A001': '2B45'}}
+                }
+
+            with urllib.request.urlopen(f'{url}/stream?area=SK', timeout=5) as response:
+                assert json.loads(response.readline())['areas']['SK']['berths'] == {
+                    '0125': '1A23'
+                }
+                table.apply(c_class('CC', area='EK', to='A002', descr='2B46'))
+                table.apply(c_class('CB', **{'from': '0125', 'descr': '1A23'}))
+                assert json.loads(response.readline()) == {
+                    'seq': 5, 'area': 'SK', 'time': 1647015981000, 'berths': {'0125': None}
+                }
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,71 @@
+"""Unit tests for gateway/nrod/dedup.py."""
+
+import json
+import time
+import stomp
+import train_movement_fixtures as tmf
+from rmq_fixtures import recording_listener
+from gateway.nrod import dedup
+from gateway.nrod import nrod_connection as nc
+
+
+def frame(msg_id, body):
+    return stomp.utils.Frame('MESSAGE', {
+        'message-id': msg_id,
+        'destination': '/topic/TRAIN_MVT_ALL_TOC',
+        'timestamp': str(int(time.time() * 1000))
+    }, body)
+
+
+class TestDedupWindow:
+    def test_seen(self):
+        window = dedup.DedupWindow('TEST')
+        assert not window.seen('a')
+        assert window.seen('a')
+        assert not window.seen('b')
+        assert window.current == {hash('a'), hash('b')}
+
+    def test_rotation(self):
+        window = dedup.DedupWindow('TEST', size=2)
+        for key in ('a', 'b', 'c'):
+            window.seen(key)
+        # a and b are the previous generation, c the current
+        assert window.seen('a')
+        window.seen('d')
+        window.seen('e')
+        assert not window.seen('a')
+        assert window.previous == {hash('c'), hash('d')}
+
+    def test_trust_key(self):
+        mvt = json.loads(tmf.MOVEMENT)
+        assert dedup.trust_key(mvt) == dedup.trust_key(json.loads(tmf.MOVEMENT))
+        mvt['body']['loc_stanox'] = '00000'
+        assert dedup.trust_key(mvt) != dedup.trust_key(json.loads(tmf.MOVEMENT))
+        assert dedup.trust_key(json.loads(tmf.COI)) != dedup.trust_key(json.loads(tmf.COL))
+
+
+class TestListenerDedup:
+    def listener(self, monkeypatch):
+        monkeypatch.setattr(nc, 'DEDUP', True)
+        return recording_listener()
+
+    def test_redelivered_frame(self, monkeypatch):
+        listener = self.listener(monkeypatch)
+        before = dedup.DUPLICATE_C.labels(msg='FRAME')._value.get()
+        listener.on_message(frame('ID:1', f'[{tmf.MOVEMENT}]'))
+        listener.on_message(frame('ID:1', f'[{tmf.MOVEMENT}]'))
+        assert len(listener.mvt_rmq.sent) == 1
+        assert dedup.DUPLICATE_C.labels(msg='FRAME')._value.get() == before + 1
+
+    def test_repeated_element(self, monkeypatch):
+        listener = self.listener(monkeypatch)
+        listener.on_message(frame('ID:1', f'[{tmf.MOVEMENT}, {tmf.COL}]'))
+        listener.on_message(frame('ID:2', f'[{tmf.COL}, {tmf.MOVEMENT}, {tmf.COI}]'))
+        assert len(listener.mvt_rmq.sent) == 1
+        assert len(listener.col_rmq.sent) == 1
+        assert len(listener.coi_rmq.sent) == 1
+
+    def test_off_by_default(self):
+        listener = nc.Listener(conn=stomp.Connection12([('localhost', 0)]))
+        assert listener.frames_seen is None
+        assert listener.trust_seen is None
@@ -4,6 +4,8 @@ import json
 import datetime
 import pytest
 import pydantic
+import train_movement_fixtures as tmf
+from rmq_fixtures import recording_listener
 from s_class_fixtures import msg_header, raw_msg
 from gateway.nrod import nrod_connection as nc
 
@@ -28,3 +30,30 @@ class TestMessage:
         assert msg.timestamp
         assert isinstance(msg.msg_time, datetime.datetime)
         assert nc.Message(**json.loads(msg.json())).json()
+
+
+class TestErrorContext:
+    def errors(self, monkeypatch):
+        logged = []
+        monkeypatch.setattr(
+            nc.LOG.logger, 'error', lambda msg, *args, extra=None: logged.append(extra))
+        return logged
+
+    def test_td_area(self, monkeypatch, raw_msg):
+        logged = self.errors(monkeypatch)
+        listener = recording_listener()
+        bad = {'CA_MSG': {'area_id': 'X1', 'msg_type': 'CA'}}
+        good = {'CA_MSG': {
+            'time': '1647015981000', 'area_id': 'X1', 'msg_type': 'CA',
+            'from': '0125', 'to': '0127', 'descr': '1A23'}}
+        listener.process_message(nc.Message(headers=raw_msg.headers, body=json.dumps([bad, good])))
+        assert logged == [{'topic': 'TD', 'td_area': 'X1'}]
+        assert len(listener.c_class_rmq.sent) == 1
+
+    def test_trust_id(self, monkeypatch):
+        logged = self.errors(monkeypatch)
+        listener = recording_listener()
+        mvt = json.loads(tmf.MOVEMENT)
+        mvt['body']['loc_stanox'] = 'XXXXX'
+        listener.process_train_movements(mvt)
+        assert logged[0]['trust_id'] == mvt['body']['train_id']
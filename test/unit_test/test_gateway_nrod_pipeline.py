@@ -0,0 +1,58 @@
+"""Unit tests for gateway/nrod/pipeline.py."""
+
+import threading
+from gateway.nrod import pipeline
+
+
+class TestRingBuffer:
+    def test_overwrites_oldest(self):
+        buffer = pipeline.RingBuffer(2)
+        assert buffer.put(1)
+        assert buffer.put(2)
+        assert not buffer.put(3)
+        assert len(buffer) == 2
+        assert buffer.get() == 2
+        assert buffer.get() == 3
+        assert buffer.get(timeout=0.01) is None
+
+    def test_close_wakes_consumer(self):
+        buffer = pipeline.RingBuffer(2)
+        buffer.close()
+        assert buffer.get() is None
+
+
+class TestFramePipeline:
+    def test_workers_handle_frames(self):
+        handled = []
+        done = threading.Event()
+
+        def handler(frame):
+            handled.append(frame)
+            if len(handled) == 3:
+                done.set()
+
+        pipe = pipeline.FramePipeline(handler, {'TD': 1, 'VSTP': 0})
+        pipe.start()
+        pipe.submit('TD', 'one')
+        pipe.submit('TD', 'two')
+        pipe.submit('VSTP', 'inline')
+        assert done.wait(timeout=5)
+        pipe.stop()
+
+        assert 'inline' in handled
+        assert handled.index('one') < handled.index('two')
+
+    def test_handler_errors_do_not_stop_workers(self):
+        done = threading.Event()
+
+        def handler(frame):
+            if frame == 'bad':
+                raise ValueError(frame)
+            done.set()
+
+        pipe = pipeline.FramePipeline(handler, {'TD': 1})
+        pipe.start()
+        pipe.submit('TD', 'bad')
+        pipe.submit('TD', 'good')
+        assert done.wait(timeout=5)
+        pipe.stop()
@@ -0,0 +1,106 @@
+"""Unit tests for gateway/nrod/signal_state.py."""
+
+import json
+import random
+import sys
+import threading
+from rmq_fixtures import recording_listener
+from gateway.nrod import nrod_connection as nc
+from gateway.nrod import signal_state as ss
+from gateway.nrod.s_class import SClassMessage
+
+
+def s_class(msg_type, address, data, area='X1'):
+    return SClassMessage(
+        time=1647015981000, area_id=area, msg_type=msg_type, address=address, data=data)
+
+
+class TestSignalState:
+    def test_set_bits_table(self):
+        assert ss.SET_BITS[0] == ()
+        assert ss.SET_BITS[0x81] == (0, 7)
+        assert all(
+            sum(1 << bit for bit in ss.SET_BITS[value]) == value for value in range(256)
+        )
+
+    def test_changes(self):
+        state = ss.SignalState()
+        first = state.apply(s_class('SF', '35', 'E0'))
+        assert len(first) == 8
+        assert [(bit, value) for _, _, bit, value in first if value] == [(5, 1), (6, 1), (7, 1)]
+
+        assert state.apply(s_class('SF', '35', 'E0')) == []
+        assert state.apply(s_class('SF', '35', 'A1')) == [('X1', 0x35, 0, 1), ('X1', 0x35, 6, 0)]
+        assert state.value('X1', 0x35) == 0xA1
+        assert state.value('X1', 0x36) is None
+        assert state.value('Y1', 0x35) is None
+
+    def test_refresh(self):
+        state = ss.SignalState()
+        state.apply(s_class('SF', '01', '00'))
+        changes = state.apply(s_class('SG', '00', '0001FF00'))
+        addresses = {address for _, address, _, _ in changes}
+        # 00, 02 and 03 not seen before, 01 changed in bit 0 only
+        assert addresses == {0, 1, 2, 3}
+        assert [change for change in changes if change[1] == 1] == [('X1', 1, 0, 1)]
+        assert state.apply(s_class('SH', 'FE', '01020304')) != []
+        assert state.value('X1', 0xFF) == 2
+
+    def test_concurrent_updates(self):
+        state = ss.SignalState()
+        changes = []
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        def update(seed):
+            rng = random.Random(seed)
+            for _ in range(2000):
+                changes.extend(state.apply(s_class('SF', '10', f'{rng.randrange(256):02X}')))
+
+        threads = [threading.Thread(target=update, args=(seed,)) for seed in range(4)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        # applied one at a time, the changes to each bit alternate, ending at its value
+        final = state.value('X1', 0x10)
+        for bit in range(8):
+            values = [value for _, _, changed, value in changes if changed == bit]
+            ones, zeros = values.count(1), values.count(0)
+            assert ones - zeros in ((0, 1) if final >> bit & 1 else (0, -1))
+
+
+class TestListenerBitChanges:
+    def listener(self, monkeypatch, messages=True):
+        monkeypatch.setattr(nc, 'S_CLASS_BITS', True)
+        monkeypatch.setattr(nc, 'S_CLASS_MESSAGES', messages)
+        return recording_listener()
+
+    def test_bit_changes_published(self, monkeypatch):
+        listener = self.listener(monkeypatch)
+        element = {'SF_MSG': {
+            'time': '1647015981000', 'area_id': 'X1', 'address': '35',
+            'msg_type': 'SF', 'data': '01'}}
+        listener.process_s_class(element, 'SF_MSG')
+        element['SF_MSG']['data'] = '03'
+        listener.process_s_class(element, 'SF_MSG')
+
+        bits = listener.s_class_bits_rmq
+        assert len(bits.sent) == 9
+        assert bits.routing_keys[-1] == 'X1.35.1'
+        assert json.loads(bits.sent[-1]) == {
+            'area': 'X1', 'address': '35', 'bit': 1, 'value': 1, 'time': 1647015981000
+        }
+        assert len(listener.s_class_rmq.sent) == 2
+
+    def test_refresh_without_messages(self, monkeypatch):
+        listener = self.listener(monkeypatch, messages=False)
+        listener.process_s_class({'SG_MSG': {
+            'time': '1647015981000', 'area_id': 'X1', 'address': '00',
+            'msg_type': 'SG', 'data': '00000000'}}, 'SG_MSG')
+        assert len(listener.s_class_bits_rmq.sent) == 32
+        assert listener.s_class_rmq.sent == []
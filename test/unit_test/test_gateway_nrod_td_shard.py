@@ -0,0 +1,38 @@
+"""Unit tests for gateway/nrod/td_shard.py."""
+
+import multiprocessing
+from functools import partial
+from gateway.nrod import td_shard
+
+
+def recording_handler(results):
+    return results.put
+
+
+def step(area, descr):
+    return {'CA_MSG': {'area_id': area, 'descr': descr}}
+
+
+class TestShardFor:
+    def test_stable(self):
+        assert td_shard.shard_for('SK', 4) == td_shard.shard_for('SK', 4)
+        assert 0 <= td_shard.shard_for('G1', 4) < 4
+
+    def test_area_of(self):
+        assert td_shard.area_of(step('X1', '1A01')) == 'X1'
+        assert td_shard.area_of({}) == ''
+
+
+class TestTDShardPool:
+    def test_preserves_order_per_area(self):
+        results = multiprocessing.get_context('spawn').Queue()
+        pool = td_shard.TDShardPool(partial(recording_handler, results), shards=3)
+        pool.start()
+        elements = [step(area, str(idx)) for idx in range(20) for area in ('SK', 'G1', 'X1')]
+        pool.submit(elements)
+        pool.stop()
+
+        received = [results.get(timeout=5) for _ in elements]
+        for area in ('SK', 'G1', 'X1'):
+            seq = [int(el['CA_MSG']['descr']) for el in received if el['CA_MSG']['area_id'] == area]
+            assert seq == list(range(20))
@@ -0,0 +1,76 @@
+"""Unit tests for gateway/nrod/train_index.py."""
+
+import json
+import pytest
+import train_movement_fixtures as tmf
+from rmq_fixtures import recording_listener
+from gateway.nrod import nrod_connection as nc
+from gateway.nrod import train_index as ti
+
+HEADERS = {'train_uid': 'C21373', 'schedule_start_date': '2016-12-12', 'headcode': '5F25'}
+
+
+def activation(train_id='775F25MP24'):
+    return {
+        'train_id': train_id, 'train_uid': 'C21373',
+        'schedule_start_date': '2016-12-12', 'schedule_wtt_id': '5F25M'
+    }
+
+
+class TestTrainIndex:
+    def test_activation_and_rename(self):
+        index = ti.TrainIndex()
+        assert index.update('0001', activation(), now=0) == HEADERS
+        assert index.update('0003', {'train_id': '775F25MP24'}, now=1) == HEADERS
+        assert index.update('0003', {'train_id': '000000MP24'}, now=1) is None
+
+        coi = {'train_id': '775F25MP24', 'revised_train_id': '77125FMP24'}
+        assert index.update('0007', coi, now=2) == HEADERS
+        assert index.update('0008', {'train_id': '775F25MP24'}, now=3) is None
+        assert index.update('0002', {'train_id': '77125FMP24'}, now=3) == HEADERS
+
+    def test_ttl(self):
+        index = ti.TrainIndex(ttl=100)
+        index.update('0001', activation(), now=0)
+        assert index.update('0003', {'train_id': '775F25MP24'}, now=90) == HEADERS
+        # each message extends the ttl
+        assert index.update('0003', {'train_id': '775F25MP24'}, now=180) == HEADERS
+        assert index.update('0003', {'train_id': '775F25MP24'}, now=281) is None
+        assert not index.trains
+
+    def test_terminated(self):
+        index = ti.TrainIndex()
+        index.update('0001', activation(), now=0)
+        index.update('0001', activation('775F26MP24'), now=0)
+        terminated = {'train_id': '775F25MP24', 'train_terminated': 'true'}
+        assert index.update('0003', terminated, now=10) == HEADERS
+        assert index.update('0008', {'train_id': '775F25MP24'}, now=10 + ti.TERMINATED_TTL) is None
+        assert list(index.trains) == ['775F26MP24']
+
+    def test_lru(self):
+        index = ti.TrainIndex(max_size=2)
+        for train_id in ('A', 'B'):
+            index.update('0001', activation(train_id), now=0)
+        index.update('0003', {'train_id': 'A'}, now=1)
+        index.update('0001', activation('C'), now=2)
+        assert list(index.trains) == ['A', 'C']
+
+
+class TestListenerEnrichment:
+    @pytest.mark.parametrize('fast_path', [False, True])
+    def test_movements_enriched(self, monkeypatch, fast_path):
+        monkeypatch.setattr(nc, 'TRAIN_INDEX', True)
+        monkeypatch.setattr(nc, 'MVT_FAST_PATH', fast_path)
+        listener = recording_listener()
+
+        act = json.loads(tmf.ACTIVATION)
+        mvt = json.loads(tmf.MOVEMENT)
+        mvt['body']['train_id'] = act['body']['train_id']
+        listener.process_train_movements(act)
+        listener.process_train_movements(mvt)
+        listener.process_train_movements(json.loads(tmf.COL))
+
+        assert listener.act_rmq.headers[0] == HEADERS
+        assert listener.mvt_rmq.headers[0] == HEADERS
+        assert 'train_uid' not in json.loads(listener.mvt_rmq.sent[0])
+        assert listener.col_rmq.headers[0] is None
@@ -0,0 +1,69 @@
+"""Conformance tests for gateway.nrod.train_movement_fast against the models."""
+
+import json
+import pytest
+import pydantic
+from gateway.nrod import train_movement as tm
+from gateway.nrod import train_movement_fast as fast
+from train_movement_fixtures import (
+    raw_col,
+    raw_coi,
+    raw_coo,
+    raw_reinstatement,
+    raw_movement,
+    raw_cancellation,
+    raw_activation
+)
+
+MUTATIONS = [
+    '', '   ', None, ' 12345 ', '1234', '123456', 'ABCDE', 'true', ' true ',
+    'false', 'True', True, False, 0, 42, '42', 'UP', ' DOWN ', 'SIDEWAYS',
+    '00', 'A1', 'a1', '1A', 'ABC', 'ARRIVAL', 'DEPARTURE', 'MANUAL', 'NORMAL',
+    '2022-01-01', '1A23M', ' 1A23 ', 'C', 'V', 'P', 'LATE', 'ON CALL',
+    '1234567890', ' 1234567890 ', 1.5, [], {}
+]
+
+
+def expected(model, element):
+    try:
+        return model.nrod_factory(element).json()
+    except pydantic.ValidationError:
+        return pydantic.ValidationError
+
+
+def actual(model, element):
+    try:
+        return json.dumps(fast.FAST_PATH[model](element))
+    except pydantic.ValidationError:
+        return pydantic.ValidationError
+
+
+def variants(raw):
+    """Yield the element, then a copy with each field mutated or removed."""
+    element = json.loads(raw)
+    yield element
+    for part in ('header', 'body'):
+        for key in element[part]:
+            for value in MUTATIONS:
+                mutated = json.loads(raw)
+                mutated[part][key] = value
+                yield mutated
+            mutated = json.loads(raw)
+            del mutated[part][key]
+            yield mutated
+
+
+@pytest.mark.parametrize('model, fixture', [
+    (tm.ChangeOfLocation, 'raw_col'),
+    (tm.ChangeOfIdentity, 'raw_coi'),
+    (tm.ChangeOfOrigin, 'raw_coo'),
+    (tm.Reinstatement, 'raw_reinstatement'),
+    (tm.Movement, 'raw_movement'),
+    (tm.Cancellation, 'raw_cancellation'),
+    (tm.Activation, 'raw_activation')
+])
+def test_conformance(model, fixture, request):
+    raw = request.getfixturevalue(fixture)
+    assert actual(model, json.loads(raw)) == model.nrod_factory(json.loads(raw)).json()
+    for element in variants(raw):
+        assert actual(model, element) == expected(model, element), element
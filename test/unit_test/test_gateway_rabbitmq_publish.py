@@ -0,0 +1,236 @@
+"""Unit tests for gateway/rabbitmq/publish.py."""
+
+from collections import namedtuple
+import pika
+import pytest
+from gateway.rabbitmq import publish
+
+Frame = namedtuple('Frame', 'method')
+
+
+class FakeChannel:
+    def __init__(self):
+        self.is_open = True
+        self.published = []
+        self.routing_keys = []
+        self.properties = []
+        self.exchanges = []
+
+    def exchange_declare(self, exchange, exchange_type, durable):
+        self.exchanges.append((exchange, exchange_type))
+
+    def close(self):
+        self.is_open = False
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append(body)
+        self.routing_keys.append(routing_key)
+        self.properties.append(properties)
+
+
+class FakeConnection:
+    def __init__(self, parameters):
+        self.is_open = True
+        self.channels = []
+
+    def channel(self):
+        self.channels.append(FakeChannel())
+        return self.channels[-1]
+
+    def process_data_events(self, time_limit):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture(scope='function')
+def publisher():
+    pub = publish.BatchPublisher(
+        parameters=None,
+        batch_size=3,
+        max_pending=5,
+        confirm_window=4
+    )
+    pub.start = lambda: None
+    state = pub.register('test-exchange')
+    state.channel = FakeChannel()
+    return pub
+
+
+def ack(tag, multiple=False):
+    return Frame(pika.spec.Basic.Ack(delivery_tag=tag, multiple=multiple))
+
+
+def nack(tag, multiple=False):
+    return Frame(pika.spec.Basic.Nack(delivery_tag=tag, multiple=multiple))
+
+
+class TestBatchPublisher:
+    def test_publish_rejects_when_full(self, publisher):
+        for idx in range(5):
+            assert publisher.publish('test-exchange', str(idx), None)
+        assert not publisher.publish('test-exchange', 'overflow', None)
+
+    def test_flush_is_bounded(self, publisher):
+        state = publisher.exchanges['test-exchange']
+        for idx in range(5):
+            publisher.publish('test-exchange', str(idx), None)
+
+        assert publisher._flush(state) == 3
+        assert publisher._flush(state) == 1
+        assert state.channel.published == ['0', '1', '2', '3']
+        assert list(state.unconfirmed) == [1, 2, 3, 4]
+
+    def test_confirmations(self, publisher):
+        state = publisher.exchanges['test-exchange']
+        for idx in range(3):
+            publisher.publish('test-exchange', str(idx), None)
+        publisher._flush(state)
+
+        publisher._on_confirmation(state, ack(2, multiple=True))
+        assert list(state.unconfirmed) == [3]
+        assert state.batches
+
+        publisher._on_confirmation(state, ack(3))
+        assert not state.unconfirmed
+        assert not state.batches
+
+    def test_nack_requeues_in_order(self, publisher):
+        state = publisher.exchanges['test-exchange']
+        for idx in range(4):
+            publisher.publish('test-exchange', str(idx), None)
+        publisher._flush(state)
+
+        publisher._on_confirmation(state, nack(2, multiple=True))
+        assert [msg[0] for msg in state.buffer] == ['0', '1', '3']
+
+    def test_channel_closed_requeues(self, publisher):
+        state = publisher.exchanges['test-exchange']
+        for idx in range(4):
+            publisher.publish('test-exchange', str(idx), None)
+        publisher._flush(state)
+
+        publisher._on_channel_closed(state, 'closed')
+        assert not state.ready
+        assert [msg[0] for msg in state.buffer] == ['0', '1', '2', '3']
+
+    def test_flush_waits_for_its_exchange_only(self, publisher):
+        publisher._thread = object()
+        other = publisher.register('other-exchange')
+        other.channel = FakeChannel()
+        publisher.publish('other-exchange', 'a', None)
+        assert publisher.flush('test-exchange', timeout=0.05)
+
+        publisher.publish('test-exchange', 'b', None)
+        assert not publisher.flush('test-exchange', timeout=0.05)
+
+    def test_close_connection_leaves_publisher_running(self, publisher):
+        thread = publisher._thread = object()
+        publisher.stop = lambda timeout=10: pytest.fail('shared publisher stopped')
+        conn = publish.BatchOutboundConnection('test-exchange', publisher)
+        other = publish.BatchOutboundConnection('other-exchange', publisher)
+        conn.close_connection()
+        assert publisher._thread is thread and not publisher._stopping
+        assert other.send_message('a')
+        assert list(publisher.exchanges['other-exchange'].buffer)[0][0] == 'a'
+
+    def test_stop_at_exit(self, publisher, monkeypatch):
+        stopped = []
+        publisher.stop = lambda timeout=10: stopped.append(True)
+        monkeypatch.setattr(publish, 'BATCH_PUBLISHER', publisher)
+        publish.stop_batch_publisher()
+        assert stopped == [True]
+
+
+class TestOutboundConnection:
+    def test_routing_key(self):
+        conn = publish.OutboundConnection('test-exchange', 'topic')
+        conn.channel = FakeChannel()
+        assert conn.exchange_type == 'topic'
+        assert conn.send_message('a', routing_key='rid.uid')
+        assert conn.send_message('b')
+        assert conn.channel.routing_keys == ['rid.uid', '']
+
+    def test_headers_not_sticky(self):
+        conn = publish.OutboundConnection('test-exchange')
+        conn.channel = FakeChannel()
+        assert conn.send_message('a', headers={'train_uid': 'C12345'})
+        assert conn.send_message('b')
+        first, second = conn.channel.properties
+        assert first.headers == {'train_uid': 'C12345'}
+        assert second.headers is None and second.expiration == '100000'
+
+    def test_send_failure(self, monkeypatch):
+        conn = publish.OutboundConnection('test-exchange')
+        monkeypatch.setattr(conn, 'create_connection', lambda: False)
+        assert not conn.send_message('a')
+
+    def test_batch_routing_key(self, publisher):
+        conn = publish.BatchOutboundConnection('test-exchange', publisher, 'topic')
+        state = publisher.exchanges['test-exchange']
+        assert conn.send_message('a', routing_key='rid.uid')
+        publisher._flush(state)
+        assert state.channel.routing_keys == ['rid.uid']
+
+
+class TestConnectionPool:
+    @pytest.fixture(scope='function')
+    def pool(self, monkeypatch):
+        connections = []
+
+        def connect(parameters):
+            connections.append(FakeConnection(parameters))
+            return connections[-1]
+
+        monkeypatch.setattr(publish.pika, 'BlockingConnection', connect)
+        pool = publish.ConnectionPool(None, size=2)
+        pool.opened = connections
+        return pool
+
+    def test_exchanges_share_connections(self, pool):
+        conns = [
+            publish.PooledOutboundConnection(f'exchange-{idx}', pool)
+            for idx in range(12)
+        ]
+        for conn in conns:
+            assert conn.send_message('a')
+        assert len(pool.opened) == 2
+        assert sum(len(conn.channels) for conn in pool.opened) == 12
+        assert conns[0].shared is pool.get('exchange-0')
+
+    def test_channels_reopen_after_lost_connection(self, pool):
+        conn = publish.PooledOutboundConnection('test-exchange', pool, 'topic')
+        assert conn.send_message('a')
+        first = conn.channel
+
+        conn.shared.connection.is_open = False
+        conn.shared.check()
+        assert len(pool.opened) == 2
+        assert conn.send_message('b', routing_key='key')
+        assert conn.channel is not first
+        assert conn.channel.published == ['b']
+        assert conn.channel.exchanges == [('test-exchange', 'topic')]
+
+    def test_reconnect_is_throttled(self, pool, monkeypatch):
+        def refuse(parameters):
+            raise pika.exceptions.AMQPConnectionError('refused')
+
+        monkeypatch.setattr(publish.pika, 'BlockingConnection', refuse)
+        shared = pool.get('test-exchange')
+        assert not shared.connect()
+        assert shared.retry_at
+
+        attempts = []
+        monkeypatch.setattr(publish.pika, 'BlockingConnection', attempts.append)
+        conn = publish.PooledOutboundConnection('test-exchange', pool)
+        assert not conn.send_message('a')
+        assert not attempts
+
+    def test_close_keeps_shared_connection(self, pool):
+        conn = publish.PooledOutboundConnection('test-exchange', pool)
+        conn.send_message('a')
+        shared = conn.shared.connection
+        conn.close_connection()
+        assert conn.channel is None
+        assert shared.is_open
@@ -0,0 +1,214 @@
+"""Unit tests for gateway/rabbitmq/spool.py."""
+
+import os
+import pytest
+from prometheus_client import REGISTRY
+from gateway.rabbitmq import spool as sp
+
+
+@pytest.fixture(scope='function')
+def spool(tmp_path):
+    spl = sp.Spool(str(tmp_path / 'test-exchange'), 'test-exchange', segment_size=4096)
+    yield spl
+    spl.close()
+
+
+def messages(name):
+    return REGISTRY.get_sample_value('rmq_spool_messages', {'spool': name})
+
+
+def segments(spl):
+    return sorted(name for name in os.listdir(spl.directory) if name.endswith(sp.SUFFIX))
+
+
+class TestSpool:
+    def test_append_read_commit(self, spool):
+        spool.append('a')
+        spool.append('b', {'type': 'x'}, 'rid.uid')
+        assert spool.pending == 2
+
+        records = spool.read()
+        assert [(rec.body, rec.headers, rec.routing_key) for rec in records] == [
+            ('a', None, ''),
+            ('b', {'type': 'x'}, 'rid.uid')
+        ]
+
+        spool.commit(1)
+        assert spool.pending == 1
+        assert [rec.body for rec in spool.read()] == ['b']
+        spool.commit(1)
+        assert not spool.pending
+        assert not spool.size
+        assert not spool.read()
+
+    def test_uncommitted_are_read_again(self, spool):
+        for idx in range(3):
+            spool.append(str(idx))
+        assert len(spool.read(2)) == 2
+        spool.commit(0)
+        assert [rec.body for rec in spool.read()] == ['0', '1', '2']
+
+    def test_segments_roll_and_are_removed(self, spool):
+        for idx in range(100):
+            spool.append(str(idx) * 50)
+        assert len(segments(spool)) > 1
+
+        bodies = []
+        while spool.pending:
+            records = spool.read(7)
+            bodies.extend(rec.body for rec in records)
+            spool.commit(len(records))
+        assert bodies == [str(idx) * 50 for idx in range(100)]
+        assert len(segments(spool)) == 1
+
+    def test_large_message(self, spool):
+        spool.append('x' * 10000)
+        assert spool.read()[0].body == 'x' * 10000
+
+    def test_full(self, tmp_path):
+        spl = sp.Spool(str(tmp_path), max_size=100)
+        assert spl.append('x' * 50)
+        assert not spl.append('x' * 50)
+        spl.close()
+
+    def test_recovery(self, tmp_path):
+        path = str(tmp_path / 'test-exchange')
+        spl = sp.Spool(path, segment_size=4096)
+        for idx in range(100):
+            spl.append(str(idx) * 50)
+        spl.read(30)
+        spl.commit(30)
+        spl.close()
+
+        spl = sp.Spool(path, segment_size=4096)
+        assert spl.pending == 70
+        assert spl.oldest_age() > 0
+        spl.append('new')
+        bodies = [rec.body for rec in spl.read(1000)]
+        assert bodies == [str(idx) * 50 for idx in range(30, 100)] + ['new']
+        spl.close()
+
+    def test_torn_record_is_ignored(self, tmp_path):
+        path = str(tmp_path)
+        spl = sp.Spool(path)
+        spl.append('a')
+        spl.append('b')
+        segment = spl.segments[spl.tail_seq]
+        segment.map[spl.tail_pos - 1:spl.tail_pos] = b'c'
+        spl.close()
+
+        spl = sp.Spool(path)
+        assert [rec.body for rec in spl.read()] == ['a']
+        spl.close()
+
+    def test_empty_segment_is_removed(self, tmp_path):
+        path = str(tmp_path)
+        spl = sp.Spool(path, segment_size=4096)
+        spl.append('a')
+        empty = spl._path(spl.tail_seq + 1)
+        spl.close()
+        open(empty, 'wb').close()
+
+        spl = sp.Spool(path, segment_size=4096)
+        assert not os.path.exists(empty)
+        assert [rec.body for rec in spl.read()] == ['a']
+        spl.close()
+
+    def test_gauges_per_directory(self, tmp_path):
+        first = sp.open_spool('test-exchange', str(tmp_path))
+        second = sp.open_spool('test-exchange', str(tmp_path))
+        second.append('a')
+        assert messages('test-exchange') == 0
+        assert messages('test-exchange.1') == 1
+        first.close()
+        second.close()
+        assert messages('test-exchange.1') is None
+
+    def test_directory_is_locked(self, tmp_path):
+        first = sp.open_spool('test-exchange', str(tmp_path))
+        second = sp.open_spool('test-exchange', str(tmp_path))
+        assert first.directory != second.directory
+        first.close()
+        second.close()
+
+
+class TestSpooledPublisher:
+    def test_publish_spool_and_drain_in_order(self, spool, monkeypatch):
+        monkeypatch.setattr(sp, 'RECONNECT_DELAY', 0.01)
+        published = []
+        broker = {'up': True}
+
+        def publish(body, headers, routing_key):
+            if not broker['up']:
+                return False
+            published.append(body)
+            return True
+
+        pub = sp.SpooledPublisher(spool, publish)
+        assert pub.send('0')
+        broker['up'] = False
+        for idx in range(1, 5):
+            assert pub.send(str(idx))
+        assert published == ['0']
+        assert spool.pending == 4
+
+        broker['up'] = True
+        assert pub.send('5')
+        for _ in range(100):
+            if not spool.pending:
+                break
+            pub._stopping.wait(0.01)
+        pub._stopping.set()
+        assert published == [str(idx) for idx in range(6)]
+
+    def test_orphans_drained_first(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sp, 'RECONNECT_DELAY', 0.01)
+        directory = str(tmp_path)
+        first = sp.open_spool('test-exchange', directory)
+        second = sp.open_spool('test-exchange', directory)
+        other = sp.open_spool('other-exchange', directory)
+        second.append('left')
+        other.append('other')
+        for spl in (first, second, other):
+            spl.close()
+
+        own = sp.open_spool('test-exchange', directory)
+        orphans = sp.orphan_spools('test-exchange', directory)
+        assert [spl.directory for spl in orphans] == [os.path.join(directory, 'test-exchange.1')]
+
+        published = []
+        pub = sp.SpooledPublisher(own, lambda body, *_: published.append(body) or True, orphans)
+        pub.send('new')
+        for _ in range(100):
+            if not pub.orphans and not own.pending:
+                break
+            pub._stopping.wait(0.01)
+        assert published == ['left', 'new']
+        # the orphan's directory is free for another connection
+        reused = sp.open_spool('test-exchange', directory)
+        assert reused.directory.endswith('test-exchange.1')
+        assert not reused.pending
+        reused.close()
+        pub.stop()
+
+    def test_drain_survives_publish_error(self, spool, monkeypatch):
+        monkeypatch.setattr(sp, 'RECONNECT_DELAY', 0.01)
+        spool.append('a')
+        spool.append('b')
+        published = []
+        failures = [RuntimeError('channel closed by broker')]
+
+        def publish(body, headers, routing_key):
+            if failures:
+                raise failures.pop()
+            published.append(body)
+            return True
+
+        pub = sp.SpooledPublisher(spool, publish)
+        for _ in range(100):
+            if not spool.pending:
+                break
+            pub._stopping.wait(0.01)
+        assert published == ['a', 'b']
+        assert pub._thread.is_alive()
+        pub._stopping.set()
@@ -0,0 +1,34 @@
+"""Unit tests for gateway/validation.py."""
+
+import pydantic
+import pytest
+from gateway import validation
+
+
+def decorated():
+    @validation.trusted_internal
+    def count(element: dict) -> int:
+        return len(element)
+
+    @validation.trusted_internal(config=dict(arbitrary_types_allowed=True))
+    def name(value: object) -> str:
+        return type(value).__name__
+
+    return count, name
+
+
+class TestTrustedInternal:
+    def test_validated_by_default(self, monkeypatch):
+        monkeypatch.setattr(validation, 'TRUSTED_INTERNAL', False)
+        count, name = decorated()
+        assert count({'a': 1}) == 1
+        assert name(object()) == 'object'
+        with pytest.raises(pydantic.ValidationError):
+            count(['a'])
+
+    def test_trusted(self, monkeypatch):
+        monkeypatch.setattr(validation, 'TRUSTED_INTERNAL', True)
+        count, name = decorated()
+        assert count(['a']) == 1
+        assert name(object()) == 'object'
+        assert not hasattr(count, 'vd')